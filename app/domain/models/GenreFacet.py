@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class GenreFacet:
+    id: int
+    name: str
+    film_count: int
+
+    def __repr__(self) -> str:
+        """
+        Форматированный вывод жанра с количеством фильмов.
+        """
+        return f"<GenreFacet ID={self.id}, Name='{self.name}', FilmCount={self.film_count}>"
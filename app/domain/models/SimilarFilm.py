@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class SimilarFilm:
+    title: str
+    score: float
+
+    def __repr__(self) -> str:
+        """
+        Форматированный вывод похожего фильма.
+        """
+        return f"<SimilarFilm Title='{self.title}', Score={self.score:.3f}>"
@@ -0,0 +1,35 @@
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Tuple
+
+
+@dataclass
+class VideoIndex:
+    object_name: str = ""
+    duration: float = 0.0
+    bitrate: int = 0
+    # Времена ключевых кадров в секундах (по возрастанию) и их смещения в файле, array('d') и array('Q').
+    keyframe_times: array = field(default_factory=lambda: array("d"))
+    keyframe_offsets: array = field(default_factory=lambda: array("Q"))
+
+    def keyframe_at(self, seconds: float) -> Tuple[float, int]:
+        """
+        Ближайший ключевой кадр не позже указанного момента.
+
+        :param seconds: Время от начала видео.
+        :return: Пара (время ключевого кадра, смещение в байтах); (0.0, 0), если индекс пуст.
+        """
+        if not self.keyframe_times:
+            return 0.0, 0
+        i = max(0, bisect_right(self.keyframe_times, seconds) - 1)
+        return self.keyframe_times[i], self.keyframe_offsets[i]
+
+    def __repr__(self) -> str:
+        """
+        Форматированный вывод для отладки.
+        """
+        return (
+            f"<VideoIndex Object='{self.object_name}', Duration={self.duration:.1f}s, "
+            f"Bitrate={self.bitrate}, Keyframes={len(self.keyframe_times)}>"
+        )
@@ -1,8 +1,12 @@
-from typing import List
+from typing import Dict, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.sql import delete, insert
+from sqlalchemy import func
+from sqlalchemy.sql import delete, insert, update
 
+from app.domain.repositories.GenreCountsRepository import GenreCountsRepository
+from app.infrastructure.cache.CatalogEvents import CatalogEvent, GENRE_LINKED, GENRE_UNLINKED, catalog_events
+from app.infrastructure.cache.CatalogNotifications import notify_catalog_change
 from app.infrastructure.db.models.Base import Base
 from app.infrastructure.db.models.FilmORM import FilmORM
 from app.infrastructure.db.models.GenreORM import GenreORM
@@ -12,6 +16,7 @@ from app.infrastructure.db.models.FilmGenres import film_genres
 class FilmGenresRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.genre_counts_repository = GenreCountsRepository(session)
 
     async def add_genre_to_film(self, film_id: int, genre_id: int) -> None:
         """
@@ -22,7 +27,12 @@ class FilmGenresRepository:
         """
         query = insert(film_genres).values(id_film=film_id, id_genre=genre_id)
         await self.session.execute(query)
+        await self.genre_counts_repository.increment(genre_id)
+        await self._touch_film(film_id)
+        event = CatalogEvent(GENRE_LINKED, film_id=film_id, genre_id=genre_id)
+        await notify_catalog_change(self.session, event)
         await self.session.commit()
+        catalog_events.publish(event)
 
     async def remove_genre_from_film(self, film_id: int, genre_id: int) -> None:
         """
@@ -34,8 +44,19 @@ class FilmGenresRepository:
         query = delete(film_genres).where(
             (film_genres.c.id_film == film_id) & (film_genres.c.id_genre == genre_id)
         )
-        await self.session.execute(query)
+        result = await self.session.execute(query)
+        event = CatalogEvent(GENRE_UNLINKED, film_id=film_id, genre_id=genre_id)
+        if result.rowcount:
+            await self.genre_counts_repository.decrement([genre_id])
+            await self._touch_film(film_id)
+            await notify_catalog_change(self.session, event)
         await self.session.commit()
+        if result.rowcount:
+            catalog_events.publish(event)
+
+    async def _touch_film(self, film_id: int) -> None:
+        # Связи не имеют своей метки времени, поэтому изменение жанров отмечается на фильме.
+        await self.session.execute(update(FilmORM).where(FilmORM.id == film_id).values(updated_at=func.now()))
 
     async def get_genres_by_film_id(self, film_id: int) -> List[GenreORM]:
         """
@@ -68,3 +89,55 @@ class FilmGenresRepository:
         result = await self.session.execute(query)
         films = list(result.scalars().all())
         return films
+
+    async def get_film_ids_by_genre_ids(
+        self, genre_ids: List[int], match_all: bool = True, limit: int = 100, offset: int = 0
+    ) -> List[int]:
+        """
+        Получает ID фильмов, у которых есть все (или хотя бы один) из указанных жанров.
+
+        Один запрос по film_genres: для каждого жанра читается диапазон первичного
+        ключа (id_genre, id_film), строки группируются по фильму, а для режима «все»
+        остаются группы, в которых нашлись все жанры.
+
+        :param genre_ids: ID жанров без повторов.
+        :param match_all: True — все жанры (AND), False — любой из жанров (OR).
+        :param limit: Размер страницы.
+        :param offset: Смещение страницы.
+        :return: Список ID фильмов по возрастанию.
+        """
+        query = (
+            select(film_genres.c.id_film)
+            .where(film_genres.c.id_genre.in_(genre_ids))
+            .group_by(film_genres.c.id_film)
+            .order_by(film_genres.c.id_film)
+            .limit(limit)
+            .offset(offset)
+        )
+        if match_all:
+            query = query.having(func.count() == len(genre_ids))
+
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def get_genres_by_film_ids(self, film_ids: List[int]) -> Dict[int, List[GenreORM]]:
+        """
+        Получает жанры сразу для нескольких фильмов одним запросом.
+
+        :param film_ids: ID фильмов.
+        :return: Словарь ID фильма -> список объектов GenreORM.
+        """
+        genres: Dict[int, List[GenreORM]] = {film_id: [] for film_id in film_ids}
+        if not film_ids:
+            return genres
+
+        query = (
+            select(film_genres.c.id_film, GenreORM)
+            .join(GenreORM, film_genres.c.id_genre == GenreORM.id)
+            .where(film_genres.c.id_film.in_(film_ids))
+        )
+        result = await self.session.execute(query)
+        for film_id, genre_orm in result.all():
+            genres[film_id].append(genre_orm)
+
+        return genres
@@ -1,15 +1,25 @@
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List, Optional
+from sqlalchemy.sql import delete
+from datetime import datetime
+from typing import AsyncIterator, Collection, List, Optional
 
 from app.domain.models.Film import Film
+from app.domain.repositories.GenreCountsRepository import GenreCountsRepository
+from app.infrastructure.cache.CatalogEvents import CatalogEvent, FILM_DELETED, FILM_UPSERTED, catalog_events
+from app.infrastructure.cache.CatalogNotifications import notify_catalog_change
+from app.infrastructure.db.models.FilmGenres import film_genres
 from app.infrastructure.db.models.FilmORM import FilmORM
+from app.infrastructure.db.models.GenreORM import GenreORM
 
 
 class FilmRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
+        self.genre_counts_repository = GenreCountsRepository(session)
 
     async def add_film(self, film: Film) -> int:
         """
@@ -32,8 +42,13 @@ class FilmRepository:
             )
 
             self.session.add(film_orm)
+            # flush присваивает ID, который нужен уведомлению до commit.
+            await self.session.flush()
+            event = CatalogEvent(FILM_UPSERTED, film_id=film_orm.id, name=film_orm.title)
+            await notify_catalog_change(self.session, event)
             await self.session.commit()
             await self.session.refresh(film_orm)
+            catalog_events.publish(event)
 
             return film_orm.id
 
@@ -59,12 +74,18 @@ class FilmRepository:
 
     async def get_films_by_ids(self, film_ids: List[int]) -> List[FilmORM]:
         """
-        Получает фильмы по их ID, используя метод get_film_by_id.
+        Получает фильмы по их ID одним запросом.
 
         :param film_ids: List[int] — Список ID фильмов.
-        :return: List[FilmORM] — Список объектов FilmORM.
+        :return: List[FilmORM] — Список объектов FilmORM в порядке film_ids; отсутствующие ID пропускаются.
         """
-        return [await self.get_film_by_id(film_id) for film_id in film_ids]
+        if not film_ids:
+            return []
+
+        result = await self.session.execute(select(FilmORM).where(FilmORM.id.in_(film_ids)))
+        films_by_id = {film.id: film for film in result.scalars().all()}
+
+        return [films_by_id[film_id] for film_id in film_ids if film_id in films_by_id]
 
     async def get_all_films(self) -> List[FilmORM]:
         """
@@ -77,6 +98,96 @@ class FilmRepository:
 
         return films
 
+    async def stream_films_with_genres(self, after_id: int = 0, batch_size: int = 1000) -> AsyncIterator[List[dict]]:
+        """
+        Потоково читает фильмы с агрегированными жанрами через серверный курсор.
+
+        В памяти одновременно находится не больше одного батча, поэтому выгрузка
+        всего каталога не зависит от его размера.
+
+        :param after_id: Выгружать фильмы с ID строго больше указанного (продолжение выгрузки).
+        :param batch_size: Размер батча.
+        :return: Асинхронный итератор батчей словарей id/title/description/creation_date/file_link/genres.
+        """
+        genres = (
+            func.array_agg(aggregate_order_by(GenreORM.name, GenreORM.name))
+            .filter(GenreORM.id.isnot(None))
+            .label("genres")
+        )
+        query = (
+            select(
+                FilmORM.id,
+                FilmORM.title,
+                FilmORM.description,
+                FilmORM.creation_date,
+                FilmORM.file_link,
+                genres,
+            )
+            .outerjoin(film_genres, film_genres.c.id_film == FilmORM.id)
+            .outerjoin(GenreORM, GenreORM.id == film_genres.c.id_genre)
+            .where(FilmORM.id > after_id)
+            .group_by(FilmORM.id)
+            .order_by(FilmORM.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        result = await self.session.stream(query)
+        async for partition in result.mappings().partitions(batch_size):
+            batch = []
+            for row in partition:
+                film = dict(row)
+                film["genres"] = film["genres"] or []
+                batch.append(film)
+            yield batch
+
+    @staticmethod
+    def _films_with_genre_ids_query():
+        genre_ids = func.array_agg(film_genres.c.id_genre).filter(film_genres.c.id_genre.isnot(None))
+        return (
+            select(
+                FilmORM.id,
+                FilmORM.title,
+                FilmORM.description,
+                FilmORM.creation_date,
+                FilmORM.file_link,
+                FilmORM.updated_at,
+                genre_ids.label("genre_ids"),
+            )
+            .outerjoin(film_genres, film_genres.c.id_film == FilmORM.id)
+            .group_by(FilmORM.id)
+        )
+
+    async def get_films_with_genre_ids_updated_since(self, since: Optional[datetime] = None,
+                                                     film_ids: Collection[int] = ()) -> List[dict]:
+        """
+        Получает фильмы, измененные после указанного момента, вместе с ID их жанров.
+
+        :param since: Нижняя граница updated_at (не включительно); None — все фильмы.
+        :param film_ids: ID фильмов, которые нужно вернуть независимо от updated_at.
+        :return: Список словарей с полями FilmORM и genre_ids.
+        """
+        query = self._films_with_genre_ids_query()
+        if since is not None:
+            condition = FilmORM.updated_at > since
+            if film_ids:
+                condition = or_(condition, FilmORM.id.in_(list(film_ids)))
+            query = query.where(condition)
+
+        result = await self.session.execute(query)
+        return [dict(row) for row in result.mappings().all()]
+
+    async def stream_films_with_genre_ids(self, batch_size: int = 5000) -> AsyncIterator[List[dict]]:
+        """
+        Потоково читает все фильмы вместе с ID их жанров через серверный курсор.
+
+        :param batch_size: Размер батча.
+        :return: Асинхронный итератор батчей словарей с полями FilmORM и genre_ids.
+        """
+        query = self._films_with_genre_ids_query().execution_options(yield_per=batch_size)
+        result = await self.session.stream(query)
+        async for partition in result.mappings().partitions(batch_size):
+            yield [dict(row) for row in partition]
+
     async def get_film_by_title(self, title: str) -> Optional[FilmORM]:
         """
         Получение фильма по названию.
@@ -103,6 +214,8 @@ class FilmRepository:
         film_orm = await self.get_film_by_id(film_id)
 
         if film_orm:
+            old_title = film_orm.title
+
             if updated_film.title:
                 film_orm.title = updated_film.title
 
@@ -115,7 +228,10 @@ class FilmRepository:
             if updated_film.file_link:
                 film_orm.file_link = updated_film.file_link
 
+            event = CatalogEvent(FILM_UPSERTED, film_id=film_orm.id, name=film_orm.title, old_name=old_title)
+            await notify_catalog_change(self.session, event)
             await self.session.commit()
+            catalog_events.publish(event)
 
             return film_orm
 
@@ -123,7 +239,7 @@ class FilmRepository:
 
     async def delete_film(self, film_id: int) -> None:
         """
-        Удаляет фильм по ID.
+        Удаляет фильм по ID вместе с его связями с жанрами.
 
         :param film_id: ID фильма, который нужно удалить.
         :return: Удаленный объект FilmORM, если фильм найден и удален, или None.
@@ -131,5 +247,14 @@ class FilmRepository:
         film_orm = await self.get_film_by_id(film_id)
 
         if film_orm:
+            # genres загружается с lazy="noload", поэтому связи удаляются явно,
+            # а счетчики жанров уменьшаются в той же транзакции.
+            result = await self.session.execute(
+                delete(film_genres).where(film_genres.c.id_film == film_id).returning(film_genres.c.id_genre)
+            )
+            await self.genre_counts_repository.decrement(list(result.scalars().all()))
             await self.session.delete(film_orm)
+            event = CatalogEvent(FILM_DELETED, film_id=film_id, name=film_orm.title)
+            await notify_catalog_change(self.session, event)
             await self.session.commit()
+            catalog_events.publish(event)
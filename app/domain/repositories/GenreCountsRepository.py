@@ -0,0 +1,85 @@
+from collections import Counter
+from typing import List, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import delete, update
+
+from app.infrastructure.db.models.FilmGenres import film_genres
+from app.infrastructure.db.models.GenreFilmCounts import genre_film_counts
+from app.infrastructure.db.models.GenreORM import GenreORM
+
+
+class GenreCountsRepository:
+    """
+    Счетчики фильмов по жанрам.
+
+    Методы increment/decrement не делают commit: они вызываются из репозиториев,
+    меняющих film_genres, и должны попасть в их транзакцию.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def increment(self, genre_id: int) -> None:
+        """
+        Увеличивает счетчик жанра на единицу.
+
+        :param genre_id: ID жанра.
+        """
+        query = insert(genre_film_counts).values(id_genre=genre_id, film_count=1)
+        query = query.on_conflict_do_update(
+            index_elements=[genre_film_counts.c.id_genre],
+            set_={"film_count": genre_film_counts.c.film_count + 1},
+        )
+        await self.session.execute(query)
+
+    async def decrement(self, genre_ids: List[int]) -> None:
+        """
+        Уменьшает счетчики жанров на единицу.
+
+        :param genre_ids: ID жанров; жанр может встречаться несколько раз.
+        """
+        for genre_id, removed in Counter(genre_ids).items():
+            query = (
+                update(genre_film_counts)
+                .where(genre_film_counts.c.id_genre == genre_id)
+                .values(film_count=genre_film_counts.c.film_count - removed)
+            )
+            await self.session.execute(query)
+
+    async def get_all_genres_with_counts(self) -> List[Tuple[GenreORM, int]]:
+        """
+        Получает все жанры с количеством фильмов. Таблица film_genres не читается.
+
+        :return: Список пар (GenreORM, количество фильмов).
+        """
+        query = (
+            select(GenreORM, func.coalesce(genre_film_counts.c.film_count, 0))
+            .outerjoin(genre_film_counts, genre_film_counts.c.id_genre == GenreORM.id)
+            .order_by(GenreORM.name)
+        )
+        result = await self.session.execute(query)
+        return [(genre_orm, count) for genre_orm, count in result.all()]
+
+    async def rebuild(self) -> int:
+        """
+        Пересчитывает все счетчики по film_genres с нуля.
+
+        На время пересчета film_genres блокируется от записи, чтобы параллельные
+        вставки не потерялись между DELETE и INSERT ... SELECT.
+
+        :return: Количество жанров с ненулевым счетчиком.
+        """
+        await self.session.execute(text("LOCK TABLE film_genres IN SHARE MODE"))
+        await self.session.execute(delete(genre_film_counts))
+        query = insert(genre_film_counts).from_select(
+            ["id_genre", "film_count"],
+            select(film_genres.c.id_genre, func.count()).group_by(film_genres.c.id_genre),
+        )
+        result = await self.session.execute(query)
+        await self.session.commit()
+
+        return result.rowcount
@@ -1,8 +1,12 @@
+from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List, Optional
+from datetime import datetime
+from typing import Collection, List, Optional
 
+from app.infrastructure.cache.CatalogEvents import CatalogEvent, GENRE_DELETED, GENRE_UPSERTED, catalog_events
+from app.infrastructure.cache.CatalogNotifications import notify_catalog_change
 from app.infrastructure.db.models.GenreORM import GenreORM
 from app.domain.models.Genre import Genre
 
@@ -26,8 +30,13 @@ class GenreRepository:
             genre_orm = GenreORM(name=genre.name)
 
             self.session.add(genre_orm)
+            # flush присваивает ID, который нужен уведомлению до commit.
+            await self.session.flush()
+            event = CatalogEvent(GENRE_UPSERTED, genre_id=genre_orm.id, name=genre_orm.name)
+            await notify_catalog_change(self.session, event)
             await self.session.commit()
             await self.session.refresh(genre_orm)
+            catalog_events.publish(event)
 
             return genre_orm.id
 
@@ -74,6 +83,19 @@ class GenreRepository:
 
         return None
 
+    async def get_genres_by_names(self, names: List[str]) -> List[GenreORM]:
+        """
+        Получение жанров по списку названий одним запросом.
+
+        :param names: List[str] — Названия жанров.
+        :return: List[GenreORM] — найденные жанры; отсутствующие названия пропускаются.
+        """
+        if not names:
+            return []
+
+        result = await self.session.execute(select(GenreORM).where(GenreORM.name.in_(names)))
+        return list(result.scalars().all())
+
     async def get_all_genres(self) -> List[GenreORM]:
         """
         Получение всех жанров.
@@ -85,6 +107,25 @@ class GenreRepository:
 
         return genres_orm
 
+    async def get_genres_updated_since(self, since: Optional[datetime] = None,
+                                       genre_ids: Collection[int] = ()) -> List[GenreORM]:
+        """
+        Получение жанров, измененных после указанного момента.
+
+        :param since: Нижняя граница updated_at (не включительно); None — все жанры.
+        :param genre_ids: ID жанров, которые нужно вернуть независимо от updated_at.
+        :return: List[GenreORM] — список объектов жанров.
+        """
+        query = select(GenreORM)
+        if since is not None:
+            condition = GenreORM.updated_at > since
+            if genre_ids:
+                condition = or_(condition, GenreORM.id.in_(list(genre_ids)))
+            query = query.where(condition)
+
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
     async def update_genre(self, genre_id: int, updated_genre: Genre) -> Optional[GenreORM]:
         """
         Обновление информации о жанре по ID.
@@ -96,8 +137,12 @@ class GenreRepository:
         genre_orm = await self.get_genre_by_id(genre_id)
 
         if genre_orm:
+            old_name = genre_orm.name
             genre_orm.name = updated_genre.name
+            event = CatalogEvent(GENRE_UPSERTED, genre_id=genre_id, name=genre_orm.name, old_name=old_name)
+            await notify_catalog_change(self.session, event)
             await self.session.commit()
+            catalog_events.publish(event)
 
             return genre_orm
 
@@ -114,4 +159,7 @@ class GenreRepository:
 
         if genre_orm:
             await self.session.delete(genre_orm)
+            event = CatalogEvent(GENRE_DELETED, genre_id=genre_id, name=genre_orm.name)
+            await notify_catalog_change(self.session, event)
             await self.session.commit()
+            catalog_events.publish(event)
@@ -0,0 +1,69 @@
+import sys
+from array import array
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.domain.models.VideoIndex import VideoIndex
+from app.infrastructure.db.models.VideoIndexORM import VideoIndexORM
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    values = array(typecode, data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class VideoIndexRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def save_index(self, index: VideoIndex) -> None:
+        """
+        Сохраняет индекс ключевых кадров видео, заменяя существующий.
+
+        :param index: Объект VideoIndex.
+        """
+        values = dict(
+            object_name=index.object_name,
+            duration=index.duration,
+            bitrate=index.bitrate,
+            keyframe_times=_pack(index.keyframe_times),
+            keyframe_offsets=_pack(index.keyframe_offsets),
+        )
+        query = insert(VideoIndexORM).values(**values).on_conflict_do_update(
+            index_elements=[VideoIndexORM.object_name], set_=values
+        )
+        await self.session.execute(query)
+        await self.session.commit()
+
+    async def get_index(self, object_name: str) -> Optional[VideoIndex]:
+        """
+        Получает индекс ключевых кадров видео.
+
+        :param object_name: Имя объекта в S3.
+        :return: VideoIndex или None, если видео не индексировалось.
+        """
+        result = await self.session.execute(select(VideoIndexORM).filter_by(object_name=object_name))
+        index_orm = result.scalars().first()
+
+        if index_orm is None:
+            return None
+
+        return VideoIndex(
+            object_name=index_orm.object_name,
+            duration=index_orm.duration,
+            bitrate=index_orm.bitrate,
+            keyframe_times=_unpack("d", index_orm.keyframe_times),
+            keyframe_offsets=_unpack("Q", index_orm.keyframe_offsets),
+        )
@@ -0,0 +1,56 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FILM_UPSERTED = "film_upserted"
+FILM_DELETED = "film_deleted"
+GENRE_UPSERTED = "genre_upserted"
+GENRE_DELETED = "genre_deleted"
+GENRE_LINKED = "genre_linked"
+GENRE_UNLINKED = "genre_unlinked"
+# Изменения других процессов могли быть пропущены (разрыв LISTEN-соединения):
+# кэши, которые нельзя догнать инкрементально, перечитываются из БД.
+CATALOG_RESYNC = "catalog_resync"
+
+
+@dataclass(frozen=True)
+class CatalogEvent:
+    """
+    Изменение каталога после успешного commit.
+
+    name — название фильма или жанра после изменения, old_name — до него (при переименовании).
+    """
+    kind: str
+    film_id: Optional[int] = None
+    genre_id: Optional[int] = None
+    name: Optional[str] = None
+    old_name: Optional[str] = None
+
+
+class CatalogEventBus:
+    """
+    Внутрипроцессная шина изменений каталога.
+
+    Репозитории публикуют события после commit, локальные индексы и кэши
+    подписываются на них и обновляются инкрементально. События других процессов
+    приходят сюда же через CatalogNotifications.
+    """
+
+    def __init__(self):
+        self.subscribers: List[Callable[[CatalogEvent], None]] = []
+
+    def subscribe(self, callback: Callable[[CatalogEvent], None]) -> None:
+        self.subscribers.append(callback)
+
+    def publish(self, event: CatalogEvent) -> None:
+        for callback in self.subscribers:
+            try:
+                callback(event)
+            except Exception:
+                # Ошибка в кэше не должна ломать уже закоммиченную запись.
+                logger.exception("Catalog event subscriber failed on %s", event)
+
+
+catalog_events = CatalogEventBus()
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict
+from typing import Optional, Tuple
+
+import asyncpg
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.infrastructure.cache.CatalogEvents import CATALOG_RESYNC, CatalogEvent, catalog_events
+from app.infrastructure.db.Settings import settings
+from app.infrastructure.metrics.Metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Идентификатор процесса в уведомлениях: свои изменения уже опубликованы в локальную шину.
+ORIGIN = uuid.uuid4().hex
+
+CONNECT_TIMEOUT = 10.0
+# application_name соединения: по нему слушатели видны в pg_stat_activity.
+APPLICATION_NAME = "catalog_listener"
+_RECONNECT_MIN_SECONDS = 0.5
+_PAYLOAD_REPR_LIMIT = 200
+
+NOTIFY_LATENCY = registry.histogram(
+    "catalog_notify_latency_seconds", "Time from NOTIFY of a catalog change by another process to its local publish.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+NOTIFY_RECEIVED = registry.counter(
+    "catalog_notifications_received_total", "Catalog change notifications from other processes applied locally.",
+)
+LISTEN_RECONNECTS = registry.counter(
+    "catalog_listen_reconnects_total", "Re-established catalog LISTEN connections (each triggers a cache resync).",
+)
+
+
+def to_payload(event: CatalogEvent, origin: str = ORIGIN) -> str:
+    # Названия ограничены 255 символами, так что payload заведомо меньше лимита NOTIFY в 8000 байт.
+    return json.dumps({"origin": origin, "sent_at": time.time(), **asdict(event)}, ensure_ascii=False)
+
+
+def from_payload(payload: str) -> Tuple[str, float, CatalogEvent]:
+    """
+    :return: Идентификатор процесса-отправителя, время отправки (unix time) и событие.
+    """
+    data = json.loads(payload)
+    return data.pop("origin"), data.pop("sent_at"), CatalogEvent(**data)
+
+
+async def notify_catalog_change(session: AsyncSession, event: CatalogEvent) -> None:
+    """
+    Добавляет уведомление об изменении каталога в текущую транзакцию сессии.
+
+    PostgreSQL доставляет NOTIFY слушателям только после commit и отбрасывает при откате,
+    поэтому вызывается до commit, в той же транзакции, что и само изменение.
+
+    :param session: Сессия, в которой сделано изменение.
+    :param event: Событие, которое другие процессы опубликуют в свою шину.
+    """
+    if settings.CATALOG_NOTIFY_ENABLED:
+        await session.execute(select(func.pg_notify(settings.CATALOG_NOTIFY_CHANNEL, to_payload(event))))
+
+
+class CatalogListener:
+    """
+    Выделенное соединение asyncpg (вне пула) с LISTEN на канал изменений каталога.
+
+    Уведомления других процессов публикуются в локальную шину catalog_events, и кэши
+    обновляются теми же обработчиками, что и после локальной записи. Живость соединения
+    проверяется запросом раз в ping_seconds; при обрыве оно переоткрывается с экспоненциальной
+    задержкой до reconnect_max_seconds. Уведомления, отправленные без слушателя, PostgreSQL
+    не хранит, поэтому после каждого подключения публикуется CATALOG_RESYNC.
+    """
+
+    def __init__(self, channel: str, ping_seconds: float, reconnect_max_seconds: float, origin: str = ORIGIN):
+        self.channel = channel
+        self.ping_seconds = ping_seconds
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self.origin = origin
+
+        self.connected = False
+        self.connections = 0
+
+        self._task: Optional[asyncio.Task] = None
+        self._attempted = asyncio.Event()
+
+    @staticmethod
+    async def _connect() -> asyncpg.Connection:
+        return await asyncpg.connect(
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            user=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            database=settings.DB_NAME,
+            timeout=CONNECT_TIMEOUT,
+            server_settings={"application_name": APPLICATION_NAME},
+        )
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            origin, sent_at, event = from_payload(payload)
+        except (ValueError, TypeError, KeyError):
+            logger.warning("Malformed catalog notification: %r", payload[:_PAYLOAD_REPR_LIMIT])
+            return
+        if origin == self.origin:
+            return
+
+        NOTIFY_LATENCY.observe(max(0.0, time.time() - sent_at))
+        NOTIFY_RECEIVED.inc()
+        catalog_events.publish(event)
+
+    async def _listen(self, connection: asyncpg.Connection) -> None:
+        """Слушает канал, пока соединение живо; при обрыве бросает исключение."""
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        await connection.add_listener(self.channel, self._on_notification)
+
+        if self.connections:
+            LISTEN_RECONNECTS.inc()
+            logger.info("Catalog LISTEN connection re-established, resyncing local caches")
+        self.connections += 1
+        self.connected = True
+        self._attempted.set()
+        # Все, что закоммичено после LISTEN, придет уведомлением; более ранние изменения
+        # подхватит перечитывание кэшей.
+        catalog_events.publish(CatalogEvent(CATALOG_RESYNC))
+
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), self.ping_seconds)
+            except asyncio.TimeoutError:
+                # Полуоткрытое TCP-соединение не вызывает termination listener.
+                await asyncio.wait_for(connection.fetchval("SELECT 1"), self.ping_seconds)
+        raise ConnectionError("connection terminated")
+
+    async def _run(self) -> None:
+        delay = _RECONNECT_MIN_SECONDS
+        while True:
+            connection = None
+            try:
+                connection = await self._connect()
+                delay = _RECONNECT_MIN_SECONDS
+                await self._listen(connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Catalog LISTEN connection failed: %r; reconnecting in %.1f s", e, delay)
+            finally:
+                self.connected = False
+                self._attempted.set()
+                if connection is not None and not connection.is_closed():
+                    connection.terminate()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max_seconds)
+
+    async def start(self) -> None:
+        """
+        Запускает слушатель и ждет первую попытку подключения (не дольше CONNECT_TIMEOUT),
+        чтобы кэши, загружаемые после старта, не перечитывались повторно.
+        """
+        if self._task is not None:
+            return
+        self._attempted.clear()
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._attempted.wait(), CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Catalog LISTEN connection is not established yet, continuing startup")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+catalog_listener = CatalogListener(
+    channel=settings.CATALOG_NOTIFY_CHANNEL,
+    ping_seconds=settings.CATALOG_LISTEN_PING_SECONDS,
+    reconnect_max_seconds=settings.CATALOG_LISTEN_RECONNECT_MAX_SECONDS,
+)
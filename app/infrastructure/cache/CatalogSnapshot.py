@@ -0,0 +1,435 @@
+import asyncio
+import heapq
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from app.domain.models.Film import Film
+from app.domain.models.Genre import Genre
+from app.domain.repositories.FilmRepository import FilmRepository
+from app.domain.repositories.GenreRepository import GenreRepository
+from app.infrastructure.cache.CatalogEvents import (
+    CATALOG_RESYNC,
+    CatalogEvent,
+    FILM_DELETED,
+    FILM_UPSERTED,
+    GENRE_DELETED,
+    GENRE_LINKED,
+    GENRE_UNLINKED,
+    GENRE_UPSERTED,
+    catalog_events,
+)
+from app.infrastructure.db.Settings import settings
+
+logger = logging.getLogger(__name__)
+
+# updated_at берется из now() — времени начала транзакции, поэтому транзакция, закоммиченная
+# после очередного обновления снимка, может принести метку меньше watermark. Изменения через
+# репозитории сервиса (в том числе в других процессах, через LISTEN/NOTIFY) не зависят от метки:
+# их ID приходят событиями и перечитываются явно. Окно перекрытия повторно забирает строки,
+# измененные в обход сервиса; такая транзакция, закоммиченная позже чем через окно после своего
+# now(), попадет в снимок только при полном перечитывании (full_resync_seconds).
+_WATERMARK_OVERLAP = timedelta(seconds=5)
+
+# Приблизительная стоимость записи в словарях и наборах индексов, байт.
+_RECORD_OVERHEAD = 3 * sys.getsizeof(object()) + 200
+
+# Размер батча полного перечитывания: столько строк читается с курсора и раскладывается в потоке за раз.
+_FULL_RESYNC_BATCH = 5000
+
+
+class FilmRecord:
+    __slots__ = ("id", "title", "description", "creation_date", "file_link", "genre_ids")
+
+    def __init__(self, id, title, description, creation_date, file_link, genre_ids):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.creation_date = creation_date
+        self.file_link = file_link
+        self.genre_ids = genre_ids
+
+    def size(self) -> int:
+        return (
+            _RECORD_OVERHEAD
+            + len(self.title)
+            + len(self.description or "")
+            + len(self.file_link or "")
+            + 8 * len(self.genre_ids)
+        )
+
+
+class GenreRecord:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+class CatalogSnapshot:
+    """
+    Снимок каталога (фильмы, жанры, связи) в памяти процесса только для чтения.
+
+    Фоновая задача раз в refresh_seconds забирает строки с updated_at больше watermark
+    и строки, о которых пришли события, раз в full_resync_seconds или по событию CATALOG_RESYNC
+    перечитывает каталог целиком (так убираются удаления, уведомления о которых могли не дойти
+    от других процессов). Снимок отдает данные, только пока последнее успешное обновление
+    не старше max_staleness_seconds; иначе сервисы идут в БД.
+
+    Полное перечитывание читает фильмы серверным курсором и раскладывает их батчами в
+    новые словари в отдельном потоке; до подмены запросы обслуживает прежний снимок, так что
+    на время перечитывания в памяти могут быть оба.
+
+    Если оценка занятой памяти превышает memory_budget_bytes, снимок сбрасывается и не
+    обновляется до следующего полного перечитывания, которое прекращает чтение, как только
+    снова выходит за бюджет.
+    """
+
+    def __init__(self, refresh_seconds: float, max_staleness_seconds: float,
+                 full_resync_seconds: float, memory_budget_bytes: int):
+        self.refresh_seconds = refresh_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.full_resync_seconds = full_resync_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+
+        self.films_by_id: Dict[int, FilmRecord] = {}
+        self.films_by_title: Dict[str, FilmRecord] = {}
+        self.genres_by_id: Dict[int, GenreRecord] = {}
+        self.genres_by_name: Dict[str, GenreRecord] = {}
+        self.film_ids_by_genre: Dict[int, Set[int]] = {}
+        self.memory_bytes = 0
+
+        self.watermark: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.full_resync_at = 0.0
+        self.over_budget = False
+        self.resync_requested = False
+
+        # ID, о которых пришли события: перечитываются при следующем обновлении независимо от updated_at.
+        self._dirty_film_ids: Set[int] = set()
+        self._dirty_genre_ids: Set[int] = set()
+        # Удаления, пришедшие, пока идет чтение из БД: прочитанные строки этих ID уже устарели.
+        self._deleted_film_ids: Optional[Set[int]] = None
+        self._deleted_genre_ids: Optional[Set[int]] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    # Чтение
+
+    def is_fresh(self) -> bool:
+        return (
+            self.refreshed_at > 0
+            and not self.over_budget
+            and time.monotonic() - self.refreshed_at <= self.max_staleness_seconds
+        )
+
+    def _to_film(self, record: FilmRecord) -> Film:
+        genres = [
+            Genre(id=genre.id, name=genre.name)
+            for genre in (self.genres_by_id.get(genre_id) for genre_id in record.genre_ids)
+            if genre is not None
+        ]
+        return Film(
+            id=record.id,
+            title=record.title,
+            description=record.description,
+            creation_date=record.creation_date,
+            file_link=record.file_link,
+            genres=genres,
+        )
+
+    def get_film(self, title: str) -> Optional[Film]:
+        record = self.films_by_title.get(title)
+        return self._to_film(record) if record else None
+
+    def get_genre(self, name: str) -> Optional[Genre]:
+        record = self.genres_by_name.get(name)
+        return Genre(id=record.id, name=record.name) if record else None
+
+    def get_all_genres(self) -> List[Genre]:
+        return [Genre(id=g.id, name=g.name) for g in self.genres_by_id.values()]
+
+    def get_films_by_genre(self, name: str) -> Optional[List[Film]]:
+        """
+        :param name: Название жанра.
+        :return: Фильмы жанра или None, если жанра нет в снимке.
+        """
+        genre = self.genres_by_name.get(name)
+        if genre is None:
+            return None
+        film_ids = sorted(self.film_ids_by_genre.get(genre.id, ()))
+        return [self._to_film(self.films_by_id[film_id]) for film_id in film_ids]
+
+    def get_films_by_genres(self, names: List[str], match_all: bool, limit: int, offset: int) -> List[Film]:
+        """
+        Фильмы, у которых есть все (или любой) из жанров, через пересечение (объединение) множеств ID.
+
+        :param names: Названия жанров без повторов.
+        :param match_all: True — все жанры, False — любой.
+        :param limit: Размер страницы.
+        :param offset: Смещение страницы.
+        :return: Страница фильмов по возрастанию ID.
+        """
+        genre_ids = [self.genres_by_name[name].id for name in names if name in self.genres_by_name]
+        if not genre_ids or (match_all and len(genre_ids) < len(names)):
+            return []
+
+        film_sets = sorted((self.film_ids_by_genre.get(genre_id, set()) for genre_id in genre_ids), key=len)
+        if match_all:
+            # Пересечение начинается с самого маленького множества.
+            film_ids = film_sets[0].intersection(*film_sets[1:])
+        else:
+            film_ids = set().union(*film_sets)
+
+        page = heapq.nsmallest(offset + limit, film_ids)[offset:]
+        return [self._to_film(self.films_by_id[film_id]) for film_id in page]
+
+    # Изменение
+
+    def _put_genre(self, genre_id: int, name: str) -> None:
+        old = self.genres_by_id.get(genre_id)
+        if old is not None and old.name != name:
+            self.genres_by_name.pop(old.name, None)
+        record = GenreRecord(genre_id, name)
+        self.genres_by_id[genre_id] = record
+        self.genres_by_name[name] = record
+
+    def _remove_genre(self, genre_id: int) -> None:
+        record = self.genres_by_id.pop(genre_id, None)
+        if record is not None:
+            self.genres_by_name.pop(record.name, None)
+        self.film_ids_by_genre.pop(genre_id, None)
+
+    def _put_film(self, row: dict) -> None:
+        self._remove_film(row["id"])
+        record = FilmRecord(
+            row["id"],
+            row["title"],
+            row["description"],
+            row["creation_date"],
+            row["file_link"],
+            tuple(row["genre_ids"] or ()),
+        )
+        self.films_by_id[record.id] = record
+        self.films_by_title[record.title] = record
+        for genre_id in record.genre_ids:
+            self.film_ids_by_genre.setdefault(genre_id, set()).add(record.id)
+        self.memory_bytes += record.size()
+
+    def _remove_film(self, film_id: int) -> None:
+        record = self.films_by_id.pop(film_id, None)
+        if record is None:
+            return
+        if self.films_by_title.get(record.title) is record:
+            del self.films_by_title[record.title]
+        for genre_id in record.genre_ids:
+            self.film_ids_by_genre.get(genre_id, set()).discard(film_id)
+        self.memory_bytes -= record.size()
+
+    def _put_films(self, films: List[dict]) -> Optional[datetime]:
+        """
+        Кладет строки фильмов в снимок.
+
+        :return: Наибольший updated_at среди строк или None, если строк нет.
+        """
+        watermark = None
+        for film in films:
+            self._put_film(film)
+            watermark = max(watermark, film["updated_at"]) if watermark else film["updated_at"]
+        return watermark
+
+    def _clear(self) -> None:
+        self.films_by_id, self.films_by_title = {}, {}
+        self.genres_by_id, self.genres_by_name = {}, {}
+        self.film_ids_by_genre = {}
+        self.memory_bytes = 0
+
+    def _replace_with(self, other: "CatalogSnapshot") -> None:
+        self.films_by_id, self.films_by_title = other.films_by_id, other.films_by_title
+        self.genres_by_id, self.genres_by_name = other.genres_by_id, other.genres_by_name
+        self.film_ids_by_genre = other.film_ids_by_genre
+        self.memory_bytes = other.memory_bytes
+
+    def on_event(self, event: CatalogEvent) -> None:
+        # Удаления применяются сразу: их не видно по updated_at. Остальное придет
+        # со следующим обновлением, которое будится немедленно.
+        if event.kind == FILM_DELETED:
+            self._remove_film(event.film_id)
+            self._dirty_film_ids.discard(event.film_id)
+            if self._deleted_film_ids is not None:
+                self._deleted_film_ids.add(event.film_id)
+        elif event.kind == GENRE_DELETED:
+            self._remove_genre(event.genre_id)
+            self._dirty_genre_ids.discard(event.genre_id)
+            if self._deleted_genre_ids is not None:
+                self._deleted_genre_ids.add(event.genre_id)
+        elif event.kind in (FILM_UPSERTED, GENRE_LINKED, GENRE_UNLINKED):
+            self._dirty_film_ids.add(event.film_id)
+        elif event.kind == GENRE_UPSERTED:
+            self._dirty_genre_ids.add(event.genre_id)
+        elif event.kind == CATALOG_RESYNC:
+            # Флаг, а не сброс full_resync_at: иначе его перезапишет уже идущее обновление.
+            self.resync_requested = True
+        self._wakeup.set()
+
+    async def refresh(self, session_factory, full: bool = False) -> int:
+        """
+        Забирает изменения из БД.
+
+        :param session_factory: Фабрика асинхронных сессий.
+        :param full: Перечитать каталог целиком вместо чтения по watermark.
+        :return: Количество примененных строк фильмов и жанров.
+        """
+        if full or self.watermark is None:
+            return await self._refresh_full(session_factory)
+
+        since = self.watermark - _WATERMARK_OVERLAP
+        film_ids, self._dirty_film_ids = self._dirty_film_ids, set()
+        genre_ids, self._dirty_genre_ids = self._dirty_genre_ids, set()
+        self._deleted_film_ids, self._deleted_genre_ids = set(), set()
+        try:
+            async with session_factory() as session:
+                genres = await GenreRepository(session).get_genres_updated_since(since, genre_ids)
+                films = await FilmRepository(session).get_films_with_genre_ids_updated_since(since, film_ids)
+        except BaseException:
+            self._dirty_film_ids |= film_ids
+            self._dirty_genre_ids |= genre_ids
+            raise
+        finally:
+            deleted_film_ids, self._deleted_film_ids = self._deleted_film_ids, None
+            deleted_genre_ids, self._deleted_genre_ids = self._deleted_genre_ids, None
+
+        watermark = self.watermark
+        for genre in genres:
+            if genre.id not in deleted_genre_ids:
+                self._put_genre(genre.id, genre.name)
+            watermark = max(watermark, genre.updated_at)
+        for film in films:
+            if film["id"] not in deleted_film_ids:
+                self._put_film(film)
+                if self.memory_bytes > self.memory_budget_bytes:
+                    self._drop()
+                    return 0
+            watermark = max(watermark, film["updated_at"])
+
+        self._refreshed(watermark)
+        return len(genres) + len(films)
+
+    async def _refresh_full(self, session_factory) -> int:
+        # Новые словари строятся отдельно от текущих: их не трогают ни запросы, ни события.
+        # Изменения, пришедшие во время чтения, забирает следующее обновление по dirty ID,
+        # удаления применяются к новому снимку перед подменой.
+        film_ids, self._dirty_film_ids = self._dirty_film_ids, set()
+        genre_ids, self._dirty_genre_ids = self._dirty_genre_ids, set()
+        self._deleted_film_ids, self._deleted_genre_ids = set(), set()
+        fresh = CatalogSnapshot(self.refresh_seconds, self.max_staleness_seconds,
+                                self.full_resync_seconds, self.memory_budget_bytes)
+        watermark = self.watermark
+        rows = 0
+        try:
+            async with session_factory() as session:
+                genres = await GenreRepository(session).get_genres_updated_since(None)
+                for genre in genres:
+                    fresh._put_genre(genre.id, genre.name)
+                    watermark = max(watermark, genre.updated_at) if watermark else genre.updated_at
+                rows += len(genres)
+
+                batches = FilmRepository(session).stream_films_with_genre_ids(_FULL_RESYNC_BATCH)
+                try:
+                    async for batch in batches:
+                        batch_watermark = await asyncio.to_thread(fresh._put_films, batch)
+                        if batch_watermark is not None:
+                            watermark = max(watermark, batch_watermark) if watermark else batch_watermark
+                        rows += len(batch)
+                        if fresh.memory_bytes > self.memory_budget_bytes:
+                            # Остаток каталога не читается: пик памяти ограничен бюджетом и одним батчем.
+                            break
+                finally:
+                    await batches.aclose()
+        except BaseException:
+            self._dirty_film_ids |= film_ids
+            self._dirty_genre_ids |= genre_ids
+            raise
+        finally:
+            deleted_film_ids, self._deleted_film_ids = self._deleted_film_ids, None
+            deleted_genre_ids, self._deleted_genre_ids = self._deleted_genre_ids, None
+
+        self.full_resync_at = time.monotonic()
+        if fresh.memory_bytes > self.memory_budget_bytes:
+            self._drop()
+            return 0
+
+        for genre_id in deleted_genre_ids:
+            fresh._remove_genre(genre_id)
+        for film_id in deleted_film_ids:
+            fresh._remove_film(film_id)
+        self._replace_with(fresh)
+        self._refreshed(watermark)
+        return rows
+
+    def _refreshed(self, watermark: Optional[datetime]) -> None:
+        self.watermark = watermark
+        self.refreshed_at = time.monotonic()
+        if self.over_budget:
+            logger.warning("Catalog snapshot is back within memory budget: %d of %d bytes",
+                           self.memory_bytes, self.memory_budget_bytes)
+            self.over_budget = False
+
+    def _drop(self) -> None:
+        """Сбрасывает снимок, вышедший за бюджет памяти, до следующего полного перечитывания."""
+        if not self.over_budget:
+            logger.warning("Catalog snapshot exceeds memory budget of %d bytes, dropping it until the next full resync",
+                           self.memory_budget_bytes)
+        self._clear()
+        self._dirty_film_ids.clear()
+        self._dirty_genre_ids.clear()
+        self.watermark = None
+        self.refreshed_at = 0.0
+        self.over_budget = True
+
+    async def _run(self, session_factory) -> None:
+        while True:
+            try:
+                full = self.resync_requested or time.monotonic() - self.full_resync_at >= self.full_resync_seconds
+                if full:
+                    self.resync_requested = False
+                if full or not self.over_budget:
+                    await self.refresh(session_factory, full=full)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Снимок перестанет считаться свежим через max_staleness_seconds, и чтение уйдет в БД.
+                logger.exception("Catalog snapshot refresh failed")
+                self.resync_requested = self.resync_requested or full
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, session_factory) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+catalog_snapshot = CatalogSnapshot(
+    refresh_seconds=settings.CATALOG_SNAPSHOT_REFRESH_SECONDS,
+    max_staleness_seconds=settings.CATALOG_SNAPSHOT_MAX_STALENESS_SECONDS,
+    full_resync_seconds=settings.CATALOG_SNAPSHOT_FULL_RESYNC_SECONDS,
+    memory_budget_bytes=settings.CATALOG_SNAPSHOT_MEMORY_BUDGET_MB * 1024 * 1024,
+)
+catalog_events.subscribe(catalog_snapshot.on_event)
@@ -0,0 +1,284 @@
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.infrastructure.cache.CatalogEvents import (
+    CatalogEvent,
+    FILM_DELETED,
+    FILM_UPSERTED,
+    GENRE_DELETED,
+    GENRE_LINKED,
+    GENRE_UNLINKED,
+    catalog_events,
+)
+from app.infrastructure.cache.RebuildableIndex import RebuildableIndex
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+from app.infrastructure.db.models.FilmGenres import film_genres
+from app.infrastructure.db.models.FilmORM import FilmORM
+
+JACCARD = "jaccard"
+COSINE = "cosine"
+
+_WORD_BITS = 64
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_rows(words: np.ndarray) -> np.ndarray:
+    """
+    Число единичных битов в каждой строке матрицы uint64.
+
+    :param words: Матрица (n, W) uint64.
+    :return: Вектор (n,) целых.
+    """
+    if hasattr(np, "bitwise_count"):
+        if words.shape[1] == 1:
+            return np.bitwise_count(words[:, 0])
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int32)
+    # numpy < 2.0: таблица на 256 значений по байтам.
+    return _BYTE_POPCOUNT[words.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+class GenreMatrixIndex(RebuildableIndex):
+    """
+    Матрица инцидентности фильм × жанр в памяти процесса.
+
+    Жанры фильма упакованы в биты строки uint64 (64 жанра на слово), поэтому
+    пересечение с запросом для всех фильмов — это одно AND + popcount по матрице.
+    Строки удаленных фильмов обнуляются (и поэтому никогда не попадают в выдачу),
+    номера колонок удаленных жанров переиспользуются.
+    """
+
+    def __init__(self, capacity: int = 1024, session_factory=None):
+        super().__init__(session_factory)
+        self.bits = np.zeros((capacity, 1), dtype=np.uint64)
+        self.sizes = np.zeros(capacity, dtype=np.int32)
+        self.rows = 0
+
+        self.titles: List[Optional[str]] = []
+        self.row_by_film_id: Dict[int, int] = {}
+        self.row_by_title: Dict[str, int] = {}
+        self.column_by_genre_id: Dict[int, int] = {}
+        self.free_columns: List[int] = []
+
+    # Построение
+
+    def build(self, film_ids: Sequence[int], titles: Sequence[str],
+              link_film_ids: Sequence[int], link_genre_ids: Sequence[int]) -> None:
+        """
+        Строит индекс с нуля.
+
+        :param film_ids: ID фильмов.
+        :param titles: Названия фильмов в том же порядке.
+        :param link_film_ids: Колонка id_film таблицы film_genres.
+        :param link_genre_ids: Колонка id_genre таблицы film_genres.
+        """
+        film_ids = np.asarray(film_ids, dtype=np.int64)
+        link_film_ids = np.asarray(link_film_ids, dtype=np.int64)
+        link_genre_ids = np.asarray(link_genre_ids, dtype=np.int64)
+
+        genre_ids, columns = np.unique(link_genre_ids, return_inverse=True)
+        words = max(1, -(-len(genre_ids) // _WORD_BITS))
+        capacity = max(1024, len(film_ids))
+
+        self.bits = np.zeros((capacity, words), dtype=np.uint64)
+        self.sizes = np.zeros(capacity, dtype=np.int32)
+        self.rows = len(film_ids)
+
+        # Номер строки для каждой связи; связи с фильмами, которых нет в выборке, отбрасываются.
+        order = np.argsort(film_ids)
+        if len(film_ids):
+            positions = np.minimum(np.searchsorted(film_ids, link_film_ids, sorter=order), len(film_ids) - 1)
+            known = film_ids[order[positions]] == link_film_ids
+        else:
+            positions = np.zeros(len(link_film_ids), dtype=np.int64)
+            known = np.zeros(len(link_film_ids), dtype=bool)
+        link_rows = order[positions[known]]
+        columns = columns[known]
+
+        masks = np.left_shift(np.uint64(1), (columns % _WORD_BITS).astype(np.uint64))
+        np.bitwise_or.at(self.bits, (link_rows, columns // _WORD_BITS), masks)
+        self.sizes[:self.rows] = _popcount_rows(self.bits[:self.rows])
+
+        self.titles = list(titles)
+        self.row_by_film_id = {int(film_id): row for row, film_id in enumerate(film_ids)}
+        self.row_by_title = {title: row for row, title in enumerate(self.titles)}
+        self.column_by_genre_id = {int(genre_id): column for column, genre_id in enumerate(genre_ids)}
+        self.free_columns = []
+
+    def _replace_with(self, other: "GenreMatrixIndex") -> None:
+        self.bits = other.bits
+        self.sizes = other.sizes
+        self.rows = other.rows
+        self.titles = other.titles
+        self.row_by_film_id = other.row_by_film_id
+        self.row_by_title = other.row_by_title
+        self.column_by_genre_id = other.column_by_genre_id
+        self.free_columns = other.free_columns
+
+    async def _load(self, session: AsyncSession) -> "GenreMatrixIndex":
+        # Связи читаются после фильмов: связь с фильмом, которого нет в выборке, отбрасывается,
+        # а пропущенное придет событием, накопленным во время загрузки.
+        films = (await session.execute(select(FilmORM.id, FilmORM.title).order_by(FilmORM.id))).all()
+        links = (await session.execute(select(film_genres.c.id_film, film_genres.c.id_genre))).all()
+
+        fresh = GenreMatrixIndex()
+        await asyncio.to_thread(
+            fresh.build,
+            [film_id for film_id, _ in films],
+            [title for _, title in films],
+            [film_id for film_id, _ in links],
+            [genre_id for _, genre_id in links],
+        )
+        return fresh
+
+    # Инкрементальные изменения
+
+    def apply(self, event: CatalogEvent) -> None:
+        if event.kind == FILM_UPSERTED:
+            self._upsert_film(event.film_id, event.name)
+        elif event.kind == FILM_DELETED:
+            self._delete_film(event.film_id)
+        elif event.kind == GENRE_LINKED:
+            self._set_bit(event.film_id, event.genre_id, True)
+        elif event.kind == GENRE_UNLINKED:
+            self._set_bit(event.film_id, event.genre_id, False)
+        elif event.kind == GENRE_DELETED:
+            self._delete_genre(event.genre_id)
+
+    def _grow_rows(self) -> None:
+        capacity = len(self.bits) * 2
+        bits = np.zeros((capacity, self.bits.shape[1]), dtype=np.uint64)
+        bits[:self.rows] = self.bits[:self.rows]
+        self.bits = bits
+        self.sizes = np.resize(self.sizes, capacity)
+        self.sizes[self.rows:] = 0
+
+    def _upsert_film(self, film_id: int, title: str) -> None:
+        row = self.row_by_film_id.get(film_id)
+        if row is not None:
+            old_title = self.titles[row]
+            if old_title != title:
+                self.row_by_title.pop(old_title, None)
+                self.row_by_title[title] = row
+                self.titles[row] = title
+            return
+
+        if self.rows == len(self.bits):
+            self._grow_rows()
+        row = self.rows
+        self.rows += 1
+        self.titles.append(title)
+        self.row_by_film_id[film_id] = row
+        self.row_by_title[title] = row
+
+    def _delete_film(self, film_id: int) -> None:
+        row = self.row_by_film_id.pop(film_id, None)
+        if row is None:
+            return
+        self.row_by_title.pop(self.titles[row], None)
+        self.titles[row] = None
+        self.bits[row] = 0
+        self.sizes[row] = 0
+
+    def _column_for(self, genre_id: int) -> int:
+        column = self.column_by_genre_id.get(genre_id)
+        if column is not None:
+            return column
+
+        if self.free_columns:
+            column = self.free_columns.pop()
+        else:
+            column = len(self.column_by_genre_id)
+            if column >= self.bits.shape[1] * _WORD_BITS:
+                self.bits = np.hstack([self.bits, np.zeros((len(self.bits), 1), dtype=np.uint64)])
+        self.column_by_genre_id[genre_id] = column
+        return column
+
+    def _set_bit(self, film_id: int, genre_id: int, value: bool) -> None:
+        row = self.row_by_film_id.get(film_id)
+        if row is None:
+            return
+        column = self._column_for(genre_id)
+        word, mask = column // _WORD_BITS, np.uint64(1 << (column % _WORD_BITS))
+        was_set = bool(self.bits[row, word] & mask)
+        if value and not was_set:
+            self.bits[row, word] |= mask
+            self.sizes[row] += 1
+        elif not value and was_set:
+            self.bits[row, word] &= ~mask
+            self.sizes[row] -= 1
+
+    def _delete_genre(self, genre_id: int) -> None:
+        column = self.column_by_genre_id.pop(genre_id, None)
+        if column is None:
+            return
+        word, mask = column // _WORD_BITS, np.uint64(1 << (column % _WORD_BITS))
+        affected = (self.bits[:self.rows, word] & mask) != 0
+        self.bits[:self.rows, word] &= ~mask
+        self.sizes[:self.rows] -= affected
+        self.free_columns.append(column)
+
+    # Поиск
+
+    def similar(self, title: str, k: int = 10, metric: str = JACCARD) -> Optional[List[Tuple[str, float]]]:
+        """
+        Находит k фильмов, наиболее похожих по набору жанров.
+
+        :param title: Название фильма-образца.
+        :param k: Сколько фильмов вернуть.
+        :param metric: jaccard или cosine.
+        :return: Список пар (название, похожесть) по убыванию похожести или None, если фильма нет в индексе.
+        """
+        row = self.row_by_title.get(title)
+        if row is None:
+            return None
+
+        n = self.rows
+        query_size = int(self.sizes[row])
+        if query_size == 0 or k <= 0:
+            return []
+
+        # Похожесть зависит только от пары (пересечение, число жанров фильма), а таких пар
+        # немного. Поэтому строки группируются по паре через bincount, порог k-го результата
+        # считается на группах, и полная сортировка миллиона оценок не нужна.
+        intersection = _popcount_rows(self.bits[:n] & self.bits[row]).astype(np.int32)
+        stride = self.bits.shape[1] * _WORD_BITS + 1
+        combo = intersection * stride + self.sizes[:n]
+        counts = np.bincount(combo)
+        counts[combo[row]] -= 1
+
+        combos = np.flatnonzero(counts)
+        combo_scores = self._scores(combos // stride, combos % stride, query_size, metric)
+        combos, combo_scores = combos[combo_scores > 0], combo_scores[combo_scores > 0]
+        if not len(combos):
+            return []
+
+        order = np.argsort(-combo_scores, kind="stable")
+        cumulative = np.cumsum(counts[combos[order]])
+        threshold = combo_scores[order[min(np.searchsorted(cumulative, k), len(order) - 1)]]
+
+        score_table = np.zeros(len(counts), dtype=np.float32)
+        score_table[combos] = combo_scores
+        row_scores = score_table[combo]
+        row_scores[row] = 0
+        candidates = np.flatnonzero(row_scores >= threshold)
+        candidates = candidates[np.argsort(-row_scores[candidates], kind="stable")[:k]]
+
+        return [(self.titles[i], float(row_scores[i])) for i in candidates]
+
+    @staticmethod
+    def _scores(intersection: np.ndarray, sizes: np.ndarray, query_size: int, metric: str) -> np.ndarray:
+        intersection = intersection.astype(np.float32)
+        sizes = sizes.astype(np.float32)
+        if metric == COSINE:
+            denominator = np.sqrt(sizes * np.float32(query_size))
+        else:
+            denominator = sizes + np.float32(query_size) - intersection
+        return np.divide(intersection, denominator, out=np.zeros(len(intersection), dtype=np.float32),
+                         where=denominator > 0)
+
+genre_matrix_index = GenreMatrixIndex(session_factory=AsyncSessionLocal)
+catalog_events.subscribe(genre_matrix_index.on_event)
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.cache.CatalogEvents import CATALOG_RESYNC, CatalogEvent
+
+logger = logging.getLogger(__name__)
+
+
+class RebuildableIndex:
+    """
+    Основа индексов каталога в памяти процесса, которые строятся из БД и затем
+    обновляются событиями catalog_events.
+
+    Индекс загружается при первом обращении (ensure_loaded). По CATALOG_RESYNC (изменения
+    могли быть пропущены) он перестраивается в фоне: новый экземпляр читается из БД
+    собственной сессией и строится в отдельном потоке, а до подмены запросы обслуживает
+    старый. События, пришедшие во время загрузки, применяются и к старому индексу, и
+    (после построения) к новому, поэтому подмена ничего не теряет.
+
+    Наследник реализует _load (чтение и построение нового экземпляра), apply (событие,
+    кроме CATALOG_RESYNC) и _replace_with (подмена содержимого).
+    """
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+
+        self.loaded = False
+        # Пришел CATALOG_RESYNC, а индекс еще не перестроен.
+        self.stale = False
+        self._load_lock = asyncio.Lock()
+        self._pending: Optional[List[CatalogEvent]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    async def _load(self, session: AsyncSession) -> "RebuildableIndex":
+        """Читает каталог и строит новый экземпляр, не блокируя event loop."""
+        raise NotImplementedError
+
+    def apply(self, event: CatalogEvent) -> None:
+        raise NotImplementedError
+
+    def _replace_with(self, other: "RebuildableIndex") -> None:
+        raise NotImplementedError
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """
+        Загружает индекс из БД при первом обращении; события, пришедшие во время
+        загрузки, применяются после нее.
+
+        :param session: Сессия БД.
+        """
+        if self.loaded:
+            return
+
+        async with self._load_lock:
+            if self.loaded:
+                return
+
+            self._pending = []
+            try:
+                resync = self._swap(await self._load(session))
+                self.loaded = True
+            finally:
+                self._pending = None
+        if resync:
+            self._request_rebuild()
+
+    def _swap(self, fresh: "RebuildableIndex") -> bool:
+        """
+        Применяет к новому экземпляру события, пришедшие во время загрузки, и подменяет им текущий.
+
+        :return: True, если среди событий был CATALOG_RESYNC и прочитанные данные могут быть неполными.
+        """
+        resync = False
+        for event in self._pending:
+            if event.kind == CATALOG_RESYNC:
+                resync = True
+            else:
+                fresh.apply(event)
+        self._replace_with(fresh)
+        return resync
+
+    # Инкрементальные изменения
+
+    def on_event(self, event: CatalogEvent) -> None:
+        if self._pending is not None:
+            self._pending.append(event)
+        if not self.loaded:
+            return
+        if event.kind == CATALOG_RESYNC:
+            self._request_rebuild()
+        else:
+            self.apply(event)
+
+    def _request_rebuild(self) -> None:
+        if self.session_factory is None:
+            # Без фабрики сессий индекс перечитывается при следующем обращении.
+            self.loaded = False
+            return
+        self.stale = True
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = asyncio.get_running_loop().create_task(self._rebuild())
+
+    async def _rebuild(self) -> None:
+        async with self._load_lock:
+            # CATALOG_RESYNC во время перестроения означает, что и она могла прочитать
+            # неполные данные, — тогда индекс перестраивается еще раз.
+            while self.stale and self.loaded:
+                self.stale = False
+                self._pending = []
+                try:
+                    async with self.session_factory() as session:
+                        fresh = await self._load(session)
+                except Exception:
+                    logger.exception("%s rebuild failed, reloading on next request", type(self).__name__)
+                    self.loaded = False
+                else:
+                    self._swap(fresh)
+                finally:
+                    self._pending = None
+
+    async def wait_rebuilt(self) -> None:
+        """Дожидается окончания фонового перестроения (для тестов и бенчмарков)."""
+        if self._rebuild_task is not None:
+            await asyncio.shield(self._rebuild_task)
@@ -0,0 +1,257 @@
+import asyncio
+import heapq
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.infrastructure.cache.CatalogEvents import CatalogEvent, FILM_DELETED, FILM_UPSERTED, catalog_events
+from app.infrastructure.cache.RebuildableIndex import RebuildableIndex
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+from app.infrastructure.db.Settings import settings
+from app.infrastructure.db.models.FilmORM import FilmORM
+
+ALPHABETICAL = "alphabetical"
+SHORTEST = "shortest"
+NEWEST = "newest"
+RANKINGS = (ALPHABETICAL, SHORTEST, NEWEST)
+
+MAX_LIMIT = 50
+
+_WHITESPACE = re.compile(r"\s+")
+# Больше любого символа, который может встретиться в нормализованном названии.
+_PREFIX_END = "\U0010ffff"
+
+# Сортировка и сборка словарей одним вызовом не отпускают GIL: при построении в отдельном
+# потоке event loop стоял бы все это время. Кусками по _BUILD_CHUNK паузы не превышают десятков мс.
+_BUILD_CHUNK = 20000
+
+
+def normalize_title(title: str) -> str:
+    """Регистр, диакритика, «ё» и повторные пробелы не влияют на поиск."""
+    title = unicodedata.normalize("NFKD", title.casefold().replace("ё", "е"))
+    title = "".join(ch for ch in title if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", title).strip()
+
+
+def _rank_key(ranking: str, key: str, film_id: int) -> tuple:
+    if ranking == SHORTEST:
+        return len(key), key, film_id
+    if ranking == NEWEST:
+        return (-film_id,)
+    return key, film_id
+
+
+class TitlePrefixIndex(RebuildableIndex):
+    """
+    Индекс названий фильмов для автодополнения по префиксу.
+
+    Нормализованные названия хранятся в отсортированном массиве, совпадения с префиксом —
+    непрерывный диапазон, который находится двумя bisect. Порядок alphabetical совпадает
+    с порядком массива. Для shortest и newest диапазон до scan_limit названий ранжируется
+    на лету, а топ MAX_LIMIT для всех более широких (коротких) префиксов считается при
+    построении, снизу вверх из топов дочерних префиксов, и поддерживается инкрементально.
+    Поэтому время подсказки не зависит от того, запрашивался ли префикс раньше.
+    """
+
+    def __init__(self, scan_limit: int = 1000, session_factory=None):
+        super().__init__(session_factory)
+        self.scan_limit = scan_limit
+
+        self.keys: List[str] = []
+        self.film_ids = array("q")
+        self.key_by_film_id: Dict[int, str] = {}
+        self.title_by_film_id: Dict[int, str] = {}
+        # Топы широких префиксов: (префикс, порядок) -> [(ключ ранжирования, ID)] по возрастанию
+        # ключа. Список — точный топ первых len(top) названий префикса; после удалений он короче MAX_LIMIT.
+        self.top: Dict[Tuple[str, str], List[tuple]] = {}
+
+    # Построение
+
+    def build(self, film_ids: Sequence[int], titles: Sequence[str]) -> None:
+        """
+        Строит индекс с нуля.
+
+        :param film_ids: ID фильмов.
+        :param titles: Названия фильмов в том же порядке.
+        """
+        keys = [normalize_title(title) for title in titles]
+        n = len(keys)
+        # Отсортированные куски сливаются heapq.merge, который написан на Python и отпускает GIL.
+        runs = [
+            sorted(zip(keys[start:start + _BUILD_CHUNK], film_ids[start:start + _BUILD_CHUNK]))
+            for start in range(0, n, _BUILD_CHUNK)
+        ]
+        merged = list(heapq.merge(*runs))
+
+        self.keys = [key for key, _ in merged]
+        self.film_ids = array("q", (film_id for _, film_id in merged))
+        self.key_by_film_id = {}
+        self.title_by_film_id = {}
+        for start in range(0, n, _BUILD_CHUNK):
+            chunk = film_ids[start:start + _BUILD_CHUNK]
+            self.key_by_film_id.update(zip(chunk, keys[start:start + _BUILD_CHUNK]))
+            self.title_by_film_id.update(zip(chunk, titles[start:start + _BUILD_CHUNK]))
+        self.top = {}
+        self._collect_tops("", 0, len(self.keys))
+
+    def _collect_tops(self, prefix: str, lo: int, hi: int) -> Tuple[List[tuple], List[tuple]]:
+        """
+        Топы shortest и newest диапазона [lo, hi) названий с префиксом; топы широких
+        диапазонов сохраняются в self.top.
+        """
+        if hi - lo <= self.scan_limit:
+            return self._rank(lo, hi, SHORTEST, MAX_LIMIT), self._rank(lo, hi, NEWEST, MAX_LIMIT)
+
+        # Диапазон делится по следующему символу; названия, равные префиксу, идут первыми.
+        depth = len(prefix)
+        position = lo
+        while position < hi and len(self.keys[position]) == depth:
+            position += 1
+        shortest = [self._rank(lo, position, SHORTEST, MAX_LIMIT)]
+        newest = [self._rank(lo, position, NEWEST, MAX_LIMIT)]
+        while position < hi:
+            child = prefix + self.keys[position][depth]
+            end = bisect_left(self.keys, child + _PREFIX_END, position, hi)
+            child_shortest, child_newest = self._collect_tops(child, position, end)
+            shortest.append(child_shortest)
+            newest.append(child_newest)
+            position = end
+
+        tops = list(islice(heapq.merge(*shortest), MAX_LIMIT)), list(islice(heapq.merge(*newest), MAX_LIMIT))
+        self.top[(prefix, SHORTEST)], self.top[(prefix, NEWEST)] = tops
+        return tops
+
+    def _replace_with(self, other: "TitlePrefixIndex") -> None:
+        self.keys = other.keys
+        self.film_ids = other.film_ids
+        self.key_by_film_id = other.key_by_film_id
+        self.title_by_film_id = other.title_by_film_id
+        self.top = other.top
+
+    async def _load(self, session: AsyncSession) -> "TitlePrefixIndex":
+        # Построение на миллионе названий занимает секунды, поэтому идет в отдельном потоке.
+        films = (await session.execute(select(FilmORM.id, FilmORM.title))).all()
+        fresh = TitlePrefixIndex(self.scan_limit)
+        await asyncio.to_thread(fresh.build, [film_id for film_id, _ in films], [title for _, title in films])
+        return fresh
+
+    # Инкрементальные изменения
+
+    def apply(self, event: CatalogEvent) -> None:
+        if event.kind == FILM_UPSERTED:
+            if self.key_by_film_id.get(event.film_id) == normalize_title(event.name):
+                self.title_by_film_id[event.film_id] = event.name
+                return
+            self._delete_film(event.film_id)
+            self._insert_film(event.film_id, event.name)
+        elif event.kind == FILM_DELETED:
+            self._delete_film(event.film_id)
+
+    def _position(self, key: str, film_id: int) -> int:
+        # Внутри одинаковых названий записи упорядочены по ID.
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + "\0", lo)
+        while lo < hi and self.film_ids[lo] < film_id:
+            lo += 1
+        return lo
+
+    def _insert_film(self, film_id: int, title: str) -> None:
+        key = normalize_title(title)
+        position = self._position(key, film_id)
+        self.keys.insert(position, key)
+        self.film_ids.insert(position, film_id)
+        self.key_by_film_id[film_id] = key
+        self.title_by_film_id[film_id] = title
+
+        for (_, ranking), top in self._prefix_tops(key):
+            # За последним элементом топа могут быть неизвестные названия, поэтому вставка
+            # только перед ним: иначе топ перестанет быть точным.
+            rank_key = _rank_key(ranking, key, film_id)
+            if top and rank_key < top[-1][0]:
+                top.insert(bisect_left(top, (rank_key,)), (rank_key, film_id))
+                del top[MAX_LIMIT:]
+
+    def _delete_film(self, film_id: int) -> None:
+        key = self.key_by_film_id.pop(film_id, None)
+        if key is None:
+            return
+        del self.title_by_film_id[film_id]
+        position = self._position(key, film_id)
+        del self.keys[position]
+        del self.film_ids[position]
+
+        # Без удаленного фильма топ остается точным, только на один элемент короче;
+        # пересчитывается он, лишь когда станет короче запрошенного limit.
+        for (_, ranking), top in self._prefix_tops(key):
+            position = bisect_left(top, (_rank_key(ranking, key, film_id),))
+            if position < len(top) and top[position][1] == film_id:
+                del top[position]
+
+    def _prefix_tops(self, key: str) -> List[Tuple[Tuple[str, str], List[tuple]]]:
+        """Топы всех широких префиксов названия."""
+        if not self.top:
+            return []
+        tops = []
+        for length in range(len(key) + 1):
+            for ranking in (SHORTEST, NEWEST):
+                entry = (key[:length], ranking)
+                top = self.top.get(entry)
+                if top is not None:
+                    tops.append((entry, top))
+        return tops
+
+    # Поиск
+
+    def complete(self, prefix: str, limit: int = 10, ranking: str = ALPHABETICAL) -> List[str]:
+        """
+        Названия фильмов, начинающиеся с префикса.
+
+        :param prefix: Префикс названия (регистр и диакритика не учитываются).
+        :param limit: Сколько названий вернуть, не больше MAX_LIMIT.
+        :param ranking: alphabetical, shortest (короткие названия первыми) или newest (новые фильмы первыми).
+        :return: Список названий.
+        :raises ValueError: Если порядок неизвестен.
+        """
+        if ranking not in RANKINGS:
+            raise ValueError(f"Unknown ranking {ranking!r}, expected one of {RANKINGS}")
+        prefix = normalize_title(prefix)
+        limit = min(limit, MAX_LIMIT)
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _PREFIX_END, lo)
+
+        if ranking == ALPHABETICAL:
+            film_ids = self.film_ids[lo:min(hi, lo + limit)]
+        elif hi - lo <= self.scan_limit:
+            film_ids = [film_id for _, film_id in self._rank(lo, hi, ranking, limit)]
+        else:
+            film_ids = [film_id for _, film_id in self._top(prefix, ranking, lo, hi, limit)[:limit]]
+
+        return [self.title_by_film_id[film_id] for film_id in film_ids]
+
+    def _rank(self, lo: int, hi: int, ranking: str, limit: int) -> List[tuple]:
+        """Топ диапазона в виде пар (ключ ранжирования, ID); кортежи для сравнения собираются в zip/map."""
+        keys, film_ids = self.keys[lo:hi], self.film_ids[lo:hi]
+        if ranking == NEWEST:
+            return [((-film_id,), film_id) for film_id in heapq.nlargest(limit, film_ids)]
+        top = heapq.nsmallest(limit, zip(map(len, keys), keys, film_ids))
+        return [(rank_key, rank_key[2]) for rank_key in top]
+
+    def _top(self, prefix: str, ranking: str, lo: int, hi: int, limit: int) -> List[tuple]:
+        # Топ пересчитывается, только если префикс стал широким после построения или
+        # после удалений в топе осталось меньше limit названий.
+        entry = (prefix, ranking)
+        top = self.top.get(entry)
+        if top is None or len(top) < min(limit, hi - lo):
+            top = self._rank(lo, hi, ranking, MAX_LIMIT)
+            self.top[entry] = top
+        return top
+
+
+title_prefix_index = TitlePrefixIndex(scan_limit=settings.AUTOCOMPLETE_SCAN_LIMIT, session_factory=AsyncSessionLocal)
+catalog_events.subscribe(title_prefix_index.on_event)
@@ -0,0 +1,32 @@
+from collections import OrderedDict
+from typing import Optional
+
+from app.domain.models.VideoIndex import VideoIndex
+from app.infrastructure.db.Settings import settings
+
+
+class VideoIndexCache:
+    """
+    LRU-кэш индексов ключевых кадров, чтобы перемотка не ходила ни в БД, ни в S3.
+
+    Индекс двухчасового фильма с ключевым кадром раз в 2 секунды — около 60 КБ.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, VideoIndex]" = OrderedDict()
+
+    def get(self, object_name: str) -> Optional[VideoIndex]:
+        index = self.entries.get(object_name)
+        if index is not None:
+            self.entries.move_to_end(object_name)
+        return index
+
+    def put(self, index: VideoIndex) -> None:
+        self.entries[index.object_name] = index
+        self.entries.move_to_end(index.object_name)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+video_index_cache = VideoIndexCache(settings.VIDEO_INDEX_CACHE_SIZE)
@@ -1,10 +1,44 @@
+import time
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.infrastructure.db.Settings import get_db_url
+from app.infrastructure.db.QueryLog import query_log
+from app.infrastructure.db.Settings import get_db_url, settings
+from app.infrastructure.metrics.Metrics import DB_POOL_WAIT, registry
 
 DATABASE_URL = get_db_url()
 
-async_engine = create_async_engine(DATABASE_URL, echo=True)
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий ожидание соединения (включая открытие нового в overflow)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+async_engine = create_async_engine(
+    DATABASE_URL,
+    echo=settings.DB_ECHO,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    poolclass=MeteredAsyncQueuePool,
+)
+registry.callback(
+    "db_pool_connections", "Connections of this process's pool by state.", ("state",),
+    lambda: [
+        (("checked_out",), async_engine.pool.checkedout()),
+        (("idle",), async_engine.pool.checkedin()),
+        (("overflow",), max(0, async_engine.pool.overflow())),
+    ],
+)
+if settings.QUERY_LOG_ENABLED:
+    query_log.install(async_engine)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=async_engine,
@@ -14,4 +48,4 @@ AsyncSessionLocal = async_sessionmaker(
 
 async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -1,54 +1,112 @@
-import boto3
-from botocore.exceptions import NoCredentialsError
-from fastapi.responses import StreamingResponse
-from io import BytesIO
-
-from app.infrastructure.db.Settings import settings
-
-
-def get_s3_client():
-    """Создает и возвращает клиента S3."""
-    return boto3.client(
-        's3',
-        aws_access_key_id=settings.S3_ACCESS_KEY,
-        aws_secret_access_key=settings.S3_SECRET_KEY,
-        region_name=settings.S3_REGION_NAME
-    )
-
-
-def upload_to_s3(file_path, bucket_name, object_name):
-    """
-    Загружает файл в S3 (или MinIO) в указанный бакет и с указанным именем объекта.
-
-    :param file_path: Путь к локальному файлу, который нужно загрузить.
-    :param bucket_name: Название бакета в S3.
-    :param object_name: Имя объекта (файла) в S3.
-    """
-    try:
-        s3 = get_s3_client()
-
-        if s3 is None:
-            print("S3 client initialization failed.")
-            return
-
-        # Загружаем файл в S3
-        s3.upload_file(file_path, bucket_name, object_name)
-        print(f"File uploaded successfully to {bucket_name}/{object_name}")
-    except FileNotFoundError:
-        print(f"The file {file_path} was not found.")
-    except NoCredentialsError:
-        print("Credentials not available.")
-    except Exception as e:
-        print(f"An error occurred: {str(e)}")
-
-def get_video_from_s3(bucket_name: str, file_name: str):
-    """Получает видеофайл из S3."""
-    s3_client = get_s3_client()
-    
-    try:
-        file_obj = s3_client.get_object(Bucket=bucket_name, Key=file_name)
-        return file_obj['Body']
-    except NoCredentialsError:
-        raise ValueError("Credentials for S3 not found")
-    except Exception as e:
-        raise ValueError(f"Error retrieving video from S3: {e}")
\ No newline at end of file
+import os
+import time
+from typing import Iterator, Tuple
+
+import boto3
+from botocore.exceptions import NoCredentialsError
+from fastapi.responses import StreamingResponse
+from io import BytesIO
+
+from app.infrastructure.db.Settings import settings
+from app.infrastructure.metrics.Metrics import S3_ERRORS, S3_STREAMED_BYTES, S3_UPLOADED_BYTES, S3_UPLOAD_DURATION
+
+# Размер чанка при стриминге из S3 (итерация по телу ответа boto3 по умолчанию идет по 1 КБ).
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+def get_s3_client():
+    """Создает и возвращает клиента S3."""
+    return boto3.client(
+        's3',
+        aws_access_key_id=settings.S3_ACCESS_KEY,
+        aws_secret_access_key=settings.S3_SECRET_KEY,
+        region_name=settings.S3_REGION_NAME
+    )
+
+
+def upload_to_s3(file_path, bucket_name, object_name):
+    """
+    Загружает файл в S3 (или MinIO) в указанный бакет и с указанным именем объекта.
+
+    :param file_path: Путь к локальному файлу, который нужно загрузить.
+    :param bucket_name: Название бакета в S3.
+    :param object_name: Имя объекта (файла) в S3.
+    """
+    try:
+        s3 = get_s3_client()
+
+        if s3 is None:
+            print("S3 client initialization failed.")
+            return
+
+        # Загружаем файл в S3
+        started = time.perf_counter()
+        s3.upload_file(file_path, bucket_name, object_name)
+        S3_UPLOAD_DURATION.observe(time.perf_counter() - started)
+        S3_UPLOADED_BYTES.inc(os.path.getsize(file_path))
+        print(f"File uploaded successfully to {bucket_name}/{object_name}")
+    except FileNotFoundError as e:
+        S3_ERRORS.inc(labels=("upload", type(e).__name__))
+        print(f"The file {file_path} was not found.")
+    except NoCredentialsError as e:
+        S3_ERRORS.inc(labels=("upload", type(e).__name__))
+        print("Credentials not available.")
+    except Exception as e:
+        S3_ERRORS.inc(labels=("upload", type(e).__name__))
+        print(f"An error occurred: {str(e)}")
+
+
+def _stream_body(body):
+    """Отдает тело объекта S3 чанками по STREAM_CHUNK_SIZE и считает переданные байты."""
+    try:
+        for chunk in body.iter_chunks(STREAM_CHUNK_SIZE):
+            S3_STREAMED_BYTES.inc(len(chunk))
+            yield chunk
+    except Exception as e:
+        S3_ERRORS.inc(labels=("stream", type(e).__name__))
+        raise
+    finally:
+        body.close()
+
+def get_video_from_s3(bucket_name: str, file_name: str, start_byte: int = 0):
+    """
+    Получает видеофайл из S3.
+
+    :param start_byte: Смещение, с которого читать объект (ranged GET), 0 — весь файл.
+    """
+    s3_client = get_s3_client()
+    
+    try:
+        if start_byte:
+            file_obj = s3_client.get_object(Bucket=bucket_name, Key=file_name, Range=f"bytes={start_byte}-")
+        else:
+            file_obj = s3_client.get_object(Bucket=bucket_name, Key=file_name)
+        return _stream_body(file_obj['Body'])
+    except NoCredentialsError as e:
+        S3_ERRORS.inc(labels=("get", type(e).__name__))
+        raise ValueError("Credentials for S3 not found")
+    except Exception as e:
+        S3_ERRORS.inc(labels=("get", type(e).__name__))
+        raise ValueError(f"Error retrieving video from S3: {e}")
+
+
+def get_video_range_from_s3(bucket_name: str, file_name: str, start_byte: int) -> Tuple[Iterator[bytes], int]:
+    """
+    Получает часть видеофайла из S3 начиная со смещения (ranged GET).
+
+    :param start_byte: Смещение первого байта.
+    :return: Итератор чанков и полный размер объекта (из Content-Range ответа S3).
+    """
+    s3_client = get_s3_client()
+
+    try:
+        file_obj = s3_client.get_object(Bucket=bucket_name, Key=file_name, Range=f"bytes={start_byte}-")
+        # Content-Range: bytes <начало>-<конец>/<размер>
+        size = int(file_obj["ContentRange"].rsplit("/", 1)[1])
+        return _stream_body(file_obj['Body']), size
+    except NoCredentialsError as e:
+        S3_ERRORS.inc(labels=("get", type(e).__name__))
+        raise ValueError("Credentials for S3 not found")
+    except Exception as e:
+        S3_ERRORS.inc(labels=("get", type(e).__name__))
+        raise ValueError(f"Error retrieving video from S3: {e}")
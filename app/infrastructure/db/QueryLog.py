@@ -0,0 +1,238 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.infrastructure.db.Settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUERIES_HEADER = b"x-db-queries"
+TIME_HEADER = b"x-db-time-ms"
+
+_PARAMS_REPR_LIMIT = 500
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$\d+(?:::[\w ]+?(?:\[\])?)?(?=[,)\s]|$)|%\(\w+\)s|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+# SELECT, который при повторном выполнении меняет состояние: блокировки строк, последовательности,
+# уведомления, advisory-блокировки.
+_SIDE_EFFECTS = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b"
+    r"|\b(?:nextval|setval|pg_notify|pg_(?:try_)?advisory_\w*)\s*\(",
+    re.IGNORECASE,
+)
+
+
+def normalize(statement: str) -> str:
+    """
+    Приводит SQL к шаблону: литералы и параметры заменяются на ?, списки IN сворачиваются.
+    По шаблону запросы группируются для поиска N+1 и ограничения частоты логирования.
+    """
+    statement = _STRING.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _LIST.sub("(?...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def explain_mode(template: str) -> Optional[str]:
+    """
+    Как снимать план запроса.
+
+    :param template: Нормализованный запрос.
+    :return: "analyze" — EXPLAIN ANALYZE (только простой SELECT без побочных эффектов),
+        "plan" — EXPLAIN без выполнения (WITH, SELECT с побочными эффектами, изменения данных),
+        None — план не снимается.
+    """
+    keyword = template.lstrip("( ").split(" ", 1)[0].upper()
+    if keyword not in _EXPLAINABLE:
+        return None
+    if keyword == "SELECT" and not _SIDE_EFFECTS.search(template):
+        return "analyze"
+    return "plan"
+
+
+class RequestQueryStats:
+    """Счетчики SQL-запросов одного HTTP-запроса."""
+
+    __slots__ = ("count", "total_seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements: Counter = Counter()
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+class RateLimiter:
+    """Пропускает не больше одного события на ключ за interval секунд и считает пропущенные."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._suppressed: Counter = Counter()
+
+    def allow(self, key: str) -> Optional[int]:
+        """
+        :return: Число пропущенных с прошлого раза событий или None, если событие нужно пропустить.
+        """
+        now = time.monotonic()
+        if now - self._last.get(key, float("-inf")) < self.interval:
+            self._suppressed[key] += 1
+            return None
+        self._last[key] = now
+        return self._suppressed.pop(key, 0)
+
+
+class QueryLog:
+    """
+    Хуки движка SQLAlchemy: время каждого запроса, учет запросов в рамках HTTP-запроса
+    и журнал медленных запросов с планом EXPLAIN.
+
+    EXPLAIN ANALYZE повторно выполняет запрос, поэтому снимается только для простого SELECT
+    (см. explain_mode); для WITH, SELECT ... FOR UPDATE, nextval() и изменений данных снимается
+    план без выполнения, для executemany и серверных курсоров план не снимается.
+    Журнал медленных запросов и EXPLAIN ограничены по частоте для каждого шаблона запроса.
+    """
+
+    def __init__(self, slow_seconds: float, explain: bool, log_interval: float, n_plus_one_threshold: int):
+        self.slow_seconds = slow_seconds
+        self.explain = explain
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._slow_limiter = RateLimiter(log_interval)
+        self._n_plus_one_limiter = RateLimiter(log_interval)
+
+    def install(self, engine: AsyncEngine) -> None:
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @staticmethod
+    def _handle_error(exception_context):
+        # При ошибке запроса after_cursor_execute не вызывается: метка начала снимается здесь,
+        # иначе она останется в info соединения, которое вернется в пул.
+        conn = exception_context.connection
+        if conn is not None and exception_context.execution_context is not None:
+            started = conn.info.get("query_started")
+            if started:
+                started.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        template = normalize(statement)
+
+        stats = _current.get()
+        if stats is not None:
+            stats.count += 1
+            stats.total_seconds += elapsed
+            stats.statements[template] += 1
+
+        if elapsed < self.slow_seconds:
+            return
+        suppressed = self._slow_limiter.allow(template)
+        if suppressed is None:
+            return
+
+        plan = None
+        streaming = context is not None and context.execution_options.get("stream_results", False)
+        mode = explain_mode(template)
+        if self.explain and mode and not executemany and not streaming and conn.dialect.name == "postgresql":
+            plan = self._explain(conn, statement, parameters, analyze=mode == "analyze")
+
+        logger.warning(
+            "Slow query %.1f ms (%d similar suppressed): %s\nParameters: %s%s",
+            elapsed * 1000, suppressed, template, repr(parameters)[:_PARAMS_REPR_LIMIT],
+            f"\n{plan}" if plan else "",
+        )
+
+    @staticmethod
+    def _explain(conn, statement, parameters, analyze: bool) -> Optional[str]:
+        # Отдельный курсор того же DBAPI-соединения: результат исходного запроса еще не прочитан,
+        # а план снимается в той же транзакции и с теми же параметрами. Точка сохранения
+        # откатывается всегда, чтобы ошибка EXPLAIN не прервала транзакцию запроса.
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT query_log_explain")
+            try:
+                options = "(ANALYZE, BUFFERS) " if analyze else ""
+                cursor.execute(f"EXPLAIN {options}{statement}", parameters)
+                return "\n".join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_log_explain")
+                cursor.execute("RELEASE SAVEPOINT query_log_explain")
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+        finally:
+            cursor.close()
+
+    def report(self, method: str, path: str, stats: RequestQueryStats) -> None:
+        """Предупреждает о шаблонах запросов, повторенных в рамках одного HTTP-запроса (N+1)."""
+        for template, count in stats.statements.items():
+            if count < self.n_plus_one_threshold:
+                continue
+            suppressed = self._n_plus_one_limiter.allow(f"{method} {path} {template}")
+            if suppressed is not None:
+                logger.warning(
+                    "Possible N+1 in %s %s: %d executions of %s (%d similar suppressed)",
+                    method, path, count, template, suppressed,
+                )
+
+
+query_log = QueryLog(
+    slow_seconds=settings.QUERY_LOG_SLOW_MS / 1000,
+    explain=settings.QUERY_LOG_EXPLAIN,
+    log_interval=settings.QUERY_LOG_INTERVAL_SECONDS,
+    n_plus_one_threshold=settings.QUERY_LOG_N_PLUS_ONE_THRESHOLD,
+)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI-middleware, считающее SQL-запросы и время в БД для каждого HTTP-запроса.
+
+    Заголовки x-db-queries и x-db-time-ms отражают запросы до начала ответа; запросы,
+    выполненные во время стриминга тела, попадают только в проверку N+1.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (QUERIES_HEADER, str(stats.count).encode()),
+                    (TIME_HEADER, f"{stats.total_seconds * 1000:.1f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            query_log.report(scope["method"], scope["path"], stats)
@@ -1,4 +1,6 @@
 import os
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -9,6 +11,80 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
 
+    # Параметры пула соединений (на один процесс; лаунчер делит общий бюджет между воркерами)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 30.0
+
+    # Логирование всех SQL-запросов движком (дорого под нагрузкой, только для отладки)
+    DB_ECHO: bool = False
+
+    # Учет SQL-запросов на HTTP-запрос, журнал медленных запросов с EXPLAIN и поиск N+1
+    QUERY_LOG_ENABLED: bool = True
+    QUERY_LOG_SLOW_MS: float = 200.0
+    QUERY_LOG_EXPLAIN: bool = True
+    QUERY_LOG_INTERVAL_SECONDS: float = 60.0
+    QUERY_LOG_N_PLUS_ONE_THRESHOLD: int = 10
+
+    # Admission control: лимит одновременных запросов и длина очереди для каждого класса маршрутов
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_CHEAP_READ_LIMIT: int = 32
+    ADMISSION_CHEAP_READ_QUEUE: int = 128
+    ADMISSION_HEAVY_LIST_LIMIT: int = 2
+    ADMISSION_HEAVY_LIST_QUEUE: int = 8
+    ADMISSION_WRITE_LIMIT: int = 4
+    ADMISSION_WRITE_QUEUE: int = 32
+    ADMISSION_VIDEO_LIMIT: int = 64
+    ADMISSION_VIDEO_QUEUE: int = 16
+    ADMISSION_EXPORT_LIMIT: int = 1
+    ADMISSION_EXPORT_QUEUE: int = 0
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_RETRY_AFTER: int = 1
+
+    # Снимок каталога в памяти процесса (CatalogSnapshot)
+    CATALOG_SNAPSHOT_ENABLED: bool = False
+    CATALOG_SNAPSHOT_REFRESH_SECONDS: float = 2.0
+    CATALOG_SNAPSHOT_MAX_STALENESS_SECONDS: float = 30.0
+    CATALOG_SNAPSHOT_FULL_RESYNC_SECONDS: float = 600.0
+    CATALOG_SNAPSHOT_MEMORY_BUDGET_MB: int = 512
+
+    # Межпроцессная инвалидация кэшей каталога: репозитории отправляют NOTIFY в транзакции изменения,
+    # каждый процесс держит отдельное от пула LISTEN-соединение (CatalogNotifications)
+    CATALOG_NOTIFY_ENABLED: bool = True
+    CATALOG_NOTIFY_CHANNEL: str = "catalog_changes"
+    CATALOG_LISTEN_PING_SECONDS: float = 10.0
+    CATALOG_LISTEN_RECONNECT_MAX_SECONDS: float = 30.0
+
+    # Токен админских эндпоинтов /admin (заголовок x-admin-token); пустой — эндпоинты отключены
+    ADMIN_TOKEN: str = ""
+
+    # Профилирование памяти (tracemalloc): пик аллокаций на запрос и снимки через /admin/memory
+    MEMORY_PROFILING_ENABLED: bool = False
+    MEMORY_PROFILING_FRAMES: int = 10
+    MEMORY_PROFILING_LOG_THRESHOLD_MB: float = 64.0
+
+    # Метрики Prometheus (/metrics). Каталог для выгрузок воркеров задает лаунчер app.scripts.serve
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROCESS_DIR: str = ""
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Сэмплирующий профилировщик запросов: доля запросов и/или подписанный заголовок x-profile-token
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_SECRET: str = ""
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_FORMAT: str = "speedscope"
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 100
+
+    # Автодополнение названий фильмов (TitlePrefixIndex): порядок по умолчанию и размер диапазона,
+    # который ранжируется на лету (для более широких префиксов топы считаются при построении)
+    AUTOCOMPLETE_RANKING: Literal["alphabetical", "shortest", "newest"] = "shortest"
+    AUTOCOMPLETE_SCAN_LIMIT: int = 1000
+
+    # Количество индексов ключевых кадров видео в памяти процесса
+    VIDEO_INDEX_CACHE_SIZE: int = 1024
+
     # Параметры для S3
     S3_BUCKET_NAME: str
     S3_ACCESS_KEY: str
@@ -22,4 +98,4 @@ settings = Settings()
 
 def get_db_url():
     return (f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@"
-            f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
\ No newline at end of file
+            f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
@@ -0,0 +1,51 @@
+"""baseline: films, genres, film_genres
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_baseline'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Базы, созданные до появления миграций, уже содержат эти таблицы: создаются только недостающие.
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'genres' not in existing:
+        op.create_table(
+            'genres',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('name', sa.String(255), nullable=False, unique=True),
+        )
+    if 'films' not in existing:
+        op.create_table(
+            'films',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('title', sa.String(255), nullable=False, unique=True),
+            sa.Column('description', sa.Text()),
+            sa.Column('creation_date', sa.Date()),
+            sa.Column('file_link', sa.String(255)),
+        )
+    if 'film_genres' not in existing:
+        op.create_table(
+            'film_genres',
+            sa.Column('id_genre', sa.Integer(), sa.ForeignKey('genres.id'), primary_key=True, nullable=False),
+            sa.Column('id_film', sa.Integer(), sa.ForeignKey('films.id'), primary_key=True, nullable=False),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('film_genres')
+    op.drop_table('films')
+    op.drop_table('genres')
@@ -0,0 +1,37 @@
+"""genre_film_counts: per-genre film counters with backfill
+
+Revision ID: 0002_genre_film_counts
+Revises: 0001_baseline
+Create Date: 2026-10-19 18:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_genre_film_counts'
+down_revision: Union[str, None] = '0001_baseline'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'genre_film_counts',
+        sa.Column('id_genre', sa.Integer(), sa.ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True, nullable=False),
+        sa.Column('film_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    # Счетчики для уже существующих связей. Блокировка не дает записям в film_genres
+    # проскочить между подсчетом и commit миграции.
+    op.execute('LOCK TABLE film_genres IN SHARE MODE')
+    op.execute(
+        'INSERT INTO genre_film_counts (id_genre, film_count) '
+        'SELECT id_genre, count(*) FROM film_genres GROUP BY id_genre'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('genre_film_counts')
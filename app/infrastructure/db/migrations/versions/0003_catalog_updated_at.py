@@ -0,0 +1,35 @@
+"""films, genres: updated_at for the catalog snapshot
+
+Revision ID: 0003_catalog_updated_at
+Revises: 0002_genre_film_counts
+Create Date: 2026-10-19 18:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_catalog_updated_at'
+down_revision: Union[str, None] = '0002_genre_film_counts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # now() стабильна в пределах транзакции, поэтому ADD COLUMN с таким DEFAULT не переписывает
+    # таблицу (PostgreSQL 11+): существующие строки получают время миграции.
+    for table in ('films', 'genres'):
+        op.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()')
+
+    # Индексы строятся без блокировки записи, вне транзакции миграции.
+    with op.get_context().autocommit_block():
+        for table in ('films', 'genres'):
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_updated_at ON {table} (updated_at)')
+
+
+def downgrade() -> None:
+    for table in ('films', 'genres'):
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_updated_at')
+        op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS updated_at')
@@ -0,0 +1,30 @@
+"""film_genres: reverse (id_film, id_genre) index
+
+Revision ID: 0004_film_genres_by_film
+Revises: 0003_catalog_updated_at
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_film_genres_by_film'
+down_revision: Union[str, None] = '0003_catalog_updated_at'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Первичный ключ (id_genre, id_film) уже есть; обратный индекс нужен жанрам страницы фильмов
+    # и удалению связей фильма. Строится без блокировки записи, вне транзакции миграции.
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_film_genres_id_film_id_genre ON film_genres (id_film, id_genre)'
+        )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_film_genres_id_film_id_genre')
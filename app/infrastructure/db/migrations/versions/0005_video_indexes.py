@@ -0,0 +1,34 @@
+"""video_indexes: MP4 keyframe index for time-based seeking
+
+Revision ID: 0005_video_indexes
+Revises: 0004_film_genres_by_film
+Create Date: 2026-10-19 18:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_video_indexes'
+down_revision: Union[str, None] = '0004_film_genres_by_film'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'video_indexes',
+        sa.Column('object_name', sa.String(255), primary_key=True),
+        sa.Column('duration', sa.Float(), nullable=False),
+        sa.Column('bitrate', sa.Integer(), nullable=False),
+        sa.Column('keyframe_times', sa.LargeBinary(), nullable=False),
+        sa.Column('keyframe_offsets', sa.LargeBinary(), nullable=False),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('video_indexes')
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Table
+from sqlalchemy import Column, Integer, ForeignKey, Index, Table
 
 from app.infrastructure.db.models.Base import Base
 
@@ -6,5 +6,8 @@ film_genres = Table(
     'film_genres',
     Base.metadata,
     Column('id_genre', Integer, ForeignKey('genres.id'), primary_key=True, nullable=False),
-    Column('id_film', Integer, ForeignKey('films.id'), primary_key=True, nullable=False)
+    Column('id_film', Integer, ForeignKey('films.id'), primary_key=True, nullable=False),
+    # Первичный ключ (id_genre, id_film) обслуживает выборку фильмов по жанрам,
+    # обратный индекс — выборку жанров по фильмам и удаление связей фильма.
+    Index('ix_film_genres_id_film_id_genre', 'id_film', 'id_genre')
 )
\ No newline at end of file
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import List, TYPE_CHECKING
 
-from sqlalchemy import Column, Integer, String, Text, Date
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, func
 from sqlalchemy.orm import relationship, Mapped
 
 from app.infrastructure.db.models.Base import Base
@@ -21,5 +21,7 @@ class FilmORM(Base):
     description = Column(Text)
     creation_date = Column(Date)
     file_link = Column(String(255))
+    # Меняется и при изменении жанров фильма — по нему CatalogSnapshot забирает изменения.
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), index=True)
 
     genres: Mapped[List[GenreORM]] = relationship("GenreORM", secondary=film_genres, back_populates="films", lazy="noload")
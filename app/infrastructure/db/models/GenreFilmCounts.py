@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, ForeignKey, Table
+
+from app.infrastructure.db.models.Base import Base
+
+# Денормализованное число фильмов в жанре. Обновляется в той же транзакции,
+# что и вставка/удаление строк film_genres (см. GenreCountsRepository).
+genre_film_counts = Table(
+    'genre_film_counts',
+    Base.metadata,
+    Column('id_genre', Integer, ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True, nullable=False),
+    Column('film_count', Integer, nullable=False, server_default='0')
+)
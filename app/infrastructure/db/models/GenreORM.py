@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import List, TYPE_CHECKING
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime, func
 from sqlalchemy.orm import relationship, Mapped
 
 from app.infrastructure.db.models.Base import Base
@@ -16,5 +16,6 @@ class GenreORM(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(255), unique=True, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), index=True)
 
     films: Mapped[List[FilmORM]] = relationship("FilmORM", secondary=film_genres, back_populates="genres")
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Float, Integer, LargeBinary, String
+
+from app.infrastructure.db.models.Base import Base
+
+
+class VideoIndexORM(Base):
+    __tablename__ = 'video_indexes'
+
+    object_name = Column(String(255), primary_key=True)
+    duration = Column(Float, nullable=False)
+    bitrate = Column(Integer, nullable=False)
+    # Упакованные little-endian массивы: float64 секунд и uint64 смещений ключевых кадров.
+    keyframe_times = Column(LargeBinary, nullable=False)
+    keyframe_offsets = Column(LargeBinary, nullable=False)
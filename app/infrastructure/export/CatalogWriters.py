@@ -0,0 +1,147 @@
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import date
+from typing import List, Optional
+
+CATALOG_COLUMNS = ["id", "title", "description", "creation_date", "file_link", "genres"]
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class NdjsonFormat:
+    """Одна строка JSON на фильм."""
+
+    extension = "ndjson"
+    media_type = "application/x-ndjson"
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: List[dict]) -> bytes:
+        return "".join(
+            json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+class CsvFormat:
+    """CSV с заголовком; жанры склеиваются через «|»."""
+
+    extension = "csv"
+    media_type = "text/csv"
+
+    def header(self) -> bytes:
+        return self._encode_lines([CATALOG_COLUMNS])
+
+    def encode(self, rows: List[dict]) -> bytes:
+        return self._encode_lines(
+            [
+                row["id"],
+                row["title"],
+                row["description"],
+                row["creation_date"].isoformat() if row["creation_date"] else None,
+                row["file_link"],
+                "|".join(row["genres"]),
+            ]
+            for row in rows
+        )
+
+    @staticmethod
+    def _encode_lines(lines) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(lines)
+        return buffer.getvalue().encode("utf-8")
+
+
+TEXT_FORMATS = {"ndjson": NdjsonFormat(), "csv": CsvFormat()}
+EXPORT_FORMATS = [*TEXT_FORMATS, "parquet"]
+
+
+class TextFileWriter:
+    def __init__(self, path: str, fmt, compression: Optional[str] = None, append: bool = False):
+        if compression not in (None, "gzip"):
+            raise ValueError(f"Compression '{compression}' is not supported for {fmt.extension}, use gzip")
+
+        self.fmt = fmt
+        self.compression = compression
+        # Продолжение дописывается в конец, заголовок пишется один раз. В gzip каждый батч —
+        # отдельный член архива, поэтому файл, обрезанный по границе батча, читается целиком.
+        resumed = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "ab" if append else "wb")
+        if not resumed:
+            self._write(fmt.header())
+
+    def _write(self, data: bytes) -> None:
+        if data and self.compression == "gzip":
+            data = gzip.compress(data)
+        self.file.write(data)
+
+    def write_batch(self, rows: List[dict]) -> None:
+        self._write(self.fmt.encode(rows))
+
+    def flush(self) -> int:
+        """
+        Сбрасывает записанное на диск.
+
+        :return: Размер файла: граница последнего батча, до которой его можно обрезать при продолжении.
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetFileWriter:
+    def __init__(self, path: str, compression: Optional[str] = None, append: bool = False):
+        if append and os.path.exists(path):
+            raise ValueError(f"Parquet file '{path}' cannot be appended to, write the continuation to a new file")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow: uv add pyarrow")
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("id", pa.int32()),
+            ("title", pa.string()),
+            ("description", pa.string()),
+            ("creation_date", pa.date32()),
+            ("file_link", pa.string()),
+            ("genres", pa.list_(pa.string())),
+        ])
+        # Каждый батч становится отдельной row group, поэтому память не растет с размером каталога.
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression or "none")
+
+    def write_batch(self, rows: List[dict]) -> None:
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def open_writer(path: str, export_format: str, compression: Optional[str] = None, append: bool = False):
+    """
+    Создает writer для выгрузки каталога в файл.
+
+    :param path: Путь к выходному файлу.
+    :param export_format: ndjson, csv или parquet.
+    :param compression: gzip для текстовых форматов; snappy, zstd, gzip и т.п. для parquet.
+    :param append: Продолжение выгрузки: текстовые форматы дописываются в конец файла,
+        существующий parquet-файл не перезаписывается.
+    :return: Объект с методами write_batch(rows) и close().
+    :raises ValueError: Если формат или сжатие не поддерживаются или parquet-файл уже существует.
+    """
+    if export_format == "parquet":
+        return ParquetFileWriter(path, compression, append)
+    if export_format in TEXT_FORMATS:
+        return TextFileWriter(path, TEXT_FORMATS[export_format], compression, append)
+    raise ValueError(f"Unknown export format '{export_format}', expected one of {EXPORT_FORMATS}")
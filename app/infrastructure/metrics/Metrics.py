@@ -0,0 +1,349 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+
+from app.infrastructure.db.Settings import settings
+from app.infrastructure.server import WorkerHealth
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, 1_000_000_000)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+UPLOAD_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+UNMATCHED_ROUTE = "unmatched"
+
+Labels = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> list:
+        raise NotImplementedError
+
+    def dump(self) -> dict:
+        return {
+            "name": self.name,
+            "type": self.kind,
+            "help": self.documentation,
+            "labelnames": self.labelnames,
+            "samples": self.samples(),
+        }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        # Метрика без меток выводится и до первого изменения.
+        self.values: Dict[Labels, float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self.values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self.values[labels] = value
+
+
+class CallbackMetric(_Metric):
+    """Метрика, значения которой читаются из функции в момент выгрузки (счетчики и состояния других модулей)."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Labels, float]]], kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self) -> list:
+        try:
+            return [[list(labels), value] for labels, value in self.callback()]
+        except Exception:
+            logger.exception("Metric callback %s failed", self.name)
+            return []
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # На набор меток: счетчики по корзинам (последняя — +Inf, не накопительно), сумма.
+        self.values: Dict[Labels, list] = {}
+        if not self.labelnames:
+            self.values[()] = [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(labels), list(counts), total] for labels, (counts, total) in self.values.items()]
+
+    def dump(self) -> dict:
+        return {**super().dump(), "buckets": self.buckets}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Labels, float]]], kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, labelnames, callback, kind))
+
+    def dump(self) -> List[dict]:
+        return [metric.dump() for metric in self.metrics.values()]
+
+
+# Экспозиция
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(dumps: Sequence[Tuple[Dict[str, str], List[dict]]]) -> str:
+    """
+    Текстовый формат Prometheus 0.0.4.
+
+    :param dumps: Пары (дополнительные метки, выгрузка реестра); метрики с одинаковым
+        именем из разных выгрузок выводятся под одним HELP/TYPE.
+    """
+    grouped: Dict[str, List[Tuple[Dict[str, str], dict]]] = {}
+    for extra_labels, dump in dumps:
+        for metric in dump:
+            grouped.setdefault(metric["name"], []).append((extra_labels, metric))
+
+    lines = []
+    for name, parts in grouped.items():
+        first = parts[0][1]
+        lines.append(f"# HELP {name} {first['help']}")
+        lines.append(f"# TYPE {name} {first['type']}")
+        for extra_labels, metric in parts:
+            names = [*extra_labels, *metric["labelnames"]]
+            extra = list(extra_labels.values())
+            for sample in metric["samples"]:
+                values = [*extra, *sample[0]]
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(names, values)} {_format_value(sample[1])}")
+                    continue
+                counts, total = sample[1], sample[2]
+                cumulative = 0
+                for bound, count in zip([*metric["buckets"], float("inf")], counts):
+                    cumulative += count
+                    bucket_labels = _format_labels([*names, "le"], [*values, _format_value(bound)])
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(names, values)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(names, values)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# Несколько процессов
+
+class MetricsExporter:
+    """
+    Выгрузка метрик процесса.
+
+    Под лаунчером (задан METRICS_MULTIPROCESS_DIR) каждый воркер раз в flush_seconds
+    и при каждом запросе /metrics записывает свою выгрузку в файл слота; /metrics
+    отдает файлы всех воркеров с меткой worker. Значения других воркеров отстают не
+    больше чем на flush_seconds; после перезапуска воркера его счетчики начинаются с нуля.
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str, flush_seconds: float):
+        self.registry = registry
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def _path(self) -> str:
+        return os.path.join(self.directory, f"worker-{WorkerHealth.get_slot()}.json")
+
+    def flush(self) -> None:
+        path = self._path()
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.registry.dump(), f)
+        os.replace(temporary, path)
+
+    def render(self) -> str:
+        if not self.directory:
+            return render([({}, self.registry.dump())])
+
+        self.flush()
+        dumps = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "worker-*.json"))):
+            worker = os.path.basename(path)[len("worker-"):-len(".json")]
+            try:
+                with open(path) as f:
+                    dumps.append(({"worker": worker}, json.load(f)))
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable metrics file %s", path)
+        return render(dumps)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Metrics flush failed")
+
+    def start(self) -> None:
+        if self.directory and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.flush()
+
+
+registry = MetricsRegistry()
+exporter = MetricsExporter(registry, settings.METRICS_MULTIPROCESS_DIR, settings.METRICS_FLUSH_SECONDS)
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Time until the last response byte is sent.", ("method", "route"))
+HTTP_RESPONSE_SIZE = registry.histogram(
+    "http_response_size_bytes", "Response body size.", ("method", "route"), SIZE_BUCKETS)
+HTTP_IN_FLIGHT = registry.gauge("http_requests_in_flight", "Requests being processed.")
+HTTP_EXCEPTIONS = registry.counter(
+    "http_exceptions_total", "Unhandled exceptions by route and exception type.", ("route", "exception"))
+
+DB_POOL_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool.", (), POOL_WAIT_BUCKETS)
+
+S3_STREAMED_BYTES = registry.counter("s3_streamed_bytes_total", "Bytes streamed from S3 to clients.")
+S3_UPLOADED_BYTES = registry.counter("s3_uploaded_bytes_total", "Bytes uploaded to S3.")
+S3_UPLOAD_DURATION = registry.histogram(
+    "s3_upload_duration_seconds", "Duration of successful uploads to S3.", (), UPLOAD_BUCKETS)
+S3_ERRORS = registry.counter("s3_errors_total", "S3 errors by operation and exception type.", ("operation", "exception"))
+
+
+def route_template(scope) -> str:
+    """
+    Шаблон пути запроса. Если до роутера запрос не дошел (например, отклонен admission
+    control), шаблон ищется среди маршрутов приложения так же, как это сделал бы роутер.
+    """
+    route = scope.get("route")
+    if route is None:
+        router = getattr(scope.get("app"), "router", None)
+        for candidate in getattr(router, "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: число запросов, задержка, размер ответа, запросы в обработке и
+    необработанные исключения. Маршрут берется из шаблона пути (scope["route"]),
+    поэтому названия фильмов и видео не порождают новых рядов. Подключается снаружи
+    admission control, чтобы учитывать отклоненные запросы и время ожидания в очереди.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception as e:
+            HTTP_EXCEPTIONS.inc(labels=(route_template(scope), type(e).__name__))
+            raise
+        finally:
+            HTTP_IN_FLIGHT.inc(-1)
+            method, route = scope["method"], route_template(scope)
+            HTTP_REQUESTS.inc(labels=(method, route, str(status)))
+            HTTP_LATENCY.observe(time.perf_counter() - started, (method, route))
+            HTTP_RESPONSE_SIZE.observe(size, (method, route))
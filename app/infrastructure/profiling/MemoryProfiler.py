@@ -0,0 +1,141 @@
+import logging
+import tracemalloc
+from typing import List, Optional
+
+from app.infrastructure.db.Settings import settings
+
+logger = logging.getLogger(__name__)
+
+PEAK_HEADER = b"x-memory-peak-bytes"
+
+
+def start(frames: int = settings.MEMORY_PROFILING_FRAMES) -> None:
+    """
+    Включает tracemalloc, если он еще не включен.
+
+    :param frames: Глубина сохраняемого стека для каждой аллокации.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop() -> None:
+    """Выключает tracemalloc и освобождает его трассы вместе с базовым снимком."""
+    snapshot_store.baseline = None
+    tracemalloc.stop()
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def _format(stats, top: int) -> List[dict]:
+    return [
+        {
+            "site": str(stat.traceback[0]) if stat.traceback else "<unknown>",
+            "size_bytes": stat.size,
+            "size_diff_bytes": getattr(stat, "size_diff", None),
+            "count": stat.count,
+            "count_diff": getattr(stat, "count_diff", None),
+        }
+        for stat in stats[:top]
+    ]
+
+
+class SnapshotStore:
+    """Хранит базовый снимок для сравнения «до/после» через админские эндпоинты."""
+
+    def __init__(self):
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+
+    def take_baseline(self, top: int = 20) -> dict:
+        """
+        Делает базовый снимок аллокаций.
+
+        :param top: Сколько мест аллокаций вернуть.
+        :return: Текущий и пиковый объем отслеживаемой памяти и топ мест аллокаций.
+        """
+        self.baseline = _snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": _format(self.baseline.statistics("lineno"), top),
+        }
+
+    def diff(self, top: int = 20) -> dict:
+        """
+        Сравнивает текущие аллокации с базовым снимком.
+
+        :param top: Сколько мест аллокаций вернуть.
+        :return: Места с наибольшим приростом памяти с момента базового снимка.
+        """
+        snapshot = _snapshot()
+        if self.baseline is None:
+            self.baseline = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": _format(snapshot.compare_to(self.baseline, "lineno"), top),
+        }
+
+
+snapshot_store = SnapshotStore()
+
+
+class MemoryProfilingMiddleware:
+    """
+    ASGI-middleware, измеряющее пик аллокаций Python за время запроса.
+
+    Пик tracemalloc общий для процесса, а reset_peak() сбрасывает его для всех, поэтому
+    пик относится к запросу, только если тот выполнялся в процессе один: от начала до
+    конца не было других запросов. Для остальных пик не измеряется (нет заголовка
+    и записи в лог). Заголовок содержит пик на момент начала ответа, в лог пишется пик
+    за весь запрос, включая отправку тела.
+    """
+
+    def __init__(self, app, log_threshold_bytes: int = int(settings.MEMORY_PROFILING_LOG_THRESHOLD_MB * 1024 * 1024)):
+        self.app = app
+        self.log_threshold_bytes = log_threshold_bytes
+        self.active = 0
+        self.started = 0
+        start()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracemalloc.is_tracing():
+            await self.app(scope, receive, send)
+            return
+
+        self.active += 1
+        self.started += 1
+        # Запрос измеряется, если начался в пустом процессе и за время его выполнения не начался другой.
+        measured = self.active == 1
+        started = self.started
+        if measured:
+            tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        def peak() -> Optional[int]:
+            if not measured or self.started != started or not tracemalloc.is_tracing():
+                return None
+            return tracemalloc.get_traced_memory()[1] - baseline
+
+        async def send_with_peak(message):
+            if message["type"] == "http.response.start":
+                value = peak()
+                if value is not None:
+                    message["headers"] = [*message.get("headers", []), (PEAK_HEADER, str(value).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_peak)
+        finally:
+            value = peak()
+            self.active -= 1
+            if value is not None and value >= self.log_threshold_bytes:
+                logger.warning("Memory peak %s %s: %d bytes", scope["method"], scope["path"], value)
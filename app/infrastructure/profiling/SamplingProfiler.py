@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.infrastructure.db.Settings import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = b"x-profile-token"
+URL_HEADER = b"x-profile-url"
+
+FORMATS = {"collapsed": ".collapsed.txt", "speedscope": ".speedscope.json"}
+
+_NAME_PATTERN = re.compile(r"^[\w.-]+\.(collapsed\.txt|speedscope\.json)$")
+
+Frame = Tuple[str, str, int]
+
+
+def make_token(secret: str, ttl_seconds: int) -> str:
+    """
+    Создает значение заголовка x-profile-token.
+
+    :param secret: Общий секрет (PROFILING_SECRET).
+    :param ttl_seconds: Срок действия токена.
+    :return: Строка "<expires>.<hmac-sha256>".
+    """
+    expires = str(int(time.time()) + ttl_seconds)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_token(secret: str, token: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not secret or not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_qualname, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class Sampler:
+    """
+    Сэмплирующий профилировщик: фоновый поток раз в interval снимает стеки всех потоков
+    процесса через sys._current_frames().
+
+    Снимаются все потоки, а не только запрос: корутины разных запросов выполняются в одном
+    потоке event loop, а синхронный код — в пуле потоков. Ожидание БД и сети видно как
+    стек event loop внутри select.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        started = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names.setdefault(thread.ident, thread.name)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                thread_name = names.get(thread_id) or f"thread-{thread_id}"
+                self.samples[(thread_name, _stack(frame))] += 1
+            self.sample_count += 1
+        self.duration = time.perf_counter() - started
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def to_collapsed(samples: Counter) -> str:
+    """Формат collapsed stacks (flamegraph.pl, speedscope, inferno): "поток;кадр;кадр N"."""
+    lines = []
+    for (thread_name, stack), count in samples.items():
+        frames = [thread_name] + [f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack]
+        lines.append(";".join(frame.replace(";", ":") for frame in frames) + f" {count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(samples: Counter, interval: float, name: str) -> str:
+    """Формат speedscope: отдельный sampled-профиль на каждый поток."""
+    frame_index: Dict[Frame, int] = {}
+    frames: List[dict] = []
+    profiles: Dict[str, dict] = {}
+
+    for (thread_name, stack), count in samples.items():
+        indexes = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+            indexes.append(frame_index[frame])
+
+        profile = profiles.setdefault(thread_name, {
+            "type": "sampled", "name": thread_name, "unit": "seconds",
+            "startValue": 0, "endValue": 0, "samples": [], "weights": [],
+        })
+        profile["samples"].append(indexes)
+        profile["weights"].append(count * interval)
+        profile["endValue"] += count * interval
+
+    return json.dumps({
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "app.infrastructure.profiling.SamplingProfiler",
+        "shared": {"frames": frames},
+        "profiles": list(profiles.values()),
+    })
+
+
+def profile_path(output_dir: str, name: str) -> Optional[str]:
+    """
+    :return: Путь к сохраненному профилю или None, если имя некорректно или файла нет.
+    """
+    if not _NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(output_dir, name)
+    return path if os.path.isfile(path) else None
+
+
+def list_profiles(output_dir: str) -> List[str]:
+    if not os.path.isdir(output_dir):
+        return []
+    return sorted((name for name in os.listdir(output_dir) if _NAME_PATTERN.match(name)), reverse=True)
+
+
+def _save(output_dir: str, name: str, content: str, max_files: int) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, name), "w") as f:
+        f.write(content)
+    for old in list_profiles(output_dir)[max_files:]:
+        os.remove(os.path.join(output_dir, old))
+
+
+class SamplingProfilerMiddleware:
+    """
+    ASGI-middleware, профилирующее отдельные запросы сэмплирующим профилировщиком.
+
+    Профилируется доля sample_rate запросов и запросы с действительным заголовком
+    x-profile-token (см. make_token). Одновременно профилируется не больше одного запроса
+    в процессе. Ссылка на профиль возвращается в заголовке x-profile-url; файл
+    записывается после завершения ответа и отдается, как и остальные /admin, только
+    с заголовком x-admin-token.
+    """
+
+    def __init__(
+        self,
+        app,
+        sample_rate: float = settings.PROFILING_SAMPLE_RATE,
+        secret: str = settings.PROFILING_SECRET,
+        interval: float = settings.PROFILING_INTERVAL_MS / 1000,
+        output_format: str = settings.PROFILING_FORMAT,
+        output_dir: str = settings.PROFILING_OUTPUT_DIR,
+        max_files: int = settings.PROFILING_MAX_FILES,
+    ):
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown profile format {output_format!r}, expected one of {sorted(FORMATS)}")
+        self.app = app
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.interval = interval
+        self.output_format = output_format
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._busy = False
+
+    def _should_profile(self, scope) -> bool:
+        if self._busy:
+            return False
+        if self.secret:
+            for key, value in scope["headers"]:
+                if key == TOKEN_HEADER:
+                    return verify_token(self.secret, value.decode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        slug = re.sub(r"[^\w-]+", "-", scope["path"]).strip("-") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{slug[:60]}-{uuid.uuid4().hex[:8]}"
+        name += FORMATS[self.output_format]
+
+        async def send_with_link(message):
+            if message["type"] == "http.response.start":
+                url = f"{scope.get('root_path', '')}/admin/profiles/{name}".encode()
+                message["headers"] = [*message.get("headers", []), (URL_HEADER, url)]
+            await send(message)
+
+        sampler = Sampler(self.interval)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_link)
+        finally:
+            sampler.stop()
+            try:
+                if self.output_format == "speedscope":
+                    content = to_speedscope(sampler.samples, self.interval, f"{scope['method']} {scope['path']}")
+                else:
+                    content = to_collapsed(sampler.samples)
+                await asyncio.to_thread(_save, self.output_dir, name, content, self.max_files)
+                logger.info("Profiled %s %s: %d samples in %.3fs -> %s",
+                            scope["method"], scope["path"], sampler.sample_count, sampler.duration, name)
+            except Exception:
+                logger.exception("Failed to save profile %s", name)
+            finally:
+                self._busy = False
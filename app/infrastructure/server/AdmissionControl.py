@@ -0,0 +1,209 @@
+import asyncio
+import json
+from collections import deque
+from typing import Dict, Optional
+
+from app.infrastructure.db.Settings import Settings, settings
+from app.infrastructure.metrics.Metrics import registry
+
+CHEAP_READ = "cheap_read"
+HEAVY_LIST = "heavy_list"
+WRITE = "write"
+VIDEO = "video"
+EXPORT = "export"
+
+# Служебные маршруты не ограничиваются: они не ходят в БД и нужны именно под нагрузкой.
+_EXEMPT_PREFIXES = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json", "/admin/admission")
+_HEAVY_LIST_PATHS = ("/films", "/films/")
+_HEAVY_LIST_PREFIXES = ("/films/genre/",)
+# Выгрузка каталога идет минутами: в общем с листингами классе она занимала бы их слоты.
+_EXPORT_PREFIXES = ("/admin/export",)
+
+
+def classify_route(method: str, path: str) -> Optional[str]:
+    """
+    Определяет класс маршрута для admission control.
+
+    :param method: HTTP-метод.
+    :param path: Путь запроса.
+    :return: Название класса или None, если маршрут не ограничивается.
+    """
+    if path.startswith(_EXEMPT_PREFIXES):
+        return None
+    if path.startswith("/video/"):
+        return VIDEO
+    if path.startswith(_EXPORT_PREFIXES):
+        return EXPORT
+    if method not in ("GET", "HEAD"):
+        return WRITE
+    if path in _HEAVY_LIST_PATHS or path.startswith(_HEAVY_LIST_PREFIXES):
+        return HEAVY_LIST
+    return CHEAP_READ
+
+
+class AdmissionLimiter:
+    """
+    Ограничитель одновременных запросов с ограниченной очередью и дедлайном ожидания.
+
+    Если все слоты заняты и очередь полна, запрос отклоняется сразу; если запрос
+    простоял в очереди дольше queue_timeout — отклоняется по таймауту.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.active = 0
+        self.waiters: deque = deque()
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> bool:
+        """
+        Занимает слот.
+
+        :return: True, если запрос допущен, False — если его нужно отклонить.
+        """
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+
+        if len(self.waiters) >= self.max_queue:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # Слот мог быть передан одновременно с истечением таймаута — тогда он уже наш.
+            if waiter.done() and not waiter.cancelled():
+                self.admitted += 1
+                return True
+            self.shed += 1
+            self.timed_out += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self.waiters.remove(waiter)
+            except ValueError:
+                pass
+
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        # Слот передается первому живому ожидающему без уменьшения active.
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_limit": self.max_queue,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+        }
+
+
+class AdmissionController:
+    def __init__(self, limiters: Dict[str, AdmissionLimiter], retry_after: int):
+        self.limiters = limiters
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_settings(cls, config: Settings) -> "AdmissionController":
+        timeout = config.ADMISSION_QUEUE_TIMEOUT
+        return cls(
+            {
+                CHEAP_READ: AdmissionLimiter(CHEAP_READ, config.ADMISSION_CHEAP_READ_LIMIT, config.ADMISSION_CHEAP_READ_QUEUE, timeout),
+                HEAVY_LIST: AdmissionLimiter(HEAVY_LIST, config.ADMISSION_HEAVY_LIST_LIMIT, config.ADMISSION_HEAVY_LIST_QUEUE, timeout),
+                WRITE: AdmissionLimiter(WRITE, config.ADMISSION_WRITE_LIMIT, config.ADMISSION_WRITE_QUEUE, timeout),
+                VIDEO: AdmissionLimiter(VIDEO, config.ADMISSION_VIDEO_LIMIT, config.ADMISSION_VIDEO_QUEUE, timeout),
+                EXPORT: AdmissionLimiter(EXPORT, config.ADMISSION_EXPORT_LIMIT, config.ADMISSION_EXPORT_QUEUE, timeout),
+            },
+            retry_after=config.ADMISSION_RETRY_AFTER,
+        )
+
+    def limiter_for(self, method: str, path: str) -> Optional[AdmissionLimiter]:
+        route_class = classify_route(method, path)
+        return self.limiters[route_class] if route_class else None
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+admission_controller = AdmissionController.from_settings(settings)
+
+
+def _admission_samples(field: str):
+    return [((name,), stats[field]) for name, stats in admission_controller.stats().items()]
+
+
+registry.callback("admission_active_requests", "Requests holding an admission slot.", ("route_class",),
+                  lambda: _admission_samples("active"))
+registry.callback("admission_queued_requests", "Requests waiting for an admission slot.", ("route_class",),
+                  lambda: _admission_samples("queued"))
+registry.callback("admission_admitted_total", "Requests admitted.", ("route_class",),
+                  lambda: _admission_samples("admitted"), kind="counter")
+registry.callback("admission_shed_total", "Requests rejected because the queue was full.", ("route_class",),
+                  lambda: _admission_samples("shed"), kind="counter")
+registry.callback("admission_timed_out_total", "Requests rejected after waiting too long in the queue.",
+                  ("route_class",), lambda: _admission_samples("timed_out"), kind="counter")
+
+
+class AdmissionControlMiddleware:
+    """ASGI-middleware: допускает запрос по лимиту его класса или сразу отвечает 503."""
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.controller.limiter_for(scope["method"], scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            await self._reject(send, limiter.name)
+            return
+
+        # Слот удерживается до конца отправки тела, в том числе для стриминга видео.
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _reject(self, send, route_class: str) -> None:
+        body = json.dumps({"detail": f"Service overloaded ({route_class}), retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.controller.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,143 @@
+import os
+import time
+from typing import List, Optional
+
+_FIELDS = ("pid", "started_at", "last_seen", "requests", "rss_bytes", "restarts")
+_PID, _STARTED_AT, _LAST_SEEN, _REQUESTS, _RSS_BYTES, _RESTARTS = range(len(_FIELDS))
+
+
+class WorkerHealthRegistry:
+    """
+    Таблица состояния воркеров.
+
+    Хранится в плоском массиве double (по строке на слот), поэтому один и тот же
+    объект можно передать как multiprocessing.Array из супервизора во все воркеры.
+    Каждый воркер пишет только в свой слот, супервизор — в pid, rss и restarts.
+    """
+
+    def __init__(self, storage, slots: int):
+        self.storage = storage
+        self.slots = slots
+
+    @classmethod
+    def shared(cls, ctx, slots: int) -> "WorkerHealthRegistry":
+        """
+        Создает реестр в разделяемой памяти.
+
+        :param ctx: Контекст multiprocessing.
+        :param slots: Количество воркеров.
+        """
+        return cls(ctx.Array("d", slots * len(_FIELDS), lock=False), slots)
+
+    @classmethod
+    def local(cls) -> "WorkerHealthRegistry":
+        """Реестр на один слот для запуска без лаунчера (fastapi dev / run)."""
+        registry = cls([0.0] * len(_FIELDS), 1)
+        registry.mark_started(0, os.getpid())
+        return registry
+
+    def _index(self, slot: int, field: int) -> int:
+        return slot * len(_FIELDS) + field
+
+    def mark_started(self, slot: int, pid: int, restarted: bool = False) -> None:
+        now = time.time()
+        self.storage[self._index(slot, _PID)] = pid
+        self.storage[self._index(slot, _STARTED_AT)] = now
+        self.storage[self._index(slot, _LAST_SEEN)] = now
+        self.storage[self._index(slot, _REQUESTS)] = 0
+        self.storage[self._index(slot, _RSS_BYTES)] = 0
+        if restarted:
+            self.storage[self._index(slot, _RESTARTS)] += 1
+
+    def record_request(self, slot: int) -> None:
+        self.storage[self._index(slot, _REQUESTS)] += 1
+        self.storage[self._index(slot, _LAST_SEEN)] = time.time()
+
+    def set_rss(self, slot: int, rss_bytes: int) -> None:
+        self.storage[self._index(slot, _RSS_BYTES)] = rss_bytes
+
+    def snapshot(self) -> List[dict]:
+        """
+        Возвращает состояние всех слотов.
+
+        :return: Список словарей, по одному на воркер.
+        """
+        now = time.time()
+        workers = []
+        for slot in range(self.slots):
+            row = [self.storage[self._index(slot, field)] for field in range(len(_FIELDS))]
+            workers.append({
+                "slot": slot,
+                "pid": int(row[_PID]),
+                "uptime_seconds": round(now - row[_STARTED_AT], 3) if row[_STARTED_AT] else 0.0,
+                "seconds_since_last_request": round(now - row[_LAST_SEEN], 3) if row[_LAST_SEEN] else None,
+                "requests": int(row[_REQUESTS]),
+                "rss_bytes": int(row[_RSS_BYTES]),
+                "restarts": int(row[_RESTARTS]),
+            })
+        return workers
+
+
+_registry: Optional[WorkerHealthRegistry] = None
+_slot: int = 0
+
+
+def attach(registry: WorkerHealthRegistry, slot: int) -> None:
+    """
+    Привязывает текущий процесс к слоту реестра. Вызывается воркером до импорта приложения.
+
+    :param registry: Реестр, созданный супервизором.
+    :param slot: Номер слота воркера.
+    """
+    global _registry, _slot
+    _registry = registry
+    _slot = slot
+
+
+def get_registry() -> WorkerHealthRegistry:
+    global _registry
+    if _registry is None:
+        _registry = WorkerHealthRegistry.local()
+    return _registry
+
+
+def get_slot() -> int:
+    """Номер слота текущего воркера (0 без лаунчера)."""
+    return _slot
+
+
+def collect() -> List[dict]:
+    """
+    Снимок состояния всех воркеров; RSS текущего процесса обновляется на месте.
+
+    :return: Список словарей, по одному на воркер.
+    """
+    registry = get_registry()
+    registry.set_rss(_slot, read_rss_bytes(os.getpid()))
+    return registry.snapshot()
+
+
+def read_rss_bytes(pid: int) -> int:
+    """
+    Читает резидентную память процесса из /proc (только Linux).
+
+    :param pid: PID процесса.
+    :return: RSS в байтах или 0, если значение недоступно.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class WorkerHealthMiddleware:
+    """ASGI-middleware, считающее обработанные воркером HTTP-запросы."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            get_registry().record_request(_slot)
+        await self.app(scope, receive, send)
@@ -0,0 +1,232 @@
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.domain.models.VideoIndex import VideoIndex
+
+
+class Mp4ParseError(ValueError):
+    pass
+
+
+def _u32_array(data: bytes, start: int, count: int) -> array:
+    values = array("I", data[start:start + 4 * count])
+    if len(values) != count:
+        raise Mp4ParseError("Truncated sample table")
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def _u64_array(data: bytes, start: int, count: int) -> array:
+    values = array("Q", data[start:start + 8 * count])
+    if len(values) != count:
+        raise Mp4ParseError("Truncated sample table")
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def _boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    Перебирает боксы внутри буфера.
+
+    :return: Итератор (тип, начало содержимого, конец бокса).
+    """
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise Mp4ParseError(f"Invalid size of box {kind!r}")
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _children(data: bytes, start: int, end: int) -> Dict[bytes, Tuple[int, int]]:
+    children = {}
+    for kind, body, box_end in _boxes(data, start, end):
+        children.setdefault(kind, (body, box_end))
+    return children
+
+
+def _read_moov(f: BinaryIO) -> bytes:
+    """Находит бокс moov в файле (в начале или в конце) и читает только его."""
+    f.seek(0, 2)
+    file_size = f.tell()
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, kind = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", header, 8)
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size:
+            raise Mp4ParseError(f"Invalid size of top-level box {kind!r}")
+        if kind == b"moov":
+            f.seek(pos + header_size)
+            return f.read(size - header_size)
+        pos += size
+    raise Mp4ParseError("moov box not found")
+
+
+def _timescale_and_duration(data: bytes, start: int) -> Tuple[int, int]:
+    # mvhd и mdhd: версия 1 хранит времена в 64 битах.
+    version = data[start]
+    if version == 1:
+        return struct.unpack_from(">IQ", data, start + 20)
+    return struct.unpack_from(">II", data, start + 12)
+
+
+def _video_sample_tables(moov: bytes) -> Optional[Tuple[int, Dict[bytes, Tuple[int, int]]]]:
+    for kind, body, end in _boxes(moov, 0, len(moov)):
+        if kind != b"trak":
+            continue
+        mdia = _children(moov, body, end).get(b"mdia")
+        if mdia is None:
+            continue
+        mdia_children = _children(moov, *mdia)
+        hdlr, mdhd, minf = mdia_children.get(b"hdlr"), mdia_children.get(b"mdhd"), mdia_children.get(b"minf")
+        if hdlr is None or mdhd is None or minf is None or moov[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+            continue
+        stbl = _children(moov, *minf).get(b"stbl")
+        if stbl is None:
+            continue
+        timescale, _ = _timescale_and_duration(moov, mdhd[0])
+        return timescale, _children(moov, *stbl)
+    return None
+
+
+def _keyframe_times(stts: List[Tuple[int, int]], samples: List[int]) -> List[int]:
+    """Время декодирования (в единицах timescale) для отсортированных номеров сэмплов."""
+    times = []
+    targets = iter(samples)
+    target = next(targets, None)
+    sample, time = 1, 0
+    for count, delta in stts:
+        while target is not None and target < sample + count:
+            times.append(time + (target - sample) * delta)
+            target = next(targets, None)
+        sample += count
+        time += count * delta
+    return times
+
+
+def _keyframe_offsets(stsc: List[Tuple[int, int]], chunk_offsets: array, sample_size: int,
+                      sample_sizes: Optional[array], samples: List[int]) -> List[int]:
+    """Смещение в файле для отсортированных номеров сэмплов (через stsc, stco/co64 и stsz)."""
+    offsets = []
+    targets = iter(samples)
+    target = next(targets, None)
+    sample = 1
+    for i, (first_chunk, samples_per_chunk) in enumerate(stsc):
+        last_chunk = stsc[i + 1][0] - 1 if i + 1 < len(stsc) else len(chunk_offsets)
+        for chunk in range(first_chunk, last_chunk + 1):
+            if target is None:
+                return offsets
+            # Пока нужный сэмпл дальше, чанк пропускается целиком без суммирования размеров.
+            while target is not None and target < sample + samples_per_chunk:
+                if sample_sizes is None:
+                    offset = chunk_offsets[chunk - 1] + (target - sample) * sample_size
+                else:
+                    offset = chunk_offsets[chunk - 1] + sum(sample_sizes[sample - 1:target - 1])
+                offsets.append(offset)
+                target = next(targets, None)
+            sample += samples_per_chunk
+    return offsets
+
+
+def parse_mp4_index(path: str, object_name: str) -> VideoIndex:
+    """
+    Строит индекс ключевых кадров MP4: время -> смещение в файле.
+
+    Читается только бокс moov; используются таблицы первой видеодорожки:
+    stts (длительности сэмплов), stss (ключевые кадры), stsc/stco/co64 (чанки)
+    и stsz (размеры сэмплов). Время — время декодирования, без учета ctts.
+
+    :param path: Путь к локальному файлу.
+    :param object_name: Имя объекта в S3, под которым файл будет загружен.
+    :return: Объект VideoIndex.
+    :raises Mp4ParseError: Если файл не MP4, поврежден или в нем нет видеодорожки.
+    """
+    # Размеры боксов и счетчики таблиц берутся из файла: обрезанный или испорченный бокс
+    # проявляется как выход за границы буфера в любом месте разбора.
+    try:
+        with open(path, "rb") as f:
+            moov = _read_moov(f)
+            f.seek(0, 2)
+            file_size = f.tell()
+
+        moov_children = _children(moov, 0, len(moov))
+        mvhd = moov_children.get(b"mvhd")
+        if mvhd is None:
+            raise Mp4ParseError("mvhd box not found")
+        movie_timescale, movie_duration = _timescale_and_duration(moov, mvhd[0])
+
+        video = _video_sample_tables(moov)
+        if video is None:
+            raise Mp4ParseError("Video track not found")
+        timescale, stbl = video
+        if not timescale:
+            raise Mp4ParseError("Video track has zero timescale")
+        if b"stts" not in stbl or b"stsc" not in stbl or b"stsz" not in stbl:
+            raise Mp4ParseError("Incomplete sample table")
+
+        start = stbl[b"stts"][0]
+        (count,) = struct.unpack_from(">I", moov, start + 4)
+        raw = _u32_array(moov, start + 8, 2 * count)
+        stts = list(zip(raw[0::2], raw[1::2]))
+
+        start = stbl[b"stsc"][0]
+        (count,) = struct.unpack_from(">I", moov, start + 4)
+        raw = _u32_array(moov, start + 8, 3 * count)
+        stsc = list(zip(raw[0::3], raw[1::3]))
+
+        start = stbl[b"stsz"][0]
+        sample_size, sample_count = struct.unpack_from(">II", moov, start + 4)
+        sample_sizes = _u32_array(moov, start + 12, sample_count) if sample_size == 0 else None
+
+        if b"stco" in stbl:
+            start = stbl[b"stco"][0]
+            (count,) = struct.unpack_from(">I", moov, start + 4)
+            chunk_offsets = _u32_array(moov, start + 8, count)
+        elif b"co64" in stbl:
+            start = stbl[b"co64"][0]
+            (count,) = struct.unpack_from(">I", moov, start + 4)
+            chunk_offsets = _u64_array(moov, start + 8, count)
+        else:
+            raise Mp4ParseError("Chunk offset table not found")
+
+        # Без stss все сэмплы — ключевые.
+        if b"stss" in stbl:
+            start = stbl[b"stss"][0]
+            (count,) = struct.unpack_from(">I", moov, start + 4)
+            keyframes = sorted(_u32_array(moov, start + 8, count))
+        else:
+            keyframes = list(range(1, sample_count + 1))
+
+        times = _keyframe_times(stts, keyframes)
+        offsets = _keyframe_offsets(stsc, chunk_offsets, sample_size, sample_sizes, keyframes[:len(times)])
+    except Mp4ParseError:
+        raise
+    except (IndexError, ValueError, struct.error) as e:
+        raise Mp4ParseError(f"Malformed box: {e}") from e
+
+    duration = movie_duration / movie_timescale if movie_timescale else 0.0
+    return VideoIndex(
+        object_name=object_name,
+        duration=duration,
+        bitrate=int(file_size * 8 / duration) if duration else 0,
+        keyframe_times=array("d", (t / timescale for t in times[:len(offsets)])),
+        keyframe_offsets=array("Q", offsets),
+    )
@@ -1,21 +1,82 @@
 import os
-from typing import List
+import shutil
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional, Union
 
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.infrastructure.db.MinioClient import get_video_from_s3, upload_to_s3
-from starlette.responses import StreamingResponse
+from app.infrastructure.db.MinioClient import get_video_from_s3, get_video_range_from_s3, upload_to_s3
+from starlette.responses import Response, StreamingResponse
 
 from app.domain.models.Film import Film
 from app.domain.models.Genre import Genre
-from app.infrastructure.db.CreateSession import get_session
+from app.domain.models.GenreFacet import GenreFacet
+from app.domain.models.SimilarFilm import SimilarFilm
+from app.infrastructure.cache.CatalogNotifications import catalog_listener
+from app.infrastructure.cache.CatalogSnapshot import catalog_snapshot
+from app.infrastructure.cache.TitlePrefixIndex import MAX_LIMIT
+from app.infrastructure.db.CreateSession import AsyncSessionLocal, get_session
+from app.infrastructure.db.QueryLog import QueryStatsMiddleware
 from app.infrastructure.db.Settings import settings
+from app.infrastructure.metrics import Metrics
+from app.infrastructure.metrics.Metrics import MetricsMiddleware
+from app.infrastructure.server import WorkerHealth
+from app.infrastructure.profiling.MemoryProfiler import MemoryProfilingMiddleware
+from app.infrastructure.profiling.SamplingProfiler import SamplingProfilerMiddleware
+from app.infrastructure.server.AdmissionControl import AdmissionControlMiddleware
+from app.infrastructure.server.WorkerHealth import WorkerHealthMiddleware
+from app.routers import admin
 from app.use_cases.FilmService import FilmService
 from app.use_cases.GenreService import GenreService
+from app.use_cases.VideoService import VideoService
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Слушатель запускается до снимка: изменения, закоммиченные после LISTEN, не потеряются.
+    if settings.CATALOG_NOTIFY_ENABLED:
+        await catalog_listener.start()
+    if settings.CATALOG_SNAPSHOT_ENABLED:
+        catalog_snapshot.start(AsyncSessionLocal)
+    if settings.METRICS_ENABLED:
+        Metrics.exporter.start()
+    yield
+    await Metrics.exporter.stop()
+    await catalog_snapshot.stop()
+    await catalog_listener.stop()
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(WorkerHealthMiddleware)
+if settings.QUERY_LOG_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+if settings.MEMORY_PROFILING_ENABLED:
+    app.add_middleware(MemoryProfilingMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(SamplingProfilerMiddleware)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+# Последний добавленный middleware — внешний: метрики видят и отклоненные admission control запросы.
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.include_router(admin.router)
+
+@app.get("/health/workers")
+async def get_workers_health():
+    """
+    Состояние всех воркеров лаунчера (pid, аптайм, число запросов, RSS, перезапуски).
+    """
+    return WorkerHealth.collect()
 
-
-
-app = FastAPI()
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Метрики в текстовом формате Prometheus; под лаунчером — всех воркеров с меткой worker.
+    """
+    return Response(Metrics.exporter.render(), media_type=Metrics.CONTENT_TYPE)
 
 @app.post("/genres/", response_model=Genre)
 async def create_genre(genre: Genre, session: AsyncSession = Depends(get_session)):
@@ -23,9 +84,11 @@ async def create_genre(genre: Genre, session: AsyncSession = Depends(get_session
     genre_id = await genre_service.create_genre(genre)
     return Genre(id=genre_id, name=genre.name)
 
-@app.get("/genres/", response_model=List[Genre])
-async def get_all_genres(session: AsyncSession = Depends(get_session)):
+@app.get("/genres/", response_model=Union[List[GenreFacet], List[Genre]])
+async def get_all_genres(with_counts: bool = False, session: AsyncSession = Depends(get_session)):
     genre_service = GenreService(session)
+    if with_counts:
+        return await genre_service.get_all_genres_with_counts()
     genres = await genre_service.get_all_genres()
     return genres
 
@@ -56,11 +119,47 @@ async def create_film(film: Film, genres_name: List[str], session: AsyncSession
     return film_id
 
 @app.get("/films/", response_model=List[Film])
-async def get_all_films(session: AsyncSession = Depends(get_session)):
+async def get_all_films(
+    genres: Optional[str] = Query(None, description="Названия жанров через запятую"),
+    match: Optional[Literal["all", "any"]] = Query(None, description="Все жанры или любой; по умолчанию all"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Размер страницы; по умолчанию 100"),
+    offset: Optional[int] = Query(None, ge=0, description="Смещение страницы; по умолчанию 0"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Все фильмы или, если заданы жанры, страница фильмов с этими жанрами.
+
+    Полный список не постраничный, поэтому match, limit и offset без genres отклоняются.
+    """
     film_service = FilmService(session)
+    if genres:
+        genre_names = [name.strip() for name in genres.split(",") if name.strip()]
+        return await film_service.get_films_by_genre_names(
+            genre_names, (match or "all") == "all", 100 if limit is None else limit, offset or 0
+        )
+    if match is not None or limit is not None or offset is not None:
+        raise HTTPException(status_code=422, detail="match, limit and offset require genres")
     films = await film_service.get_all_films()
     return films
 
+@app.get("/films/autocomplete", response_model=List[str])
+async def autocomplete_films(
+    prefix: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    rank: Optional[Literal["alphabetical", "shortest", "newest"]] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Подсказки названий фильмов по началу названия (без учета регистра и диакритики).
+
+    :param prefix: Начало названия.
+    :param limit: Количество подсказок.
+    :param rank: Порядок подсказок; по умолчанию AUTOCOMPLETE_RANKING.
+    :return: Список названий.
+    """
+    film_service = FilmService(session)
+    return await film_service.autocomplete_titles(prefix, limit, rank or settings.AUTOCOMPLETE_RANKING)
+
 @app.get("/films/{film_name}", response_model=Film)
 async def get_film_data(film_name: str, session: AsyncSession = Depends(get_session)):
     film_service = FilmService(session)
@@ -69,6 +168,19 @@ async def get_film_data(film_name: str, session: AsyncSession = Depends(get_sess
         raise HTTPException(status_code=404, detail="Film not found")
     return film
 
+@app.get("/films/{film_name}/similar", response_model=List[SimilarFilm])
+async def get_similar_films(
+    film_name: str,
+    k: int = Query(10, ge=1, le=100),
+    metric: Literal["jaccard", "cosine"] = "jaccard",
+    session: AsyncSession = Depends(get_session),
+):
+    film_service = FilmService(session)
+    similar = await film_service.get_similar_films(film_name, k, metric)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Film not found")
+    return similar
+
 @app.put("/films/{film_name}", response_model=Film)
 async def update_film(film_name: str, updated_film: Film, session: AsyncSession = Depends(get_session)):
     film_service = FilmService(session)
@@ -100,13 +212,40 @@ async def get_films_by_genre(genre_name: str, session: AsyncSession = Depends(ge
     return films
 
 @app.get("/video/{video_name}")
-async def stream_video(video_name: str):
+async def stream_video(
+    video_name: str,
+    t: Optional[float] = Query(None, ge=0, description="Начать с ближайшего ключевого кадра не позже t секунд"),
+    session: AsyncSession = Depends(get_session),
+):
     """
     Стриминг видео из S3 хранилища.
     
     :param video_name: Имя файла видео в S3.
-    :return: StreamingResponse для видео.
+    :param t: Время в секундах; чтение из S3 начинается со смещения ключевого кадра из индекса.
+    :return: StreamingResponse для видео; при t — 206 с Content-Range от ключевого кадра до конца файла.
     """
+    if t is not None:
+        index = await VideoService(session).get_video_index(video_name)
+        if index is None:
+            raise HTTPException(status_code=404, detail="Keyframe index not found for video")
+        keyframe_time, start_byte = index.keyframe_at(t)
+
+        try:
+            video_file, size = get_video_range_from_s3(settings.S3_BUCKET_NAME, video_name, start_byte)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        # Ответ — диапазон байтов файла, поэтому плееры и прокси видят, какая часть отдана;
+        # X-Keyframe-* остаются подсказкой о времени кадра, с которого начинается диапазон.
+        headers = {
+            "Content-Range": f"bytes {start_byte}-{size - 1}/{size}",
+            "Content-Length": str(size - start_byte),
+            "Accept-Ranges": "bytes",
+            "X-Keyframe-Time": f"{keyframe_time:.3f}",
+            "X-Keyframe-Offset": str(start_byte),
+        }
+        return StreamingResponse(video_file, status_code=206, media_type="video/mp4", headers=headers)
+
     try:
         # Получаем видео с S3
         video_file = get_video_from_s3(settings.S3_BUCKET_NAME, video_name)
@@ -119,31 +258,44 @@ async def stream_video(video_name: str):
 
 
 @app.post("/upload/")
-async def upload_file(file: UploadFile = File(...), bucket_name: str = "your-bucket-name"):
+async def upload_file(
+    file: UploadFile = File(...),
+    bucket_name: str = "your-bucket-name",
+    session: AsyncSession = Depends(get_session),
+):
     """
     Эндпоинт для загрузки файла на S3 (MinIO).
 
+    После загрузки для MP4 строится индекс ключевых кадров для перемотки по времени;
+    ошибка индексации не отменяет загрузку.
+
     :param file: Файл, который будет загружен.
     :param bucket_name: Название бакета для загрузки.
     :return: Ответ с успешным сообщением.
     """
+    file_location = f"temp/{file.filename}"
     try:
         # Сохраняем файл локально
-        file_location = f"temp/{file.filename}"
         with open(file_location, "wb") as f:
-            f.write(file.file.read())
+            # Копируем частями, чтобы не держать весь файл в памяти
+            shutil.copyfileobj(file.file, f, UPLOAD_CHUNK_SIZE)
 
         # Загружаем файл на S3
         upload_to_s3(file_location, bucket_name, file.filename)
 
-        # Удаляем временный файл
-        os.remove(file_location)
+        # Индексируем ключевые кадры MP4
+        await VideoService(session).index_video(file_location, file.filename)
 
         return {"message": f"File '{file.filename}' uploaded successfully to bucket '{bucket_name}'."}
 
     except Exception as e:
         return {"error": f"An error occurred: {str(e)}"}
 
+    finally:
+        # Удаляем временный файл, в том числе если загрузка или индексация упали
+        if os.path.exists(file_location):
+            os.remove(file_location)
+
 
 
 
@@ -0,0 +1,123 @@
+import hmac
+import tracemalloc
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from starlette.responses import FileResponse, StreamingResponse
+
+from app.domain.repositories.FilmRepository import FilmRepository
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+from app.infrastructure.db.Settings import settings
+from app.infrastructure.export.CatalogWriters import TEXT_FORMATS
+from app.infrastructure.profiling import MemoryProfiler, SamplingProfiler
+from app.infrastructure.profiling.MemoryProfiler import snapshot_store
+from app.infrastructure.server.AdmissionControl import admission_controller
+
+
+
+def require_admin_token(x_admin_token: str = Header("")) -> None:
+    """
+    Пускает к админским эндпоинтам только с заголовком x-admin-token, равным ADMIN_TOKEN.
+
+    Без ADMIN_TOKEN эндпоинты отключены: они отдают каталог целиком и включают профилирование.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled, set ADMIN_TOKEN")
+    if not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing x-admin-token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/export")
+async def export_catalog(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    after_id: int = 0,
+    batch_size: int = Query(1000, ge=1, le=50000),
+):
+    """
+    Потоковая выгрузка каталога фильмов с жанрами.
+
+    :param export_format: ndjson или csv (parquet доступен только в CLI app.scripts.export_catalog).
+    :param after_id: Выгружать фильмы с ID больше указанного.
+    :param batch_size: Размер батча серверного курсора.
+    :return: StreamingResponse с выгрузкой.
+    """
+    fmt = TEXT_FORMATS[export_format]
+
+    async def body():
+        # Сессия живет столько же, сколько ответ, поэтому открывается внутри генератора, а не через Depends.
+        async with AsyncSessionLocal() as session:
+            yield fmt.header()
+            async for batch in FilmRepository(session).stream_films_with_genres(after_id, batch_size):
+                yield fmt.encode(batch)
+
+    return StreamingResponse(
+        body(),
+        media_type=fmt.media_type,
+        headers={"Content-Disposition": f'attachment; filename="catalog.{fmt.extension}"'},
+    )
+
+
+@router.get("/admission")
+async def get_admission_stats():
+    """
+    Состояние admission control по классам маршрутов: занятые слоты, глубина очереди,
+    число допущенных, отклоненных (shed) и отклоненных по таймауту очереди запросов.
+    """
+    return admission_controller.stats()
+
+
+@router.post("/memory/snapshot")
+async def take_memory_snapshot(top: int = Query(20, ge=1, le=500)):
+    """
+    Делает базовый снимок аллокаций (и включает tracemalloc, если он выключен).
+
+    Аллокации, сделанные до включения tracemalloc, в снимок не попадают.
+    Пока tracemalloc включен, каждая аллокация замедляется; выключение — POST /admin/memory/stop.
+    """
+    MemoryProfiler.start()
+    return snapshot_store.take_baseline(top)
+
+
+@router.post("/memory/stop")
+async def stop_memory_profiling():
+    """
+    Выключает tracemalloc и сбрасывает базовый снимок.
+
+    При MEMORY_PROFILING_ENABLED пик аллокаций на запрос перестает измеряться
+    до следующего POST /admin/memory/snapshot.
+    """
+    MemoryProfiler.stop()
+    return {"tracing": False}
+
+
+@router.get("/memory/diff")
+async def get_memory_diff(top: int = Query(20, ge=1, le=500)):
+    """
+    Места аллокаций с наибольшим приростом памяти с момента базового снимка.
+    """
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="Memory profiling is off, call POST /admin/memory/snapshot first")
+    return snapshot_store.diff(top)
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    Сохраненные профили запросов, новые первыми.
+    """
+    return SamplingProfiler.list_profiles(settings.PROFILING_OUTPUT_DIR)
+
+
+@router.get("/profiles/{name}")
+async def get_profile(name: str):
+    """
+    Файл профиля: collapsed stacks (flamegraph.pl, speedscope) или JSON для https://www.speedscope.app.
+    """
+    path = SamplingProfiler.profile_path(settings.PROFILING_OUTPUT_DIR, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if name.endswith(".json") else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=name)
@@ -0,0 +1,122 @@
+"""
+Бенчмарк TitlePrefixIndex на синтетическом каталоге названий.
+
+    python -m app.scripts.bench_autocomplete --films 1000000
+"""
+import asyncio
+import random
+import time
+from typing import List
+
+import typer
+
+from app.infrastructure.cache.CatalogEvents import CatalogEvent, FILM_DELETED, FILM_UPSERTED
+from app.infrastructure.cache.TitlePrefixIndex import RANKINGS, TitlePrefixIndex, normalize_title
+
+cli = typer.Typer()
+
+_WORDS = (
+    "the a last night dark star love war king city river shadow blue red iron lost secret house "
+    "road time dream fire winter summer ghost empire return day man woman world island moon "
+    "легенда ночь звезда любовь война город река тень зима лето дом дорога время мечта огонь"
+).split()
+
+
+def synthetic_titles(films: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    titles = set()
+    while len(titles) < films:
+        words = rng.choices(_WORDS, k=rng.randint(1, 4))
+        titles.add(" ".join(words).capitalize() + f" {rng.randint(1, 10 ** 6)}")
+    return list(titles)
+
+
+def _percentiles(latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    return f"p50 {p50 * 1000:6.3f} ms  p99 {p99 * 1000:6.3f} ms"
+
+
+async def _build_off_loop(index: TitlePrefixIndex, film_ids: List[int], titles: List[str]) -> float:
+    """Строит индекс в потоке, как ensure_loaded, и возвращает наибольшую задержку тика event loop."""
+    stall = 0.0
+
+    async def ticker():
+        nonlocal stall
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - started - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.to_thread(index.build, film_ids, titles)
+    task.cancel()
+    return stall
+
+
+@cli.command()
+def main(
+    films: int = typer.Option(1_000_000),
+    queries: int = typer.Option(20_000),
+    updates: int = typer.Option(2_000),
+    limit: int = typer.Option(10),
+    seed: int = typer.Option(0),
+):
+    """
+    Замеряет построение индекса, подсказки по префиксам длиной 1-6 и инкрементальные изменения.
+
+    cold — первый запрос каждого префикса сразу после построения, warm — повторные запросы.
+    """
+    titles = synthetic_titles(films, seed)
+    index = TitlePrefixIndex()
+    started = time.perf_counter()
+    stall = asyncio.run(_build_off_loop(index, list(range(1, films + 1)), titles))
+    index.loaded = True
+    print(f"build: {time.perf_counter() - started:.2f}s for {films} titles, {len(index.top)} precomputed tops, "
+          f"max event loop stall {stall * 1000:.1f} ms")
+
+    rng = random.Random(seed)
+    prefixes = [title[:rng.randint(1, 6)] for title in rng.choices(titles, k=queries)]
+    for ranking in RANKINGS:
+        for phase in ("cold", "warm"):
+            latencies = []
+            for prefix in (list(dict.fromkeys(prefixes)) if phase == "cold" else prefixes):
+                started = time.perf_counter()
+                index.complete(prefix, limit, ranking)
+                latencies.append(time.perf_counter() - started)
+            print(f"complete {ranking:>12} {phase}: {_percentiles(latencies)}")
+
+    next_id = films + 1
+    latencies = []
+    for _ in range(updates):
+        kind = rng.random()
+        started = time.perf_counter()
+        if kind < 0.5:
+            index.apply(CatalogEvent(FILM_UPSERTED, film_id=next_id, name=f"{rng.choice(_WORDS)} new {next_id}"))
+            next_id += 1
+        elif kind < 0.8:
+            film_id = rng.randint(1, films)
+            index.apply(CatalogEvent(FILM_UPSERTED, film_id=film_id, name=f"{rng.choice(_WORDS)} renamed {film_id}"))
+        else:
+            index.apply(CatalogEvent(FILM_DELETED, film_id=rng.randint(1, films)))
+        latencies.append(time.perf_counter() - started)
+    print(f"incremental update: {_percentiles(latencies)}")
+
+    # Сверка с полным перебором после изменений.
+    catalog = [(film_id, title, normalize_title(title)) for film_id, title in index.title_by_film_id.items()]
+    for prefix in prefixes[:50]:
+        key = normalize_title(prefix)
+        matches = [film for film in catalog if film[2].startswith(key)]
+        expected = {
+            "alphabetical": sorted(matches, key=lambda m: (m[2], m[0])),
+            "shortest": sorted(matches, key=lambda m: (len(m[2]), m[2], m[0])),
+            "newest": sorted(matches, key=lambda m: -m[0]),
+        }
+        for ranking in RANKINGS:
+            assert index.complete(prefix, limit, ranking) == [m[1] for m in expected[ranking][:limit]], (prefix, ranking)
+    print("results match brute force")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,143 @@
+"""
+Замер межпроцессной инвалидации кэшей через LISTEN/NOTIFY на локальном PostgreSQL.
+
+Запускает N процессов со слушателем CatalogListener, переименовывает тестовый фильм
+через FilmRepository и замеряет, через сколько каждый процесс получает событие
+(от начала записи до публикации в его локальную шину). Затем обрывает LISTEN-соединения
+через pg_terminate_backend и замеряет переподключение с CATALOG_RESYNC и доставку после него.
+
+    python -m app.scripts.bench_invalidation --listeners 4 --updates 200
+"""
+import asyncio
+import math
+import multiprocessing
+import queue
+import time
+import uuid
+from typing import Dict, List
+
+import typer
+from sqlalchemy import text
+
+from app.domain.models.Film import Film
+from app.domain.repositories.FilmRepository import FilmRepository
+from app.infrastructure.cache.CatalogEvents import CATALOG_RESYNC, FILM_UPSERTED, CatalogEvent, catalog_events
+from app.infrastructure.cache.CatalogNotifications import APPLICATION_NAME, catalog_listener
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+
+cli = typer.Typer()
+
+_RESYNC = "\0resync"
+
+
+def _listener_process(index: int, prefix: str, events, stop) -> None:
+    async def run() -> None:
+        def on_event(event: CatalogEvent) -> None:
+            if event.kind == CATALOG_RESYNC:
+                events.put((index, _RESYNC, time.time()))
+            elif event.kind == FILM_UPSERTED and event.name.startswith(prefix):
+                events.put((index, event.name, time.time()))
+
+        catalog_events.subscribe(on_event)
+        await catalog_listener.start()
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        await catalog_listener.stop()
+
+    asyncio.run(run())
+
+
+def _percentiles(latencies: List[float]) -> str:
+    if not latencies:
+        return "no samples"
+    latencies = sorted(latencies)
+    # Ранговые перцентили: на малых выборках p99 — максимум, а не меньше медианы.
+    p50 = latencies[math.ceil(len(latencies) * 0.5) - 1]
+    p99 = latencies[math.ceil(len(latencies) * 0.99) - 1]
+    return f"p50 {p50 * 1000:7.2f} ms  p99 {p99 * 1000:7.2f} ms  max {latencies[-1] * 1000:7.2f} ms"
+
+
+async def _wait_for(events, name: str, listeners: int, timeout: float) -> Dict[int, float]:
+    """Время получения name каждым процессом; не дождавшиеся timeout отсутствуют в результате."""
+    received: Dict[int, float] = {}
+    deadline = time.monotonic() + timeout
+    while len(received) < listeners and time.monotonic() < deadline:
+        try:
+            index, received_name, received_at = await asyncio.to_thread(events.get, True, 0.1)
+        except queue.Empty:
+            continue
+        if received_name == name:
+            received[index] = received_at
+    return received
+
+
+async def _rename_round(film_id: int, prefix: str, label: str, updates: int, events, listeners: int,
+                        timeout: float) -> None:
+    latencies, missed = [], 0
+    async with AsyncSessionLocal() as session:
+        repository = FilmRepository(session)
+        for i in range(updates):
+            title = f"{prefix} {label} {i}"
+            started = time.time()
+            await repository.update_film(film_id, Film(title=title))
+            received = await _wait_for(events, title, listeners, timeout)
+            latencies.extend(received_at - started for received_at in received.values())
+            missed += listeners - len(received)
+    print(f"{label:>10}: {updates} updates x {listeners} listeners | {_percentiles(latencies)} | missed {missed}")
+
+
+async def _bench(listeners: int, updates: int, timeout: float) -> None:
+    prefix = f"invalidation-bench-{uuid.uuid4().hex[:8]}"
+    context = multiprocessing.get_context("spawn")
+    events, stop = context.Queue(), context.Event()
+    processes = [
+        context.Process(target=_listener_process, args=(index, prefix, events, stop), daemon=True)
+        for index in range(listeners)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        connected = await _wait_for(events, _RESYNC, listeners, 60.0)
+        if len(connected) < listeners:
+            raise typer.BadParameter(f"Only {len(connected)} of {listeners} listeners connected to PostgreSQL")
+
+        async with AsyncSessionLocal() as session:
+            film_id = await FilmRepository(session).add_film(Film(title=f"{prefix} initial"))
+
+        try:
+            await _rename_round(film_id, prefix, "live", updates, events, listeners, timeout)
+
+            # Разрыв: все LISTEN-соединения убиваются на стороне сервера.
+            started = time.time()
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE application_name = :name"),
+                    {"name": APPLICATION_NAME},
+                )
+            resynced = await _wait_for(events, _RESYNC, listeners, 60.0)
+            reconnects = [received_at - started for received_at in resynced.values()]
+            print(f"{'reconnect':>10}: {len(resynced)} of {listeners} resynced | {_percentiles(reconnects)}")
+
+            await _rename_round(film_id, prefix, "after-gap", updates, events, listeners, timeout)
+        finally:
+            async with AsyncSessionLocal() as session:
+                await FilmRepository(session).delete_film(film_id)
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(10)
+
+
+@cli.command()
+def main(
+    listeners: int = typer.Option(4, min=1, help="Количество процессов-слушателей."),
+    updates: int = typer.Option(200, min=1, help="Количество переименований в каждом раунде."),
+    timeout: float = typer.Option(5.0, help="Сколько секунд ждать доставки одного изменения."),
+):
+    """Замеряет задержку доставки изменений каталога между процессами и восстановление после разрыва."""
+    asyncio.run(_bench(listeners, updates, timeout))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,78 @@
+"""
+Бенчмарк выборки фильмов по нескольким жанрам при разной селективности жанров.
+
+Жанры берутся из genre_film_counts: редкие, средние и популярные. Для каждой
+комбинации замеряется SQL-запрос (GROUP BY id_film HAVING count = n) и
+пересечение множеств в CatalogSnapshot.
+
+    python -m app.scripts.bench_multi_genre --repeats 50
+"""
+import asyncio
+import time
+from typing import List
+
+import typer
+
+from app.domain.repositories.FilmGenresRepository import FilmGenresRepository
+from app.domain.repositories.GenreCountsRepository import GenreCountsRepository
+from app.infrastructure.cache.CatalogSnapshot import catalog_snapshot
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+
+cli = typer.Typer()
+
+
+def _percentiles(latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    return f"p50 {p50:7.2f} ms  p99 {p99:7.2f} ms"
+
+
+async def _bench(repeats: int, limit: int) -> None:
+    async with AsyncSessionLocal() as session:
+        genres = await GenreCountsRepository(session).get_all_genres_with_counts()
+    genres = sorted((g for g in genres if g[1] > 0), key=lambda g: g[1])
+    if len(genres) < 3:
+        raise typer.BadParameter("Нужно хотя бы три жанра с фильмами (см. app.scripts.rebuild_genre_counts)")
+
+    rare, middle, popular = genres[0], genres[len(genres) // 2], genres[-1]
+    combinations = {
+        "rare+popular": [rare, popular],
+        "middle+popular": [middle, popular],
+        "popular+popular": [genres[-2], popular],
+        "rare+middle+popular": [rare, middle, popular],
+    }
+
+    await catalog_snapshot.refresh(AsyncSessionLocal, full=True)
+
+    for label, combination in combinations.items():
+        counts = "/".join(str(count) for _, count in combination)
+        names = [genre.name for genre, _ in combination]
+        genre_ids = [genre.id for genre, _ in combination]
+
+        for match_all in (True, False):
+            sql, memory = [], []
+            async with AsyncSessionLocal() as session:
+                repository = FilmGenresRepository(session)
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    await repository.get_film_ids_by_genre_ids(genre_ids, match_all, limit, 0)
+                    sql.append((time.perf_counter() - started) * 1000)
+
+            for _ in range(repeats):
+                started = time.perf_counter()
+                catalog_snapshot.get_films_by_genres(names, match_all, limit, 0)
+                memory.append((time.perf_counter() - started) * 1000)
+
+            match = "all" if match_all else "any"
+            print(f"{label:>20} ({counts:>15}) {match:>3} | SQL {_percentiles(sql)} | snapshot {_percentiles(memory)}")
+
+
+@cli.command()
+def main(repeats: int = typer.Option(50, min=1), limit: int = typer.Option(100, min=1)):
+    """Замеряет выборку по нескольким жанрам в БД и в снимке каталога."""
+    asyncio.run(_bench(repeats, limit))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,75 @@
+"""
+Бенчмарк GenreMatrixIndex на синтетическом каталоге.
+
+    python -m app.scripts.bench_similar --films 1000000 --genres 40
+"""
+import time
+
+import numpy as np
+import typer
+
+from app.infrastructure.cache.CatalogEvents import CatalogEvent, GENRE_LINKED
+from app.infrastructure.cache.GenreMatrixIndex import COSINE, JACCARD, GenreMatrixIndex
+
+cli = typer.Typer()
+
+
+def synthetic_catalog(films: int, genres: int, max_genres_per_film: int, seed: int):
+    """
+    Генерирует каталог, где популярность жанров убывает по закону Ципфа.
+
+    :return: film_ids, titles, link_film_ids, link_genre_ids.
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, genres + 1)
+    weights /= weights.sum()
+
+    per_film = rng.integers(1, max_genres_per_film + 1, size=films)
+    link_film_ids = np.repeat(np.arange(1, films + 1), per_film)
+    link_genre_ids = rng.choice(np.arange(1, genres + 1), size=len(link_film_ids), p=weights)
+
+    # Повторные жанры у одного фильма схлопываются, как в film_genres с составным PK.
+    links = np.unique(np.stack([link_film_ids, link_genre_ids], axis=1), axis=0)
+    film_ids = np.arange(1, films + 1)
+    titles = [f"film-{i}" for i in film_ids]
+    return film_ids, titles, links[:, 0], links[:, 1]
+
+
+@cli.command()
+def main(
+    films: int = typer.Option(1_000_000),
+    genres: int = typer.Option(40),
+    max_genres_per_film: int = typer.Option(5),
+    queries: int = typer.Option(200),
+    k: int = typer.Option(10),
+    seed: int = typer.Option(42),
+):
+    """Строит индекс и измеряет задержку запроса похожих фильмов."""
+    film_ids, titles, link_film_ids, link_genre_ids = synthetic_catalog(films, genres, max_genres_per_film, seed)
+
+    index = GenreMatrixIndex()
+    started = time.perf_counter()
+    index.build(film_ids, titles, link_film_ids, link_genre_ids)
+    print(f"Built index: {films} films, {len(link_film_ids)} links in {time.perf_counter() - started:.2f}s, "
+          f"matrix {index.bits.nbytes / 1024 / 1024:.1f} MiB")
+
+    rng = np.random.default_rng(seed + 1)
+    sample = [titles[i] for i in rng.integers(0, films, size=queries)]
+    for metric in (JACCARD, COSINE):
+        latencies = []
+        for title in sample:
+            started = time.perf_counter()
+            index.similar(title, k, metric)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        print(f"{metric:>8}: p50 {latencies[len(latencies) // 2]:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms, max {latencies[-1]:.2f} ms")
+
+    started = time.perf_counter()
+    for i in range(1000):
+        index.apply(CatalogEvent(GENRE_LINKED, film_id=int(film_ids[i]), genre_id=1 + i % genres))
+    print(f"Incremental link updates: {(time.perf_counter() - started) * 1000:.3f} ms per 1000")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,92 @@
+"""
+Бенчмарк масштабирования лаунчера: пропускная способность и задержки от 1 до N воркеров.
+
+    python -m app.scripts.bench_workers --max-workers 8 --path /genres/
+"""
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+import httpx
+import typer
+
+cli = typer.Typer()
+
+
+async def _wait_ready(client: httpx.AsyncClient, workers: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/health/workers")
+            if response.status_code == 200 and all(w["pid"] for w in response.json()[:workers]):
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Workers did not become ready in time")
+
+
+async def _load(client: httpx.AsyncClient, path: str, concurrency: int, duration: float) -> List[float]:
+    latencies: List[float] = []
+    deadline = time.monotonic() + duration
+
+    async def user():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return latencies
+
+
+async def _bench(workers: int, port: int, path: str, concurrency: int, duration: float, db_connections: int) -> dict:
+    server = subprocess.Popen([
+        sys.executable, "-m", "app.scripts.serve",
+        "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1",
+        "--db-connections", str(db_connections), "--log-level", "warning",
+    ])
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+            await _wait_ready(client, workers, timeout=60)
+            await _load(client, path, concurrency, duration=min(2.0, duration))  # прогрев
+            latencies = await _load(client, path, concurrency, duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    return {
+        "workers": workers,
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+@cli.command()
+def main(
+    max_workers: int = typer.Option(4, min=1),
+    path: str = typer.Option("/health/workers", help="Эндпоинт под нагрузкой."),
+    concurrency: int = typer.Option(64),
+    duration: float = typer.Option(10.0),
+    port: int = typer.Option(8099),
+    db_connections: int = typer.Option(80),
+):
+    """Прогоняет нагрузку при 1..max_workers воркерах и печатает таблицу."""
+    print(f"{'workers':>8} {'rps':>10} {'p50, ms':>10} {'p99, ms':>10} {'speedup':>8}")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        result = asyncio.run(_bench(workers, port, path, concurrency, duration, db_connections))
+        baseline = baseline or result["rps"]
+        print(f"{result['workers']:>8} {result['rps']:>10.0f} {result['p50_ms']:>10.2f} "
+              f"{result['p99_ms']:>10.2f} {result['rps'] / baseline:>8.2f}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,37 @@
+"""
+Проверка потребления памяти стриминговых и массовых эндпоинтов под tracemalloc.
+
+Сами проверки — app/tests/test_memory_endpoints.py; скрипт запускает их с большими
+размерами. Завершается с ненулевым кодом, если пик аллокаций превысил границу.
+
+    python -m app.scripts.check_memory --video-gb 4 --upload-gb 1 --films 1000000
+"""
+import os
+
+import pytest
+import typer
+
+cli = typer.Typer()
+
+TESTS = os.path.join(os.path.dirname(__file__), "..", "tests", "test_memory_endpoints.py")
+
+
+@cli.command()
+def main_command(
+    video_gb: float = typer.Option(4.0),
+    upload_gb: float = typer.Option(1.0),
+    films: int = typer.Option(1_000_000),
+    stream_bound_mb: float = typer.Option(32.0, help="Граница пика для стриминга видео и загрузки."),
+):
+    """Прогоняет эндпоинты и сравнивает пик аллокаций с границами."""
+    os.environ.update(
+        MEMORY_CHECK_VIDEO_MB=str(int(video_gb * 1024)),
+        MEMORY_CHECK_UPLOAD_MB=str(int(upload_gb * 1024)),
+        MEMORY_CHECK_FILMS=str(films),
+        MEMORY_CHECK_STREAM_BOUND_MB=str(stream_bound_mb),
+    )
+    raise typer.Exit(code=pytest.main(["-q", "-s", "-p", "no:cacheprovider", os.path.normpath(TESTS)]))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,97 @@
+"""
+Потоковая выгрузка каталога (фильмы + жанры) в NDJSON, CSV или Parquet.
+
+    python -m app.scripts.export_catalog catalog.ndjson.gz --format ndjson --compression gzip
+    python -m app.scripts.export_catalog catalog.ndjson.gz --format ndjson --compression gzip --resume
+    python -m app.scripts.export_catalog catalog.parquet --format parquet --compression zstd --after-id 500000
+
+Текстовые выгрузки после каждого батча записывают контрольную точку <файл>.checkpoint
+(ID последнего фильма и размер файла); --resume продолжает с нее после сбоя без повторов.
+"""
+import asyncio
+import json
+import os
+from typing import Optional, Tuple
+
+import typer
+
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+from app.infrastructure.export.CatalogWriters import EXPORT_FORMATS, TextFileWriter, open_writer
+from app.use_cases.CatalogExportService import CatalogExportService, ExportStats
+
+cli = typer.Typer()
+
+
+def checkpoint_path(output: str) -> str:
+    return f"{output}.checkpoint"
+
+
+def _save_checkpoint(output: str, last_id: int, size: int) -> None:
+    path = checkpoint_path(output)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump({"last_id": last_id, "size": size}, f)
+    os.replace(temporary, path)
+
+
+def _load_checkpoint(output: str) -> Optional[Tuple[int, int]]:
+    """:return: ID последнего записанного фильма и размер файла после его батча или None."""
+    try:
+        with open(checkpoint_path(output)) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    return checkpoint["last_id"], checkpoint["size"]
+
+
+async def _export(output: str, export_format: str, compression: Optional[str], after_id: int, batch_size: int,
+                  progress_every: int, resume: bool = False) -> ExportStats:
+    checkpoint = _load_checkpoint(output) if resume else None
+    if checkpoint is not None:
+        after_id, size = checkpoint
+        # Батч, прерванный сбоем, в контрольную точку не попал: хвост файла после нее отбрасывается.
+        os.truncate(output, size)
+    # С --after-id и --resume выгрузка продолжается в тот же файл, а не перезаписывает уже выгруженное.
+    writer = open_writer(output, export_format, compression, append=after_id > 0)
+    batches = 0
+
+    def on_batch(stats: ExportStats) -> None:
+        nonlocal batches
+        batches += 1
+        if isinstance(writer, TextFileWriter):
+            _save_checkpoint(output, stats.last_id, writer.flush())
+        if batches % progress_every == 0:
+            print(f"{stats.rows} rows, last id {stats.last_id}, {stats.rows_per_second:.0f} rows/sec")
+
+    try:
+        async with AsyncSessionLocal() as session:
+            return await CatalogExportService(session).export(writer, after_id, batch_size, on_batch)
+    finally:
+        writer.close()
+
+
+@cli.command()
+def export(
+    output: str = typer.Argument(..., help="Путь к выходному файлу."),
+    export_format: str = typer.Option("ndjson", "--format", help=f"Один из {EXPORT_FORMATS}."),
+    compression: Optional[str] = typer.Option(None, help="gzip для ndjson/csv; snappy, zstd, gzip для parquet."),
+    after_id: int = typer.Option(0, help="Продолжить выгрузку после фильма с этим ID (дописывается в конец файла)."),
+    batch_size: int = typer.Option(5000, min=1),
+    progress_every: int = typer.Option(20, min=1, help="Печатать прогресс каждые N батчей."),
+    resume: bool = typer.Option(
+        False, help="Продолжить текстовую выгрузку с контрольной точки <файл>.checkpoint (без нее — начать заново).",
+    ),
+):
+    """Выгружает каталог, не загружая его целиком в память."""
+    if resume and after_id:
+        raise typer.BadParameter("--resume takes the position from the checkpoint, do not combine it with --after-id")
+    try:
+        stats = asyncio.run(_export(output, export_format, compression, after_id, batch_size, progress_every, resume))
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    print(f"Exported {stats.rows} rows in {stats.seconds:.1f}s ({stats.rows_per_second:.0f} rows/sec), "
+          f"last id {stats.last_id} (resume with --after-id {stats.last_id})")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,23 @@
+"""
+Печатает значение заголовка x-profile-token для профилирования одного запроса.
+
+    curl -H "x-profile-token: $(python -m app.scripts.profile_token)" -i http://localhost:8000/films/
+"""
+import typer
+
+from app.infrastructure.db.Settings import settings
+from app.infrastructure.profiling.SamplingProfiler import make_token
+
+cli = typer.Typer()
+
+
+@cli.command()
+def main(ttl: int = typer.Option(300, min=1, help="Срок действия токена, секунд.")):
+    """Подписывает токен секретом PROFILING_SECRET."""
+    if not settings.PROFILING_SECRET:
+        raise typer.BadParameter("PROFILING_SECRET не задан")
+    print(make_token(settings.PROFILING_SECRET, ttl))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,32 @@
+"""
+Пересчет таблицы genre_film_counts по film_genres.
+
+Таблицу создает и заполняет миграция 0002_genre_film_counts; пересчет нужен, если во время
+выкатки старая версия сервиса еще меняла film_genres без обновления счетчиков.
+
+    python -m app.scripts.rebuild_genre_counts
+"""
+import asyncio
+
+import typer
+
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+from app.use_cases.GenreService import GenreService
+
+cli = typer.Typer()
+
+
+async def _rebuild() -> int:
+    async with AsyncSessionLocal() as session:
+        return await GenreService(session).rebuild_genre_counts()
+
+
+@cli.command()
+def rebuild():
+    """Пересчитывает таблицу счетчиков с нуля."""
+    genres = asyncio.run(_rebuild())
+    print(f"Genre counts rebuilt: {genres} genres with films")
+
+
+if __name__ == "__main__":
+    cli()
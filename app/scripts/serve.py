@@ -0,0 +1,207 @@
+"""
+Продакшн-лаунчер: супервизор, запускающий N воркеров uvicorn на общем сокете.
+
+    python -m app.scripts.serve --workers 4 --db-connections 80 --port 80
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import tempfile
+import time
+from typing import Dict, Optional
+
+import typer
+import uvicorn
+
+from app.infrastructure.server import WorkerHealth
+from app.infrastructure.server.WorkerHealth import WorkerHealthRegistry, read_rss_bytes
+
+cli = typer.Typer()
+
+
+def split_db_pool(budget: int, workers: int, reserved_per_worker: int) -> Dict[str, str]:
+    """
+    Делит общий бюджет соединений с PostgreSQL между воркерами.
+
+    Половина доли воркера уходит в постоянный пул, остаток — в overflow, так что
+    сумма pool_size + max_overflow по всем воркерам не превышает бюджет.
+
+    :param budget: Сколько соединений сервис может занять суммарно (меньше max_connections).
+    :param workers: Количество воркеров.
+    :param reserved_per_worker: Соединения воркера вне пула (LISTEN-соединение CatalogNotifications).
+    :return: Переменные окружения для Settings воркера.
+    :raises ValueError: Если в бюджете не помещается хотя бы одно соединение пула на воркер.
+    """
+    per_worker = budget // workers - reserved_per_worker
+    if per_worker < 1:
+        raise ValueError(
+            f"Budget of {budget} connections is too small for {workers} workers "
+            f"with {reserved_per_worker} reserved connection(s) each, need at least {workers * (reserved_per_worker + 1)}"
+        )
+    pool_size = max(1, per_worker // 2)
+    return {
+        "DB_POOL_SIZE": str(pool_size),
+        "DB_MAX_OVERFLOW": str(per_worker - pool_size),
+    }
+
+
+def _run_worker(slot: int, sockets, registry: WorkerHealthRegistry, env: Dict[str, str], config_kwargs: dict) -> None:
+    # Окружение выставляется до импорта app.main, иначе Settings и движок уже будут созданы.
+    os.environ.update(env)
+    WorkerHealth.attach(registry, slot)
+    config = uvicorn.Config("app.main:app", **config_kwargs)
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+class Supervisor:
+    def __init__(
+        self,
+        workers: int,
+        config: uvicorn.Config,
+        env: Dict[str, str],
+        max_requests: Optional[int],
+        max_requests_jitter: int,
+        max_memory_bytes: Optional[int],
+        drain_timeout: float,
+        check_interval: float = 1.0,
+    ):
+        self.workers = workers
+        self.config = config
+        # Воркеры выгружают метрики в общий каталог, /metrics любого воркера отдает их все.
+        self.metrics_dir = tempfile.mkdtemp(prefix="film-svc-metrics-")
+        self.env = {**env, "METRICS_MULTIPROCESS_DIR": self.metrics_dir}
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.max_memory_bytes = max_memory_bytes
+        self.drain_timeout = drain_timeout
+        self.check_interval = check_interval
+
+        self.ctx = multiprocessing.get_context("spawn")
+        self.registry = WorkerHealthRegistry.shared(self.ctx, workers)
+        self.sockets = [config.bind_socket()]
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.recycling: Dict[int, float] = {}
+        self.should_exit = False
+
+    def _config_kwargs(self) -> dict:
+        limit = None
+        if self.max_requests:
+            # Разброс, чтобы воркеры не перезапускались одновременно.
+            limit = self.max_requests + random.randint(0, self.max_requests_jitter)
+        return {
+            "log_level": self.config.log_level,
+            "proxy_headers": self.config.proxy_headers,
+            "forwarded_allow_ips": self.config.forwarded_allow_ips,
+            "timeout_graceful_shutdown": self.drain_timeout,
+            "limit_max_requests": limit,
+        }
+
+    def _spawn(self, slot: int, restarted: bool = False) -> None:
+        process = self.ctx.Process(
+            target=_run_worker,
+            args=(slot, self.sockets, self.registry, self.env, self._config_kwargs()),
+            name=f"film-svc-worker-{slot}",
+        )
+        process.start()
+        self.processes[slot] = process
+        self.recycling.pop(slot, None)
+        self.registry.mark_started(slot, process.pid, restarted=restarted)
+
+    def _handle_exit(self, signum, frame) -> None:
+        self.should_exit = True
+
+    def _check_workers(self) -> None:
+        for slot, process in list(self.processes.items()):
+            if not process.is_alive():
+                process.join()
+                print(f"Worker {slot} (pid {process.pid}) exited with code {process.exitcode}, restarting")
+                self._spawn(slot, restarted=True)
+                continue
+
+            rss = read_rss_bytes(process.pid)
+            self.registry.set_rss(slot, rss)
+
+            if self.max_memory_bytes and rss > self.max_memory_bytes and slot not in self.recycling:
+                print(f"Worker {slot} (pid {process.pid}) RSS {rss} exceeds limit, recycling")
+                self.recycling[slot] = time.monotonic()
+                process.terminate()
+            elif slot in self.recycling and time.monotonic() - self.recycling[slot] > self.drain_timeout:
+                process.kill()
+
+    def _shutdown(self) -> None:
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.drain_timeout
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+        for sock in self.sockets:
+            sock.close()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+        try:
+            while not self.should_exit:
+                time.sleep(self.check_interval)
+                if not self.should_exit:
+                    self._check_workers()
+        finally:
+            self._shutdown()
+
+
+@cli.command()
+def serve(
+    host: str = typer.Option("0.0.0.0", envvar="WEB_HOST"),
+    port: int = typer.Option(8000, envvar="WEB_PORT"),
+    workers: int = typer.Option(os.cpu_count() or 1, envvar="WEB_WORKERS", min=1),
+    db_connections: int = typer.Option(
+        80, envvar="DB_CONNECTION_BUDGET",
+        help="Общий бюджет соединений с PostgreSQL на все воркеры (оставьте запас до max_connections).",
+    ),
+    max_requests: int = typer.Option(0, envvar="WEB_MAX_REQUESTS", help="Перезапуск воркера после N запросов, 0 — без ограничения."),
+    max_requests_jitter: int = typer.Option(0, envvar="WEB_MAX_REQUESTS_JITTER"),
+    max_memory_mb: int = typer.Option(0, envvar="WEB_MAX_MEMORY_MB", help="Перезапуск воркера при превышении RSS, 0 — без ограничения."),
+    drain_timeout: float = typer.Option(30.0, envvar="WEB_DRAIN_TIMEOUT", help="Сколько секунд ждать завершения запросов при остановке."),
+    catalog_notify: bool = typer.Option(
+        True, "--catalog-notify/--no-catalog-notify", envvar="CATALOG_NOTIFY_ENABLED",
+        help="Согласование кэшей воркеров через LISTEN/NOTIFY (по соединению на воркер сверх пула).",
+    ),
+    log_level: str = typer.Option("info", envvar="WEB_LOG_LEVEL"),
+):
+    """Запускает сервис в нескольких процессах."""
+    try:
+        env = split_db_pool(db_connections, workers, reserved_per_worker=1 if catalog_notify else 0)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--db-connections")
+    # Воркеры читают настройку из окружения: бюджет посчитан для того же значения.
+    env["CATALOG_NOTIFY_ENABLED"] = str(catalog_notify).lower()
+
+    config = uvicorn.Config("app.main:app", host=host, port=port, log_level=log_level, proxy_headers=True)
+    supervisor = Supervisor(
+        workers=workers,
+        config=config,
+        env=env,
+        max_requests=max_requests or None,
+        max_requests_jitter=max_requests_jitter,
+        max_memory_bytes=max_memory_mb * 1024 * 1024 or None,
+        drain_timeout=drain_timeout,
+    )
+    print(f"Starting {workers} workers on {host}:{port}, worker env: {supervisor.env}")
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from app.infrastructure.db.Settings import settings
+from app.infrastructure.server.AdmissionControl import (
+    CHEAP_READ,
+    EXPORT,
+    HEAVY_LIST,
+    VIDEO,
+    WRITE,
+    AdmissionController,
+    AdmissionControlMiddleware,
+    AdmissionLimiter,
+    classify_route,
+)
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("GET", "/health/workers", None),
+    ("GET", "/metrics", None),
+    ("GET", "/video/movie.mp4", VIDEO),
+    ("POST", "/films/", WRITE),
+    ("GET", "/films/", HEAVY_LIST),
+    ("GET", "/films/genre/drama", HEAVY_LIST),
+    ("GET", "/admin/export", EXPORT),
+    ("GET", "/admin/export?format=csv", EXPORT),
+    ("GET", "/admin/admission", None),
+    ("GET", "/films/Heat", CHEAP_READ),
+    ("GET", "/genres/", CHEAP_READ),
+])
+def test_classify_route(method, path, expected):
+    assert classify_route(method, path) == expected
+
+
+def test_limiter_queues_then_sheds():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, max_queue=1, queue_timeout=1.0)
+        assert await limiter.acquire()
+
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not await limiter.acquire()
+
+        limiter.release()
+        assert await queued
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2
+    assert stats["shed"] == 1
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
+
+
+def test_limiter_times_out_in_queue():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, max_queue=4, queue_timeout=0.01)
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["shed"], stats["timed_out"], stats["active"], stats["queued"]) == (1, 1, 0, 0)
+
+
+def test_limiter_serves_waiters_in_order():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, max_queue=4, queue_timeout=1.0)
+        order = []
+
+        async def request(name):
+            assert await limiter.acquire()
+            order.append(name)
+            await asyncio.sleep(0)
+            limiter.release()
+
+        assert await limiter.acquire()
+        tasks = [asyncio.create_task(request(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return order, limiter.active
+
+    assert asyncio.run(scenario()) == (["a", "b", "c"], 0)
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        limiter = AdmissionLimiter("test", limit=1, max_queue=4, queue_timeout=1.0)
+        assert await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["active"], stats["queued"]) == (0, 0)
+
+
+def test_middleware_rejects_with_503_and_retry_after():
+    limiter = AdmissionLimiter(WRITE, limit=0, max_queue=0, queue_timeout=0.01)
+    controller = AdmissionController({WRITE: limiter}, retry_after=3)
+
+    async def app(scope, receive, send):
+        raise AssertionError("request must be shed")
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    middleware = AdmissionControlMiddleware(app, controller)
+    asyncio.run(middleware({"type": "http", "method": "POST", "path": "/films/"}, None, send))
+
+    start = messages[0]
+    assert start["status"] == 503
+    assert (b"retry-after", b"3") in start["headers"]
+    assert limiter.stats()["shed"] == 1
+
+
+def test_export_does_not_take_listing_slots():
+    controller = AdmissionController.from_settings(settings)
+    export = controller.limiter_for("GET", "/admin/export")
+    listing = controller.limiter_for("GET", "/films/")
+
+    async def scenario():
+        assert await export.acquire()
+        # Пока идет выгрузка, листинги получают все свои слоты, а вторая выгрузка — 503.
+        admitted = [await listing.acquire() for _ in range(settings.ADMISSION_HEAVY_LIST_LIMIT)]
+        return admitted, await export.acquire()
+
+    admitted, second_export = asyncio.run(scenario())
+    assert all(admitted)
+    assert export is not listing and not second_export
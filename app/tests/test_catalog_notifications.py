@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+
+import pytest
+
+pytest.importorskip("asyncpg")
+
+from app.infrastructure.cache import CatalogNotifications  # noqa: E402
+from app.infrastructure.cache.CatalogEvents import (  # noqa: E402
+    CATALOG_RESYNC,
+    FILM_UPSERTED,
+    GENRE_LINKED,
+    CatalogEvent,
+)
+from app.infrastructure.cache.CatalogNotifications import (  # noqa: E402
+    NOTIFY_RECEIVED,
+    CatalogListener,
+    from_payload,
+    notify_catalog_change,
+    to_payload,
+)
+
+# Предел PostgreSQL на payload NOTIFY.
+NOTIFY_PAYLOAD_LIMIT = 8000
+
+
+@pytest.mark.parametrize("event", [
+    CatalogEvent(FILM_UPSERTED, film_id=7, name="Ёлка «Новый год»", old_name="Ёлка"),
+    CatalogEvent(GENRE_LINKED, film_id=7, genre_id=3),
+    CatalogEvent(CATALOG_RESYNC),
+])
+def test_payload_roundtrip(event):
+    origin, sent_at, decoded = from_payload(to_payload(event, origin="worker-a"))
+
+    assert origin == "worker-a"
+    assert abs(sent_at - time.time()) < 5
+    assert decoded == event
+
+
+def test_payload_of_longest_titles_fits_notify_limit():
+    # Названия ограничены 255 символами; кириллица занимает по 2 байта, эмодзи — по 4.
+    event = CatalogEvent(FILM_UPSERTED, film_id=2 ** 31, name="😀" * 255, old_name="ж" * 255)
+
+    assert len(to_payload(event).encode()) < NOTIFY_PAYLOAD_LIMIT
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+    monkeypatch.setattr(CatalogNotifications.catalog_events, "publish", events.append)
+    return events
+
+
+def test_listener_publishes_events_of_other_processes(published):
+    listener = CatalogListener("catalog_changes", ping_seconds=1, reconnect_max_seconds=1, origin="worker-a")
+    event = CatalogEvent(FILM_UPSERTED, film_id=1, name="Heat")
+    received = NOTIFY_RECEIVED.values[()]
+
+    listener._on_notification(None, 1, "catalog_changes", to_payload(event, origin="worker-a"))
+    listener._on_notification(None, 1, "catalog_changes", to_payload(event, origin="worker-b"))
+
+    assert published == [event]
+    assert NOTIFY_RECEIVED.values[()] == received + 1
+
+
+@pytest.mark.parametrize("payload", [
+    "not json",
+    json.dumps({"sent_at": 0, "kind": FILM_UPSERTED}),
+    json.dumps({"origin": "worker-b", "sent_at": 0, "kind": FILM_UPSERTED, "unknown": 1}),
+])
+def test_malformed_notification_is_skipped(published, caplog, payload):
+    listener = CatalogListener("catalog_changes", ping_seconds=1, reconnect_max_seconds=1, origin="worker-a")
+
+    with caplog.at_level(logging.WARNING, logger=CatalogNotifications.__name__):
+        listener._on_notification(None, 1, "catalog_changes", payload)
+
+    assert published == []
+    assert "Malformed catalog notification" in caplog.text
+
+
+def test_notify_is_skipped_when_disabled(monkeypatch):
+    monkeypatch.setattr(CatalogNotifications.settings, "CATALOG_NOTIFY_ENABLED", False)
+
+    class FailingSession:
+        async def execute(self, statement):
+            raise AssertionError("NOTIFY must not be sent")
+
+    asyncio.run(notify_catalog_change(FailingSession(), CatalogEvent(CATALOG_RESYNC)))
+
+
+def test_delivery_and_resync_across_processes(db_schema):
+    """
+    Два процесса со слушателем: каждое переименование доходит до обоих, а после
+    pg_terminate_backend их LISTEN-соединений оба переподключаются с CATALOG_RESYNC
+    и снова получают изменения. Задержки печатаются (pytest -s).
+    """
+    from sqlalchemy import text
+
+    from app.domain.models.Film import Film
+    from app.domain.repositories.FilmRepository import FilmRepository
+    from app.infrastructure.db.CreateSession import AsyncSessionLocal
+    from app.scripts.bench_invalidation import _RESYNC, _listener_process, _percentiles, _wait_for
+
+    listeners, updates, prefix = 2, 20, "notify-test"
+    context = multiprocessing.get_context("spawn")
+    events, stop = context.Queue(), context.Event()
+    processes = [
+        context.Process(target=_listener_process, args=(index, prefix, events, stop), daemon=True)
+        for index in range(listeners)
+    ]
+
+    async def rename_round(film_id: int, label: str) -> list:
+        latencies = []
+        async with AsyncSessionLocal() as session:
+            repository = FilmRepository(session)
+            for i in range(updates):
+                title = f"{prefix} {label} {i}"
+                started = time.time()
+                await repository.update_film(film_id, Film(title=title))
+                received = await _wait_for(events, title, listeners, 10.0)
+                assert sorted(received) == list(range(listeners)), f"{title} delivered to {sorted(received)}"
+                latencies.extend(received_at - started for received_at in received.values())
+        return latencies
+
+    async def scenario():
+        connected = await _wait_for(events, _RESYNC, listeners, 60.0)
+        assert len(connected) == listeners
+
+        async with AsyncSessionLocal() as session:
+            film_id = await FilmRepository(session).add_film(Film(title=f"{prefix} initial"))
+        live = await rename_round(film_id, "live")
+
+        started = time.time()
+        async with AsyncSessionLocal() as session:
+            terminated = (await session.execute(
+                text("SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity WHERE application_name = :name"),
+                {"name": CatalogNotifications.APPLICATION_NAME},
+            )).scalar()
+        assert terminated >= listeners
+        resynced = await _wait_for(events, _RESYNC, listeners, 60.0)
+        assert len(resynced) == listeners
+        reconnects = [received_at - started for received_at in resynced.values()]
+
+        after_gap = await rename_round(film_id, "after-gap")
+        return live, reconnects, after_gap
+
+    for process in processes:
+        process.start()
+    try:
+        live, reconnects, after_gap = db_schema(scenario())
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(10)
+
+    print(f"\nlive: {_percentiles(live)}\nreconnect: {_percentiles(reconnects)}\nafter-gap: {_percentiles(after_gap)}")
@@ -0,0 +1,216 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import app.infrastructure.cache.CatalogSnapshot as snapshot_module
+from app.infrastructure.cache.CatalogEvents import CatalogEvent, FILM_DELETED, FILM_UPSERTED, GENRE_UPSERTED
+from app.infrastructure.cache.CatalogSnapshot import CatalogSnapshot
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _film(film_id, title, genre_ids=(), updated_at=T0):
+    return {"id": film_id, "title": title, "description": None, "creation_date": None, "file_link": None,
+            "genre_ids": list(genre_ids), "updated_at": updated_at}
+
+
+class FakeCatalog:
+    """Подменяет репозитории снимка: отдает заданные строки и запоминает аргументы запросов."""
+
+    def __init__(self, monkeypatch, films, genres):
+        self.films = films
+        self.genres = genres
+        self.calls = []
+        self.during_read = None
+        catalog = self
+
+        class GenreRepository:
+            def __init__(self, session):
+                pass
+
+            async def get_genres_updated_since(self, since, genre_ids=()):
+                catalog.calls.append(("genres", since, set(genre_ids)))
+                return list(catalog.genres)
+
+        class FilmRepository:
+            def __init__(self, session):
+                pass
+
+            async def get_films_with_genre_ids_updated_since(self, since, film_ids=()):
+                catalog.calls.append(("films", since, set(film_ids)))
+                if catalog.during_read is not None:
+                    catalog.during_read()
+                return list(catalog.films)
+
+            async def stream_films_with_genre_ids(self, batch_size=5000):
+                for start in range(0, len(catalog.films), batch_size):
+                    catalog.calls.append(("stream", start, batch_size))
+                    if catalog.during_read is not None:
+                        catalog.during_read()
+                    yield catalog.films[start:start + batch_size]
+
+        monkeypatch.setattr(snapshot_module, "GenreRepository", GenreRepository)
+        monkeypatch.setattr(snapshot_module, "FilmRepository", FilmRepository)
+
+    @staticmethod
+    @asynccontextmanager
+    async def session_factory():
+        yield None
+
+
+def _snapshot(budget=10 ** 9):
+    return CatalogSnapshot(refresh_seconds=1, max_staleness_seconds=60, full_resync_seconds=600,
+                           memory_budget_bytes=budget)
+
+
+def test_full_refresh_serves_films_by_genre(monkeypatch):
+    catalog = FakeCatalog(monkeypatch, [_film(1, "Heat", [1]), _film(2, "Fargo", [1, 2])],
+                          [SimpleNamespace(id=1, name="drama", updated_at=T0),
+                           SimpleNamespace(id=2, name="comedy", updated_at=T0)])
+    snapshot = _snapshot()
+
+    assert asyncio.run(snapshot.refresh(catalog.session_factory, full=True)) == 4
+    assert snapshot.is_fresh()
+    assert [film.title for film in snapshot.get_films_by_genre("drama")] == ["Heat", "Fargo"]
+    assert [g.name for g in snapshot.get_film("Fargo").genres] == ["drama", "comedy"]
+    assert snapshot.get_films_by_genres(["drama", "comedy"], True, 10, 0)[0].title == "Fargo"
+
+
+def test_delete_during_refresh_is_not_resurrected(monkeypatch):
+    catalog = FakeCatalog(monkeypatch, [_film(1, "Heat"), _film(2, "Fargo")], [])
+    snapshot = _snapshot()
+    asyncio.run(snapshot.refresh(catalog.session_factory, full=True))
+
+    # Строка Heat прочитана до удаления, а событие пришло, пока шло чтение.
+    catalog.during_read = lambda: snapshot.on_event(CatalogEvent(FILM_DELETED, film_id=1, name="Heat"))
+    asyncio.run(snapshot.refresh(catalog.session_factory))
+
+    assert snapshot.get_film("Heat") is None
+    assert snapshot.get_film("Fargo") is not None
+
+
+def test_changed_ids_are_refetched_regardless_of_watermark(monkeypatch):
+    catalog = FakeCatalog(monkeypatch, [_film(1, "Heat", updated_at=T0 + timedelta(hours=1))], [])
+    snapshot = _snapshot()
+    asyncio.run(snapshot.refresh(catalog.session_factory, full=True))
+
+    snapshot.on_event(CatalogEvent(FILM_UPSERTED, film_id=7, name="Late"))
+    snapshot.on_event(CatalogEvent(GENRE_UPSERTED, genre_id=3, name="noir"))
+    snapshot.on_event(CatalogEvent(FILM_UPSERTED, film_id=8, name="Gone"))
+    snapshot.on_event(CatalogEvent(FILM_DELETED, film_id=8, name="Gone"))
+    # Транзакция началась раньше watermark, а закоммичена позже.
+    catalog.films = [_film(7, "Late", updated_at=T0)]
+    asyncio.run(snapshot.refresh(catalog.session_factory))
+
+    assert catalog.calls[-2:] == [("genres", T0 + timedelta(hours=1) - timedelta(seconds=5), {3}),
+                                  ("films", T0 + timedelta(hours=1) - timedelta(seconds=5), {7})]
+    assert snapshot.get_film("Late") is not None
+    assert snapshot.watermark == T0 + timedelta(hours=1)
+
+    catalog.films = []
+    asyncio.run(snapshot.refresh(catalog.session_factory))
+    assert catalog.calls[-1][2] == set()
+
+
+def test_failed_refresh_keeps_changed_ids(monkeypatch):
+    catalog = FakeCatalog(monkeypatch, [_film(1, "Fargo")], [])
+    snapshot = _snapshot()
+    asyncio.run(snapshot.refresh(catalog.session_factory, full=True))
+    snapshot.on_event(CatalogEvent(FILM_UPSERTED, film_id=5, name="Heat"))
+
+    def fail():
+        raise ConnectionError("db is down")
+
+    catalog.during_read = fail
+    try:
+        asyncio.run(snapshot.refresh(catalog.session_factory))
+    except ConnectionError:
+        pass
+    catalog.during_read = None
+    asyncio.run(snapshot.refresh(catalog.session_factory))
+
+    assert catalog.calls[-1][2] == {5}
+
+
+def test_over_budget_snapshot_is_dropped_and_not_refreshed(monkeypatch):
+    catalog = FakeCatalog(monkeypatch, [_film(i, f"Film {i}") for i in range(100)], [])
+    snapshot = _snapshot(budget=5000)
+
+    asyncio.run(snapshot.refresh(catalog.session_factory, full=True))
+
+    assert snapshot.over_budget
+    assert not snapshot.is_fresh()
+    assert (snapshot.films_by_id, snapshot.memory_bytes, snapshot.watermark) == ({}, 0, None)
+
+    async def run_once():
+        snapshot.start(catalog.session_factory)
+        await asyncio.sleep(0.05)
+        await snapshot.stop()
+
+    # До следующего полного перечитывания фоновая задача не загружает снимок снова.
+    calls = len(catalog.calls)
+    asyncio.run(run_once())
+    assert len(catalog.calls) == calls
+
+    catalog.films = catalog.films[:2]
+    asyncio.run(snapshot.refresh(catalog.session_factory, full=True))
+    assert not snapshot.over_budget
+    assert snapshot.is_fresh()
+
+
+def test_full_resync_builds_off_loop_and_swaps(monkeypatch):
+    monkeypatch.setattr(snapshot_module, "_FULL_RESYNC_BATCH", 2)
+    catalog = FakeCatalog(monkeypatch, [_film(i, f"Film {i}") for i in range(1, 6)], [])
+    snapshot = _snapshot()
+    asyncio.run(snapshot.refresh(catalog.session_factory, full=True))
+    films_by_id = snapshot.films_by_id
+
+    put_threads = []
+    put_films = CatalogSnapshot._put_films
+
+    def recording_put_films(self, films):
+        put_threads.append(threading.current_thread())
+        return put_films(self, films)
+
+    monkeypatch.setattr(CatalogSnapshot, "_put_films", recording_put_films)
+    catalog.films = [_film(i, f"Film {i}") for i in range(2, 8)]
+
+    def read_batch():
+        # Пока идет чтение, запросы видят прежний снимок; удаление фильма из еще
+        # не прочитанного батча доходит и до нового.
+        assert snapshot.films_by_id is films_by_id
+        if catalog.calls[-1] == ("stream", 0, 2):
+            snapshot.on_event(CatalogEvent(FILM_DELETED, film_id=7, name="Film 7"))
+
+    catalog.during_read = read_batch
+    assert asyncio.run(snapshot.refresh(catalog.session_factory, full=True)) == 6
+
+    assert put_threads and all(thread is not threading.main_thread() for thread in put_threads)
+    assert [call[0] for call in catalog.calls[-4:]] == ["genres", "stream", "stream", "stream"]
+    assert sorted(snapshot.films_by_id) == [2, 3, 4, 5, 6]
+    assert snapshot.get_film("Film 1") is None
+
+
+def test_full_resync_stops_reading_when_over_budget(monkeypatch):
+    monkeypatch.setattr(snapshot_module, "_FULL_RESYNC_BATCH", 10)
+    catalog = FakeCatalog(monkeypatch, [_film(i, f"Film {i}") for i in range(100)], [])
+    snapshot = _snapshot(budget=2000)
+
+    assert asyncio.run(snapshot.refresh(catalog.session_factory, full=True)) == 0
+
+    # Бюджет превышен на первом батче, остальные девять не читаются.
+    assert [call for call in catalog.calls if call[0] == "stream"] == [("stream", 0, 10)]
+    assert snapshot.over_budget and snapshot.films_by_id == {}
+
+
+def test_legacy_database_is_readable_after_migrations(legacy_db, db_run):
+    from app.infrastructure.db.CreateSession import AsyncSessionLocal
+
+    legacy_db()
+    snapshot = _snapshot()
+    db_run(snapshot.refresh(AsyncSessionLocal, full=True))
+
+    assert [film.title for film in snapshot.get_films_by_genre("drama")] == ["Heat", "Alien", "Fargo"]
+    assert snapshot.watermark is not None
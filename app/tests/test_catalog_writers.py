@@ -0,0 +1,198 @@
+import csv
+import gzip
+import json
+from datetime import date
+
+import pytest
+
+from app.infrastructure.export.CatalogWriters import open_writer
+
+ROWS = [
+    {"id": 1, "title": "Сталкер", "description": None, "creation_date": date(1979, 5, 25),
+     "file_link": None, "genres": ["drama", "sci-fi"]},
+    {"id": 2, "title": "Heat, 1995", "description": "a \"quoted\" line", "creation_date": None,
+     "file_link": "heat.mp4", "genres": []},
+]
+
+
+def _export(path, export_format, rows, compression=None, append=False):
+    writer = open_writer(str(path), export_format, compression, append)
+    writer.write_batch(rows)
+    writer.close()
+
+
+def test_ndjson_roundtrip(tmp_path):
+    path = tmp_path / "catalog.ndjson"
+    _export(path, "ndjson", ROWS)
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert lines[0]["title"] == "Сталкер"
+    assert lines[0]["creation_date"] == "1979-05-25"
+    assert lines[1]["genres"] == []
+
+
+def test_csv_resume_appends_without_second_header(tmp_path):
+    path = tmp_path / "catalog.csv"
+    _export(path, "csv", ROWS[:1])
+    _export(path, "csv", ROWS[1:], append=True)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        lines = list(csv.reader(f))
+    assert lines[0][0] == "id"
+    assert [line[0] for line in lines[1:]] == ["1", "2"]
+    assert lines[1][5] == "drama|sci-fi"
+    assert lines[2][2] == 'a "quoted" line'
+
+
+def test_resume_into_missing_file_writes_header(tmp_path):
+    path = tmp_path / "catalog.csv"
+    _export(path, "csv", ROWS, append=True)
+
+    assert path.read_text(encoding="utf-8").startswith("id,title")
+
+
+def test_gzip_resume_keeps_earlier_rows(tmp_path):
+    path = tmp_path / "catalog.ndjson.gz"
+    _export(path, "ndjson", ROWS[:1], compression="gzip")
+    _export(path, "ndjson", ROWS[1:], compression="gzip", append=True)
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == [1, 2]
+
+
+def test_without_append_file_is_overwritten(tmp_path):
+    path = tmp_path / "catalog.ndjson"
+    _export(path, "ndjson", ROWS)
+    _export(path, "ndjson", ROWS[1:])
+
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_parquet_resume_refuses_existing_file(tmp_path):
+    path = tmp_path / "catalog.parquet"
+    path.write_bytes(b"PAR1")
+
+    with pytest.raises(ValueError, match="cannot be appended"):
+        open_writer(str(path), "parquet", append=True)
+    assert path.read_bytes() == b"PAR1"
+
+
+def test_unknown_format_and_compression():
+    with pytest.raises(ValueError, match="Unknown export format"):
+        open_writer("unused", "xml")
+    with pytest.raises(ValueError, match="not supported"):
+        open_writer("unused", "csv", "zstd")
+
+
+def test_export_resumed_with_after_id_matches_full_export(db_schema, tmp_path):
+    from app.domain.models.Film import Film
+    from app.domain.repositories.FilmRepository import FilmRepository
+    from app.infrastructure.db.CreateSession import AsyncSessionLocal
+    from app.use_cases.CatalogExportService import CatalogExportService
+
+    async def export(path, after_id, limit_batches=None):
+        writer = open_writer(str(path), "ndjson", append=after_id > 0)
+        try:
+            async with AsyncSessionLocal() as session:
+                service = CatalogExportService(session)
+                if limit_batches is None:
+                    return await service.export(writer, after_id, batch_size=3)
+                # Обрыв выгрузки после первого батча.
+                stream = service.film_repository.stream_films_with_genres(after_id, batch_size=3)
+                batch = await stream.__anext__()
+                writer.write_batch(batch)
+                await stream.aclose()
+                return batch[-1]["id"]
+        finally:
+            writer.close()
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            for i in range(10):
+                await FilmRepository(session).add_film(Film(title=f"Film {i}"))
+        await export(tmp_path / "full.ndjson", 0)
+        last_id = await export(tmp_path / "resumed.ndjson", 0, limit_batches=1)
+        await export(tmp_path / "resumed.ndjson", last_id)
+
+    db_schema(scenario())
+
+    full = (tmp_path / "full.ndjson").read_text(encoding="utf-8")
+    assert len(full.splitlines()) == 10
+    assert (tmp_path / "resumed.ndjson").read_text(encoding="utf-8") == full
+
+
+FILMS = [
+    {"id": film_id, "title": f"Film {film_id}", "description": None, "creation_date": None,
+     "file_link": None, "genres": ["drama"]}
+    for film_id in range(1, 24)
+]
+
+
+class CrashError(Exception):
+    pass
+
+
+@pytest.fixture
+def fake_catalog(monkeypatch):
+    """Выгрузка через app.scripts.export_catalog по FILMS вместо БД."""
+    from app.domain.repositories.FilmRepository import FilmRepository
+    from app.scripts import export_catalog
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    async def stream_films_with_genres(self, after_id=0, batch_size=1000):
+        rows = [row for row in FILMS if row["id"] > after_id]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    monkeypatch.setattr(export_catalog, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(FilmRepository, "stream_films_with_genres", stream_films_with_genres)
+    return export_catalog
+
+
+def _read_ids(path, export_format, compression):
+    opener = gzip.open if compression else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if export_format == "csv":
+            lines = list(csv.reader(f))
+            assert lines[0][0] == "id"
+            return [int(line[0]) for line in lines[1:]]
+        return [json.loads(line)["id"] for line in f]
+
+
+@pytest.mark.parametrize("export_format, compression", [("ndjson", None), ("ndjson", "gzip"), ("csv", "gzip")])
+def test_crashed_export_resumes_from_checkpoint_without_duplicates(fake_catalog, monkeypatch, tmp_path,
+                                                                   export_format, compression):
+    import asyncio
+
+    from app.infrastructure.export.CatalogWriters import TextFileWriter
+
+    path = str(tmp_path / "catalog")
+    write_batch = TextFileWriter.write_batch
+    calls = []
+
+    def crashing_write_batch(self, rows):
+        calls.append(len(rows))
+        if len(calls) == 4:
+            # Сбой посреди записи батча: на диске остается его начало.
+            self.file.write(self.fmt.encode(rows)[:25])
+            self.file.flush()
+            raise CrashError()
+        write_batch(self, rows)
+
+    monkeypatch.setattr(TextFileWriter, "write_batch", crashing_write_batch)
+    with pytest.raises(CrashError):
+        asyncio.run(fake_catalog._export(path, export_format, compression, 0, 5, 100))
+    with open(fake_catalog.checkpoint_path(path)) as f:
+        assert json.load(f)["last_id"] == 15
+
+    monkeypatch.setattr(TextFileWriter, "write_batch", write_batch)
+    stats = asyncio.run(fake_catalog._export(path, export_format, compression, 0, 5, 100, resume=True))
+
+    assert stats.rows == 8
+    assert _read_ids(path, export_format, compression) == [row["id"] for row in FILMS]
@@ -0,0 +1,60 @@
+from sqlalchemy import text
+
+from app.domain.models.Film import Film
+from app.domain.models.Genre import Genre
+from app.domain.repositories.FilmGenresRepository import FilmGenresRepository
+from app.domain.repositories.FilmRepository import FilmRepository
+from app.domain.repositories.GenreRepository import GenreRepository
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+from app.use_cases.GenreService import GenreService
+
+
+async def _counts():
+    async with AsyncSessionLocal() as session:
+        return {facet.name: facet.film_count for facet in await GenreService(session).get_all_genres_with_counts()}
+
+
+def test_migration_backfills_counts_for_existing_links(legacy_db, db_run):
+    legacy_db("0002_genre_film_counts")
+
+    async def counts():
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text(
+                "SELECT g.name, coalesce(c.film_count, 0) FROM genres g "
+                "LEFT JOIN genre_film_counts c ON c.id_genre = g.id"
+            ))
+            return dict(result.all())
+
+    assert db_run(counts()) == {"comedy": 1, "drama": 3, "horror": 0}
+
+
+def test_counts_follow_link_changes_and_deletes(db_schema):
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            drama = await GenreRepository(session).add_genre(Genre(name="drama"))
+            comedy = await GenreRepository(session).add_genre(Genre(name="comedy"))
+            heat = await FilmRepository(session).add_film(Film(title="Heat"))
+            fargo = await FilmRepository(session).add_film(Film(title="Fargo"))
+
+            links = FilmGenresRepository(session)
+            await links.add_genre_to_film(heat, drama)
+            await links.add_genre_to_film(fargo, drama)
+            await links.add_genre_to_film(fargo, comedy)
+            after_links = await _counts()
+
+            await links.remove_genre_from_film(fargo, comedy)
+            # Повторное удаление несуществующей связи не уменьшает счетчик.
+            await links.remove_genre_from_film(fargo, comedy)
+            await FilmRepository(session).delete_film(heat)
+            after_deletes = await _counts()
+
+            await session.execute(text("UPDATE genre_film_counts SET film_count = 100"))
+            await session.commit()
+            await GenreService(session).rebuild_genre_counts()
+            after_rebuild = await _counts()
+        return after_links, after_deletes, after_rebuild
+
+    after_links, after_deletes, after_rebuild = db_schema(scenario())
+    assert after_links == {"comedy": 1, "drama": 2}
+    assert after_deletes == {"comedy": 0, "drama": 1}
+    assert after_rebuild == {"comedy": 0, "drama": 1}
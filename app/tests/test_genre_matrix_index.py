@@ -0,0 +1,166 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.infrastructure.cache.CatalogEvents import (  # noqa: E402
+    CATALOG_RESYNC,
+    CatalogEvent,
+    FILM_DELETED,
+    FILM_UPSERTED,
+    GENRE_DELETED,
+    GENRE_LINKED,
+    GENRE_UNLINKED,
+)
+from app.infrastructure.cache.GenreMatrixIndex import COSINE, GenreMatrixIndex  # noqa: E402
+
+# Фильм -> жанры.
+CATALOG = {
+    1: ("Heat", [1, 2]),
+    2: ("Alien", [3, 4]),
+    3: ("Fargo", [1, 2, 5]),
+    4: ("Ronin", [1]),
+    5: ("Solaris", [4]),
+}
+
+
+def _index() -> GenreMatrixIndex:
+    index = GenreMatrixIndex()
+    film_ids = list(CATALOG)
+    links = [(film_id, genre_id) for film_id, (_, genres) in CATALOG.items() for genre_id in genres]
+    index.build(
+        film_ids,
+        [title for title, _ in CATALOG.values()],
+        [film_id for film_id, _ in links],
+        [genre_id for _, genre_id in links],
+    )
+    return index
+
+
+def _reference(index: GenreMatrixIndex, title: str, k: int):
+    """Жаккар по множествам жанров напрямую, для сверки с матрицей."""
+    genres = {}
+    for film_id, row in index.row_by_film_id.items():
+        genres[index.titles[row]] = {
+            genre_id for genre_id, column in index.column_by_genre_id.items()
+            if index.bits[row, column // 64] & np.uint64(1 << (column % 64))
+        }
+    query = genres[title]
+    scores = [(other, len(query & g) / len(query | g)) for other, g in genres.items() if other != title and query & g]
+    return sorted(scores, key=lambda pair: -pair[1])[:k]
+
+
+def _assert_same(result, expected):
+    assert [title for title, _ in result] == [title for title, _ in expected]
+    assert [score for _, score in result] == pytest.approx([score for _, score in expected])
+
+
+def test_jaccard_matches_reference():
+    index = _index()
+
+    result = index.similar("Heat", k=3)
+
+    assert [title for title, _ in result] == ["Fargo", "Ronin"]
+    _assert_same(result, _reference(index, "Heat", 3))
+
+
+def test_cosine_scores():
+    result = dict(_index().similar("Heat", metric=COSINE))
+
+    assert result["Fargo"] == pytest.approx(2 / (2 * 3) ** 0.5)
+    assert result["Ronin"] == pytest.approx(1 / 2 ** 0.5)
+
+
+def test_unknown_title_and_film_without_genres():
+    index = _index()
+    index.apply(CatalogEvent(FILM_UPSERTED, film_id=6, name="Empty"))
+
+    assert index.similar("Missing") is None
+    assert index.similar("Empty") == []
+
+
+def test_link_unlink_and_delete_events():
+    index = _index()
+    index.apply(CatalogEvent(FILM_UPSERTED, film_id=6, name="Thief"))
+    index.apply(CatalogEvent(GENRE_LINKED, film_id=6, genre_id=1))
+    index.apply(CatalogEvent(GENRE_LINKED, film_id=6, genre_id=2))
+
+    assert index.similar("Heat", k=1) == [("Thief", 1.0)]
+
+    index.apply(CatalogEvent(GENRE_UNLINKED, film_id=6, genre_id=2))
+    index.apply(CatalogEvent(FILM_DELETED, film_id=3))
+
+    result = dict(index.similar("Heat"))
+    assert "Fargo" not in result
+    assert result["Thief"] == pytest.approx(0.5)
+    _assert_same(index.similar("Heat"), _reference(index, "Heat", 10))
+
+
+def test_deleted_genre_column_is_reused():
+    index = _index()
+    column = index.column_by_genre_id[5]
+    index.apply(CatalogEvent(GENRE_DELETED, genre_id=5))
+
+    assert index.sizes[index.row_by_film_id[3]] == 2
+
+    index.apply(CatalogEvent(GENRE_LINKED, film_id=5, genre_id=99))
+    assert index.column_by_genre_id[99] == column
+    assert index.similar("Fargo", k=1) == [("Heat", 1.0)]
+
+
+def test_matrix_grows_past_64_genres_and_initial_capacity():
+    index = _index()
+    for film_id in range(100, 1200):
+        index.apply(CatalogEvent(FILM_UPSERTED, film_id=film_id, name=f"Film {film_id}"))
+    for genre_id in range(100, 180):
+        index.apply(CatalogEvent(GENRE_LINKED, film_id=1100, genre_id=genre_id))
+    index.apply(CatalogEvent(GENRE_LINKED, film_id=1100, genre_id=1))
+
+    assert index.bits.shape[1] == 2
+    assert index.similar("Film 1100", k=1)[0][0] == "Ronin"
+
+
+class FakeSession:
+    """Отдает фильмы CATALOG на первый запрос и связи (из CATALOG или links) на второй."""
+
+    def __init__(self, links=None):
+        self.links = links or [(film_id, genre_id) for film_id, (_, genres) in CATALOG.items() for genre_id in genres]
+        self.queries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        self.queries += 1
+        if self.queries == 2:
+            rows = list(self.links)
+        else:
+            rows = [(film_id, title) for film_id, (title, _) in CATALOG.items()]
+        return SimpleNamespace(all=lambda: rows)
+
+
+def test_resync_rebuilds_off_loop_keeping_old_matrix():
+    # Связь Ronin с жанром 2 появилась, пока уведомления не доходили.
+    links = FakeSession().links + [(4, 2)]
+
+    async def scenario():
+        index = GenreMatrixIndex(session_factory=lambda: FakeSession(links))
+        await index.ensure_loaded(FakeSession())
+        old_bits = index.bits
+
+        index.on_event(CatalogEvent(CATALOG_RESYNC))
+        assert index.loaded and index.bits is old_bits
+        assert dict(index.similar("Heat"))["Ronin"] == pytest.approx(0.5)
+
+        await index.wait_rebuilt()
+        return index
+
+    index = asyncio.run(scenario())
+
+    assert dict(index.similar("Heat"))["Ronin"] == pytest.approx(1.0)
+    assert not index.stale
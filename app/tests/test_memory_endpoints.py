@@ -0,0 +1,192 @@
+"""
+Пик аллокаций стриминговых и массовых эндпоинтов под tracemalloc.
+
+Приложение вызывается в процессе напрямую по ASGI; S3 и выборка фильмов подменяются
+генераторами синтетических данных. По умолчанию размеры небольшие; большие задаются
+переменными окружения (или через python -m app.scripts.check_memory):
+
+    MEMORY_CHECK_VIDEO_MB=4096 MEMORY_CHECK_UPLOAD_MB=1024 MEMORY_CHECK_FILMS=1000000 \
+        pytest -s app/tests/test_memory_endpoints.py
+"""
+import asyncio
+import os
+import tracemalloc
+from datetime import date
+from typing import Iterable, Iterator, Optional, Tuple
+
+import pytest
+
+from app.domain.models.Film import Film
+from app.domain.models.Genre import Genre
+
+MIB = 1024 * 1024
+CHUNK_SIZE = MIB
+
+VIDEO_MB = int(os.environ.get("MEMORY_CHECK_VIDEO_MB", 256))
+UPLOAD_MB = int(os.environ.get("MEMORY_CHECK_UPLOAD_MB", 64))
+FILMS = int(os.environ.get("MEMORY_CHECK_FILMS", 20000))
+
+# Стриминг и загрузка держат в памяти несколько чанков независимо от размера файла.
+STREAM_BOUND_MB = float(os.environ.get("MEMORY_CHECK_STREAM_BOUND_MB", 32))
+# Список отдается одним JSON, поэтому граница линейна по числу фильмов.
+LISTING_BOUND_BYTES_PER_FILM = 1100
+LISTING_BOUND_OVERHEAD_MB = 4
+
+
+@pytest.fixture
+def main():
+    pytest.importorskip("boto3")
+    from app import main
+
+    return main
+
+
+@pytest.fixture
+def peak():
+    """Измеряет пик аллокаций корутины сверх уже занятой памяти."""
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(1)
+
+    def measure(coro) -> int:
+        async def run():
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            await coro
+            return tracemalloc.get_traced_memory()[1] - baseline
+
+        return asyncio.run(run())
+
+    yield measure
+    if not tracing:
+        tracemalloc.stop()
+
+
+async def _request(app, method: str, path: str, body: Optional[Iterator[bytes]] = None,
+                   headers: Iterable[Tuple[bytes, bytes]] = ()) -> Tuple[int, int, bytes]:
+    """
+    Вызывает приложение напрямую по ASGI, не накапливая тело ответа (httpx.ASGITransport его буферизует).
+
+    :return: Статус, размер тела ответа и его первые байты.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"host", b"check"), *headers], "client": ("127.0.0.1", 0), "server": ("check", 80),
+    }
+    chunks = iter(body or ())
+    status, size, head = 0, 0, b""
+    body_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if body_sent:
+            # Клиент не отключается, пока приложение не закончит ответ.
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+        chunk = next(chunks, None)
+        if chunk is None:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        nonlocal status, size, head
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if len(head) < 1024:
+                head += chunk[:1024]
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        disconnected.set()
+    return status, size, head
+
+
+def _multipart(path: str, boundary: bytes) -> Iterator[bytes]:
+    yield (b"--" + boundary + b"\r\n"
+           b'Content-Disposition: form-data; name="file"; filename="big.bin"\r\n'
+           b"Content-Type: application/octet-stream\r\n\r\n")
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+    yield b"\r\n--" + boundary + b"--\r\n"
+
+
+def test_video_stream_peak_does_not_depend_on_size(main, peak, monkeypatch):
+    size = VIDEO_MB * MIB
+
+    def get_video_from_s3(bucket_name, file_name, start_byte=0):
+        remaining = size - start_byte
+        while remaining > 0:
+            chunk = min(CHUNK_SIZE, remaining)
+            remaining -= chunk
+            yield bytes(chunk)
+
+    monkeypatch.setattr(main, "get_video_from_s3", get_video_from_s3)
+    result = []
+
+    async def stream():
+        result.append(await _request(main.app, "GET", "/video/big.mp4"))
+
+    used = peak(stream())
+
+    print(f"\nGET /video/ ({VIDEO_MB} MiB): peak {used / MIB:.1f} MiB")
+    status, received, _ = result[0]
+    assert status == 200
+    assert received == size
+    assert used <= STREAM_BOUND_MB * MIB
+
+
+def test_upload_peak_does_not_depend_on_size(main, peak, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "upload_to_s3", lambda file_path, bucket_name, object_name: None)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "temp").mkdir()
+    # Разреженный файл: на диске почти не занимает места, читается нулями.
+    with open("source.bin", "wb") as f:
+        f.truncate(UPLOAD_MB * MIB)
+    boundary = b"check-memory-boundary"
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + boundary)]
+    result = []
+
+    async def upload():
+        result.append(await _request(main.app, "POST", "/upload/", _multipart("source.bin", boundary), headers))
+
+    used = peak(upload())
+
+    print(f"\nPOST /upload/ ({UPLOAD_MB} MiB): peak {used / MIB:.1f} MiB")
+    status, _, head = result[0]
+    assert status == 200 and b"error" not in head, head
+    assert used <= STREAM_BOUND_MB * MIB
+
+
+def test_film_listing_peak_is_linear_in_films(main, peak, monkeypatch):
+    from app.use_cases.FilmService import FilmService
+
+    genres = [Genre(id=i, name=f"genre-{i}") for i in range(1, 21)]
+
+    async def get_all_films(self):
+        return [
+            Film(id=i, title=f"film-{i}", description="description " * 4, creation_date=date(2000, 1, 1),
+                 file_link=f"film-{i}.mp4", genres=genres[i % 20:i % 20 + 3])
+            for i in range(1, FILMS + 1)
+        ]
+
+    monkeypatch.setattr(FilmService, "get_all_films", get_all_films)
+    result = []
+
+    async def listing():
+        result.append(await _request(main.app, "GET", "/films/"))
+
+    used = peak(listing())
+
+    print(f"\nGET /films/ ({FILMS} films): peak {used / MIB:.1f} MiB")
+    status, received, _ = result[0]
+    assert status == 200
+    assert received > FILMS
+    assert used <= FILMS * LISTING_BOUND_BYTES_PER_FILM + LISTING_BOUND_OVERHEAD_MB * MIB
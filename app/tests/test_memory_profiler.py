@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import tracemalloc
+
+import pytest
+
+from app.infrastructure.profiling import MemoryProfiler
+from app.infrastructure.profiling.MemoryProfiler import PEAK_HEADER, MemoryProfilingMiddleware, SnapshotStore
+
+ALLOCATION = 4 * 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def tracing():
+    yield
+    MemoryProfiler.stop()
+
+
+def _allocating_app(delay: float = 0.0):
+    async def app(scope, receive, send):
+        data = bytearray(ALLOCATION)
+        await asyncio.sleep(delay)
+        del data
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+def _peaks(middleware, requests: int):
+    """Выполняет запросы одновременно и возвращает заголовок пика каждого (None, если его нет)."""
+    async def request():
+        start = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                start.append(dict(message["headers"]).get(PEAK_HEADER))
+
+        await middleware({"type": "http", "method": "GET", "path": "/films/"}, None, send)
+        return start[0]
+
+    async def scenario():
+        return await asyncio.gather(*(request() for _ in range(requests)))
+
+    return [int(value) if value is not None else None for value in asyncio.run(scenario())]
+
+
+def test_peak_of_single_request_is_reported():
+    middleware = MemoryProfilingMiddleware(_allocating_app(), log_threshold_bytes=10 ** 12)
+
+    (peak,) = _peaks(middleware, 1)
+
+    assert ALLOCATION <= peak < 2 * ALLOCATION
+
+
+def test_concurrent_requests_do_not_report_peak():
+    middleware = MemoryProfilingMiddleware(_allocating_app(delay=0.01), log_threshold_bytes=10 ** 12)
+
+    assert _peaks(middleware, 3) == [None, None, None]
+    assert middleware.active == 0
+
+    # После параллельных запросов одиночный снова измеряется.
+    assert _peaks(middleware, 1)[0] >= ALLOCATION
+
+
+def test_peak_over_threshold_is_logged(caplog):
+    middleware = MemoryProfilingMiddleware(_allocating_app(), log_threshold_bytes=ALLOCATION)
+
+    with caplog.at_level(logging.WARNING, logger=MemoryProfiler.__name__):
+        _peaks(middleware, 1)
+
+    assert "Memory peak GET /films/" in caplog.text
+
+
+def test_requests_pass_through_when_tracing_is_stopped():
+    middleware = MemoryProfilingMiddleware(_allocating_app(), log_threshold_bytes=0)
+    MemoryProfiler.stop()
+
+    assert _peaks(middleware, 1) == [None]
+
+
+def test_snapshot_diff_shows_growth_since_baseline():
+    MemoryProfiler.start()
+    store = SnapshotStore()
+    store.take_baseline()
+
+    retained = [bytearray(1024) for _ in range(2000)]
+    diff = store.diff(top=5)
+
+    top = diff["top"][0]
+    assert __file__ in top["site"]
+    assert top["size_diff_bytes"] >= 2000 * 1024
+    assert top["count_diff"] >= 2000
+    assert diff["traced_bytes"] >= 2000 * 1024
+    del retained
+
+
+def test_stop_disables_tracing_and_drops_baseline():
+    MemoryProfiler.start()
+    MemoryProfiler.snapshot_store.take_baseline()
+
+    MemoryProfiler.stop()
+
+    assert not tracemalloc.is_tracing()
+    assert MemoryProfiler.snapshot_store.baseline is None
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routers import admin
+
+    monkeypatch.setattr(admin.settings, "ADMIN_TOKEN", "secret")
+    app = FastAPI()
+    app.include_router(admin.router)
+    return TestClient(app)
+
+
+def test_admin_routes_require_token(admin_client, monkeypatch):
+    from app.routers import admin
+
+    assert admin_client.post("/admin/memory/snapshot").status_code == 401
+    assert admin_client.post("/admin/memory/snapshot", headers={"x-admin-token": "wrong"}).status_code == 401
+    assert admin_client.get("/admin/admission").status_code == 401
+    assert not tracemalloc.is_tracing()
+
+    monkeypatch.setattr(admin.settings, "ADMIN_TOKEN", "")
+    assert admin_client.get("/admin/admission", headers={"x-admin-token": ""}).status_code == 403
+
+
+def test_admin_memory_snapshot_diff_and_stop(admin_client):
+    headers = {"x-admin-token": "secret"}
+
+    assert admin_client.post("/admin/memory/snapshot?top=3", headers=headers).status_code == 200
+    assert tracemalloc.is_tracing()
+    assert admin_client.get("/admin/memory/diff", headers=headers).json()["top"]
+
+    assert admin_client.post("/admin/memory/stop", headers=headers).json() == {"tracing": False}
+    assert not tracemalloc.is_tracing()
+    assert admin_client.get("/admin/memory/diff", headers=headers).status_code == 409
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import pytest
+
+from app.infrastructure.metrics import Metrics
+from app.infrastructure.metrics.Metrics import MetricsExporter, MetricsMiddleware, MetricsRegistry, render
+from app.infrastructure.server.AdmissionControl import (
+    CHEAP_READ,
+    EXPORT,
+    HEAVY_LIST,
+    VIDEO,
+    WRITE,
+    AdmissionController,
+    AdmissionControlMiddleware,
+    AdmissionLimiter,
+)
+
+
+def test_render_counters_and_cumulative_histogram():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", (), buckets=(0.1, 1.0))
+    requests.inc(labels=('/films/"x"',))
+    requests.inc(2, labels=('/films/"x"',))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        latency.observe(value)
+
+    lines = render([({}, registry.dump())]).splitlines()
+
+    assert lines[:3] == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/films/\\"x\\""} 3',
+    ]
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 6.25" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_registry_rejects_duplicate_names():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests.")
+
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests.")
+
+
+def test_exporter_merges_worker_files_under_one_header(tmp_path, monkeypatch):
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests.").inc(5)
+    other = MetricsRegistry()
+    other.counter("requests_total", "Requests.").inc(7)
+    (tmp_path / "worker-1.json").write_text(json.dumps(other.dump()))
+    monkeypatch.setattr(Metrics.WorkerHealth, "get_slot", lambda: 0)
+
+    text = MetricsExporter(registry, str(tmp_path), flush_seconds=60).render()
+
+    assert text.count("# TYPE requests_total counter") == 1
+    assert 'requests_total{worker="0"} 5' in text
+    assert 'requests_total{worker="1"} 7' in text
+
+
+@pytest.fixture
+def client():
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    controller = AdmissionController(
+        {name: AdmissionLimiter(name, limit=0, max_queue=0, queue_timeout=0.01)
+         for name in (CHEAP_READ, HEAVY_LIST, WRITE, VIDEO, EXPORT)},
+        retry_after=1,
+    )
+    app = FastAPI()
+
+    @app.get("/films/{title}")
+    async def get_film(title: str):
+        return {"title": title}
+
+    @app.get("/health/workers")
+    async def get_health():
+        return {}
+
+    app.add_middleware(AdmissionControlMiddleware, controller=controller)
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app)
+
+
+def _requests(method: str, route: str, status: str) -> float:
+    return Metrics.HTTP_REQUESTS.values.get((method, route, status), 0.0)
+
+
+def test_shed_requests_are_counted_with_route_template(client):
+    shed = _requests("GET", "/films/{title}", "503")
+    served = _requests("GET", "/health/workers", "200")
+    unmatched = _requests("GET", Metrics.UNMATCHED_ROUTE, "404")
+
+    assert client.get("/films/Heat").status_code == 503
+    assert client.get("/films/Fargo").status_code == 503
+    assert client.get("/health/workers").status_code == 200
+    assert client.get("/health/missing").status_code == 404
+
+    assert _requests("GET", "/films/{title}", "503") == shed + 2
+    assert _requests("GET", "/health/workers", "200") == served + 1
+    assert _requests("GET", Metrics.UNMATCHED_ROUTE, "404") == unmatched + 1
+
+
+def test_queue_wait_is_part_of_request_latency():
+    controller = AdmissionController({CHEAP_READ: AdmissionLimiter(CHEAP_READ, 1, 4, 1.0)}, retry_after=1)
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = MetricsMiddleware(AdmissionControlMiddleware(app, controller))
+    labels = ("GET", Metrics.UNMATCHED_ROUTE)
+
+    def total() -> float:
+        state = Metrics.HTTP_LATENCY.values.get(labels)
+        return state[1] if state else 0.0
+
+    async def send(message):
+        pass
+
+    async def scenario():
+        scope = {"type": "http", "method": "GET", "path": "/genres/"}
+        await asyncio.gather(middleware(dict(scope), None, send), middleware(dict(scope), None, send))
+
+    before = total()
+    asyncio.run(scenario())
+
+    # Второй запрос ждал в очереди, пока первый выполнялся.
+    assert total() - before >= 0.05 + 0.1
+
+
+def test_metrics_middleware_is_outermost():
+    pytest.importorskip("boto3")
+    from app import main
+
+    if not (main.settings.METRICS_ENABLED and main.settings.ADMISSION_ENABLED):
+        pytest.skip("metrics or admission control disabled")
+    assert main.app.user_middleware[0].cls is MetricsMiddleware
+    assert main.app.user_middleware[1].cls is AdmissionControlMiddleware
@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import text
+
+from app.domain.models.Film import Film
+from app.domain.models.Genre import Genre
+from app.domain.repositories.FilmGenresRepository import FilmGenresRepository
+from app.domain.repositories.FilmRepository import FilmRepository
+from app.domain.repositories.GenreRepository import GenreRepository
+from app.infrastructure.cache.CatalogSnapshot import CatalogSnapshot
+from app.infrastructure.db.CreateSession import AsyncSessionLocal
+from app.use_cases.FilmService import FilmService
+
+# Фильм -> жанры.
+CATALOG = {
+    "Heat": ["crime", "drama"],
+    "Fargo": ["crime", "comedy", "drama"],
+    "Alien": ["horror"],
+    "Ronin": ["crime"],
+    "Amelie": ["comedy"],
+}
+
+QUERIES = [
+    (["crime", "drama"], True, 100, 0, ["Heat", "Fargo"]),
+    (["crime", "drama", "comedy"], True, 100, 0, ["Fargo"]),
+    (["drama", "drama"], True, 100, 0, ["Heat", "Fargo"]),
+    (["horror", "comedy"], False, 100, 0, ["Fargo", "Alien", "Amelie"]),
+    (["crime", "comedy"], False, 2, 1, ["Fargo", "Ronin"]),
+    (["crime", "western"], True, 100, 0, []),
+    (["crime", "western"], False, 100, 0, ["Heat", "Fargo", "Ronin"]),
+    (["western"], False, 100, 0, []),
+]
+
+
+async def _seed():
+    async with AsyncSessionLocal() as session:
+        genre_ids = {}
+        for name in sorted({genre for genres in CATALOG.values() for genre in genres}):
+            genre_ids[name] = await GenreRepository(session).add_genre(Genre(name=name))
+        for title, genres in CATALOG.items():
+            film_id = await FilmRepository(session).add_film(Film(title=title))
+            for genre in genres:
+                await FilmGenresRepository(session).add_genre_to_film(film_id, genre_ids[genre])
+
+
+@pytest.fixture
+def seeded(db_schema):
+    db_schema(_seed())
+    return db_schema
+
+
+@pytest.mark.parametrize("names, match_all, limit, offset, expected", QUERIES)
+def test_database_query(seeded, names, match_all, limit, offset, expected):
+    async def query():
+        async with AsyncSessionLocal() as session:
+            return await FilmService(session).get_films_by_genre_names(names, match_all, limit, offset)
+
+    films = seeded(query())
+
+    assert [film.title for film in films] == expected
+    for film in films:
+        assert sorted(g.name for g in film.genres) == sorted(CATALOG[film.title])
+
+
+def test_snapshot_matches_database(seeded):
+    snapshot = CatalogSnapshot(refresh_seconds=1, max_staleness_seconds=60, full_resync_seconds=600,
+                               memory_budget_bytes=10 ** 9)
+    seeded(snapshot.refresh(AsyncSessionLocal, full=True))
+
+    for names, match_all, limit, offset, expected in QUERIES:
+        films = snapshot.get_films_by_genres(list(dict.fromkeys(names)), match_all, limit, offset)
+        assert [film.title for film in films] == expected
+
+
+def test_migrations_create_reverse_link_index(legacy_db, db_run):
+    legacy_db()
+
+    async def indexes():
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'film_genres'"))
+            return set(result.scalars().all())
+
+    assert "ix_film_genres_id_film_id_genre" in db_run(indexes())
+
+
+@pytest.mark.parametrize("query", ["limit=10", "offset=5", "match=any", "genres=&limit=10"])
+def test_paging_without_genres_is_rejected(query):
+    pytest.importorskip("boto3")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    response = TestClient(main.app).get(f"/films/?{query}")
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == "match, limit and offset require genres"
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.infrastructure.db import QueryLog as query_log_module
+from app.infrastructure.db.QueryLog import QueryLog, QueryStatsMiddleware, RateLimiter, explain_mode, normalize
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ("SELECT *  FROM films\n WHERE id = 42", "SELECT * FROM films WHERE id = ?"),
+    ("SELECT * FROM films WHERE title = 'it''s' AND x = -1.5", "SELECT * FROM films WHERE title = ? AND x = ?"),
+    ("SELECT * FROM films WHERE id IN ($1::INTEGER, $2::INTEGER, $3::INTEGER)",
+     "SELECT * FROM films WHERE id IN (?...)"),
+    ("UPDATE films SET title=%(title)s WHERE films.id = %(id_1)s", "UPDATE films SET title=? WHERE films.id = ?"),
+    ("SELECT t1.id, col2 FROM t1", "SELECT t1.id, col2 FROM t1"),
+    ("SELECT * FROM films WHERE id = ANY($1::INTEGER[])", "SELECT * FROM films WHERE id = ANY(?)"),
+])
+def test_normalize(statement, expected):
+    assert normalize(statement) == expected
+
+
+def test_batches_of_different_size_share_template():
+    assert normalize("SELECT 1 WHERE id IN (1, 2)") == normalize("SELECT 1 WHERE id IN (1, 2, 3, 4)")
+
+
+@pytest.mark.parametrize("template, expected", [
+    ("SELECT films.id FROM films WHERE films.id = ?", "analyze"),
+    ("(SELECT id FROM films) UNION (SELECT id FROM genres)", "analyze"),
+    ("SELECT films.id FROM films WHERE films.id = ? FOR UPDATE", "plan"),
+    ("SELECT id FROM films FOR NO KEY UPDATE SKIP LOCKED", "plan"),
+    ("SELECT id FROM films FOR SHARE", "plan"),
+    ("SELECT nextval(?)", "plan"),
+    ("SELECT pg_notify(?, ?)", "plan"),
+    ("SELECT pg_try_advisory_lock(?)", "plan"),
+    ("WITH moved AS (DELETE FROM films RETURNING id) SELECT count(*) FROM moved", "plan"),
+    ("INSERT INTO films (title) VALUES (?)", "plan"),
+    ("update films set title = ?", "plan"),
+    ("DELETE FROM films WHERE id = ?", "plan"),
+    ("SAVEPOINT sa_savepoint_1", None),
+    ("LISTEN catalog_changes", None),
+    ("SELECT id FROM formats", "analyze"),
+])
+def test_explain_mode(template, expected):
+    assert explain_mode(template) == expected
+
+
+def test_rate_limiter_counts_suppressed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_log_module.time, "monotonic", lambda: now[0])
+    limiter = RateLimiter(interval=10)
+
+    assert limiter.allow("a") == 0
+    assert limiter.allow("a") is None
+    assert limiter.allow("a") is None
+    assert limiter.allow("b") == 0
+
+    now[0] += 10
+    assert limiter.allow("a") == 2
+    assert limiter.allow("a") is None
+
+
+def _sqlite_log(slow_seconds=10.0):
+    engine = create_engine("sqlite://")
+    log = QueryLog(slow_seconds=slow_seconds, explain=True, log_interval=60, n_plus_one_threshold=3)
+    log.install(SimpleNamespace(sync_engine=engine))
+    return engine, log
+
+
+def test_failed_statement_does_not_leak_start_time():
+    engine, _ = _sqlite_log()
+
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info["query_started"] == []
+
+
+def test_slow_queries_are_logged_once_per_interval(caplog):
+    engine, _ = _sqlite_log(slow_seconds=0.0)
+
+    with caplog.at_level(logging.WARNING, logger=query_log_module.__name__), engine.connect() as conn:
+        for i in range(3):
+            conn.execute(text(f"SELECT {i}"))
+
+    assert caplog.text.count("Slow query") == 1
+    assert "SELECT ?" in caplog.text
+
+
+def test_middleware_counts_queries_and_reports_n_plus_one(caplog, monkeypatch):
+    engine, log = _sqlite_log()
+    monkeypatch.setattr(query_log_module, "query_log", log)
+
+    async def app(scope, receive, send):
+        with engine.connect() as conn:
+            for i in range(4):
+                conn.execute(text("SELECT :id"), {"id": i})
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    headers = {}
+
+    async def send(message):
+        headers.update(message["headers"])
+
+    with caplog.at_level(logging.WARNING, logger=query_log_module.__name__):
+        asyncio.run(QueryStatsMiddleware(app)({"type": "http", "method": "GET", "path": "/films/"}, None, send))
+
+    assert headers[query_log_module.QUERIES_HEADER] == b"4"
+    assert "Possible N+1 in GET /films/: 4 executions of SELECT ?" in caplog.text
+
+
+def test_explain_analyze_only_for_plain_select(db_schema, caplog):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.infrastructure.db.Settings import get_db_url
+
+    async def scenario():
+        engine = create_async_engine(get_db_url())
+        QueryLog(slow_seconds=0.0, explain=True, log_interval=60, n_plus_one_threshold=100).install(engine)
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text("INSERT INTO genres (name) VALUES ('drama')"))
+                await conn.execute(text("SELECT id FROM genres WHERE name = 'drama' FOR UPDATE"))
+                await conn.execute(text("SELECT id FROM genres WHERE name = 'drama'"))
+            async with engine.connect() as conn:
+                return (await conn.execute(text("SELECT count(*) FROM genres"))).scalar()
+        finally:
+            await engine.dispose()
+
+    with caplog.at_level(logging.WARNING, logger=query_log_module.__name__):
+        # INSERT не повторяется при снятии плана.
+        assert db_schema(scenario()) == 1
+
+    records = {record.getMessage().split("\n")[0].split(": ", 1)[1]: record.getMessage() for record in caplog.records}
+    assert "actual time" not in records["INSERT INTO genres (name) VALUES (?)"]
+    assert "Insert on genres" in records["INSERT INTO genres (name) VALUES (?)"]
+    assert "actual time" not in records["SELECT id FROM genres WHERE name = ? FOR UPDATE"]
+    assert "LockRows" in records["SELECT id FROM genres WHERE name = ? FOR UPDATE"]
+    assert "actual time" in records["SELECT id FROM genres WHERE name = ?"]
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from collections import Counter
+
+import pytest
+
+from app.infrastructure.profiling import SamplingProfiler
+from app.infrastructure.profiling.SamplingProfiler import (
+    TOKEN_HEADER,
+    URL_HEADER,
+    SamplingProfilerMiddleware,
+    make_token,
+    profile_path,
+    to_collapsed,
+    to_speedscope,
+    verify_token,
+)
+
+SAMPLES = Counter({
+    ("MainThread", (("main", "/srv/app/main.py", 1), ("handler", "/srv/app/main.py", 10))): 3,
+    ("MainThread", (("main", "/srv/app/main.py", 1), ("a;b", "/srv/app/util.py", 5))): 1,
+    ("worker", (("run", "/srv/app/pool.py", 7),)): 2,
+})
+
+
+def test_token_roundtrip_and_rejections():
+    token = make_token("secret", 60)
+
+    assert verify_token("secret", token)
+    assert not verify_token("other", token)
+    assert not verify_token("", token)
+    assert not verify_token("secret", "garbage")
+    assert not verify_token("secret", token[:-1] + ("0" if token[-1] != "0" else "1"))
+    assert not verify_token("secret", make_token("secret", -1))
+
+
+def test_collapsed_format():
+    lines = to_collapsed(SAMPLES).splitlines()
+
+    assert "MainThread;main (main.py:1);handler (main.py:10) 3" in lines
+    # Точка с запятой — разделитель кадров, в именах она заменяется.
+    assert "MainThread;main (main.py:1);a:b (util.py:5) 1" in lines
+    assert "worker;run (pool.py:7) 2" in lines
+
+
+def test_speedscope_format():
+    document = json.loads(to_speedscope(SAMPLES, 0.005, "GET /films/"))
+
+    frames = document["shared"]["frames"]
+    profiles = {profile["name"]: profile for profile in document["profiles"]}
+    assert len(frames) == 4
+    assert set(profiles) == {"MainThread", "worker"}
+    main = profiles["MainThread"]
+    assert [[frames[i]["name"] for i in sample] for sample in main["samples"]] == [["main", "handler"], ["main", "a;b"]]
+    assert main["weights"] == pytest.approx([0.015, 0.005])
+    assert main["endValue"] == pytest.approx(0.02)
+
+
+def test_profile_path_rejects_other_files(tmp_path):
+    (tmp_path / "p.collapsed.txt").write_text("x 1\n")
+    (tmp_path / "notes.txt").write_text("secret")
+
+    assert profile_path(str(tmp_path), "p.collapsed.txt") == str(tmp_path / "p.collapsed.txt")
+    assert profile_path(str(tmp_path), "notes.txt") is None
+    assert profile_path(str(tmp_path), "../p.collapsed.txt") is None
+    assert profile_path(str(tmp_path), "missing.speedscope.json") is None
+
+
+def _request(middleware, headers=()):
+    start = []
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.02)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.append(dict(message["headers"]))
+
+    middleware.app = app
+    scope = {"type": "http", "method": "GET", "path": "/films/Heat", "headers": list(headers)}
+    asyncio.run(middleware(scope, None, send))
+    return start[0]
+
+
+def _middleware(tmp_path, output_format="collapsed"):
+    return SamplingProfilerMiddleware(None, sample_rate=0.0, secret="secret", interval=0.001,
+                                      output_format=output_format, output_dir=str(tmp_path), max_files=2)
+
+
+def test_only_requests_with_valid_token_are_profiled(tmp_path):
+    middleware = _middleware(tmp_path)
+
+    assert URL_HEADER not in _request(middleware)
+    assert URL_HEADER not in _request(middleware, [(TOKEN_HEADER, b"1.bad")])
+
+    headers = _request(middleware, [(TOKEN_HEADER, make_token("secret", 60).encode())])
+    name = headers[URL_HEADER].decode().rsplit("/", 1)[1]
+    assert headers[URL_HEADER].startswith(b"/admin/profiles/")
+    assert name.endswith(".collapsed.txt")
+    assert (tmp_path / name).read_text().strip()
+    assert not middleware._busy
+
+
+def test_old_profiles_are_removed(tmp_path):
+    middleware = _middleware(tmp_path, "speedscope")
+    token = [(TOKEN_HEADER, make_token("secret", 60).encode())]
+    for _ in range(3):
+        _request(middleware, token)
+
+    assert len(SamplingProfiler.list_profiles(str(tmp_path))) == 2
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError, match="Unknown profile format"):
+        SamplingProfilerMiddleware(None, output_format="pprof")
+
+
+def test_profile_endpoints_require_admin_token(tmp_path, monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routers import admin
+
+    (tmp_path / "p.collapsed.txt").write_text("x 1\n")
+    monkeypatch.setattr(admin.settings, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(admin.settings, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    app = FastAPI()
+    app.include_router(admin.router)
+    client = TestClient(app)
+
+    assert client.get("/admin/profiles").status_code == 401
+    assert client.get("/admin/profiles/p.collapsed.txt").status_code == 401
+    # Токен профилирования не открывает админские эндпоинты.
+    profile_token = {"x-profile-token": make_token("admin-secret", 60)}
+    assert client.get("/admin/profiles/p.collapsed.txt", headers=profile_token).status_code == 401
+
+    headers = {"x-admin-token": "admin-secret"}
+    assert client.get("/admin/profiles", headers=headers).json() == ["p.collapsed.txt"]
+    assert client.get("/admin/profiles/p.collapsed.txt", headers=headers).text == "x 1\n"
+    assert client.get("/admin/profiles/notes.txt", headers=headers).status_code == 404
@@ -0,0 +1,77 @@
+import pytest
+
+from app.infrastructure.server.WorkerHealth import WorkerHealthRegistry
+from app.scripts.serve import split_db_pool
+
+
+@pytest.mark.parametrize("budget, workers, reserved", [
+    (80, 4, 1), (80, 3, 1), (10, 1, 1), (7, 2, 1), (100, 16, 1), (4, 4, 0), (8, 4, 1),
+])
+def test_split_db_pool_fits_budget(budget, workers, reserved):
+    env = split_db_pool(budget, workers, reserved)
+    pool_size, max_overflow = int(env["DB_POOL_SIZE"]), int(env["DB_MAX_OVERFLOW"])
+
+    assert pool_size >= 1
+    assert max_overflow >= 0
+    assert workers * (pool_size + max_overflow + reserved) <= budget
+
+
+@pytest.mark.parametrize("budget, workers, reserved", [(4, 4, 1), (7, 4, 1), (3, 4, 0)])
+def test_split_db_pool_rejects_too_small_budget(budget, workers, reserved):
+    with pytest.raises(ValueError):
+        split_db_pool(budget, workers, reserved)
+
+
+def test_cli_reserves_listen_connection_only_when_enabled(monkeypatch):
+    from typer.testing import CliRunner
+
+    from app.scripts import serve
+
+    started = []
+
+    class RecordingSupervisor:
+        def __init__(self, **kwargs):
+            self.env = kwargs["env"]
+            started.append(self.env)
+
+        def run(self):
+            pass
+
+    monkeypatch.setattr(serve, "Supervisor", RecordingSupervisor)
+    runner = CliRunner()
+
+    result = runner.invoke(serve.cli, ["--workers", "4", "--db-connections", "8", "--no-catalog-notify"])
+    assert result.exit_code == 0, result.output
+    assert started[-1] == {"DB_POOL_SIZE": "1", "DB_MAX_OVERFLOW": "1", "CATALOG_NOTIFY_ENABLED": "false"}
+
+    result = runner.invoke(serve.cli, ["--workers", "4", "--db-connections", "8"], env={"CATALOG_NOTIFY_ENABLED": None})
+    assert started[-1] == {"DB_POOL_SIZE": "1", "DB_MAX_OVERFLOW": "0", "CATALOG_NOTIFY_ENABLED": "true"}
+
+    result = runner.invoke(serve.cli, ["--workers", "4", "--db-connections", "7"], env={"CATALOG_NOTIFY_ENABLED": None})
+    assert result.exit_code == 2
+    assert len(started) == 2
+
+
+def test_registry_counts_requests_per_slot():
+    registry = WorkerHealthRegistry([0.0] * 12, 2)
+    registry.mark_started(0, 100)
+    registry.mark_started(1, 101)
+
+    registry.record_request(1)
+    registry.record_request(1)
+    registry.set_rss(0, 4096)
+
+    first, second = registry.snapshot()
+    assert (first["pid"], first["requests"], first["rss_bytes"]) == (100, 0, 4096)
+    assert (second["pid"], second["requests"], second["restarts"]) == (101, 2, 0)
+
+
+def test_registry_restart_resets_counters():
+    registry = WorkerHealthRegistry([0.0] * 6, 1)
+    registry.mark_started(0, 100)
+    registry.record_request(0)
+
+    registry.mark_started(0, 200, restarted=True)
+
+    (worker,) = registry.snapshot()
+    assert (worker["pid"], worker["requests"], worker["restarts"]) == (200, 0, 1)
@@ -0,0 +1,248 @@
+import asyncio
+import random
+import threading
+from types import SimpleNamespace
+from typing import get_args
+
+import pytest
+
+from app.infrastructure.cache.CatalogEvents import CATALOG_RESYNC, CatalogEvent, FILM_DELETED, FILM_UPSERTED
+from app.infrastructure.cache.TitlePrefixIndex import (
+    ALPHABETICAL,
+    MAX_LIMIT,
+    NEWEST,
+    RANKINGS,
+    SHORTEST,
+    TitlePrefixIndex,
+    normalize_title,
+)
+
+WORDS = ["the", "thе", "them", "then", "a", "ab", "abc", "Ёлка", "Élan", "elan"]
+
+
+def _catalog(size: int, seed: int = 0):
+    rnd = random.Random(seed)
+    return {
+        film_id: " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 3)))
+        for film_id in range(1, size + 1)
+    }
+
+
+def _expected(catalog, prefix: str, limit: int, ranking: str):
+    prefix = normalize_title(prefix)
+    matches = [(normalize_title(title), film_id) for film_id, title in catalog.items()]
+    matches = [(key, film_id) for key, film_id in matches if key.startswith(prefix)]
+    if ranking == SHORTEST:
+        matches.sort(key=lambda item: (len(item[0]), item[0], item[1]))
+    elif ranking == NEWEST:
+        matches.sort(key=lambda item: -item[1])
+    else:
+        matches.sort()
+    return [catalog[film_id] for _, film_id in matches[:min(limit, MAX_LIMIT)]]
+
+
+def _assert_matches(index, catalog):
+    for prefix in ["", "t", "th", "the", "them", "a", "ab", "abc", "e", "ел", "elan", "ELAN t", "x"]:
+        for ranking in RANKINGS:
+            for limit in (1, 7, MAX_LIMIT):
+                assert index.complete(prefix, limit, ranking) == _expected(catalog, prefix, limit, ranking), \
+                    (prefix, limit, ranking)
+
+
+def _index(catalog, scan_limit: int = 3):
+    index = TitlePrefixIndex(scan_limit=scan_limit)
+    index.build(list(catalog), list(catalog.values()))
+    index.loaded = True
+    return index
+
+
+def test_normalize_title():
+    assert normalize_title("  Ёлка   Élan\t") == "елка elan"
+
+
+def test_matches_brute_force():
+    catalog = _catalog(500)
+    index = _index(catalog)
+
+    # Широкие префиксы отвечают из заранее посчитанных топов.
+    assert ("", SHORTEST) in index.top and ("th", NEWEST) in index.top
+    _assert_matches(index, catalog)
+
+
+def test_small_chunks_merge_into_sorted_index(monkeypatch):
+    from app.infrastructure.cache import TitlePrefixIndex as module
+
+    monkeypatch.setattr(module, "_BUILD_CHUNK", 7)
+    catalog = _catalog(200, seed=1)
+    index = _index(catalog)
+
+    assert index.keys == sorted(index.keys)
+    _assert_matches(index, catalog)
+
+
+def test_events_keep_tops_exact():
+    catalog = _catalog(300, seed=2)
+    index = _index(catalog)
+    rnd = random.Random(3)
+
+    for step in range(400):
+        film_id = rnd.randint(1, 400)
+        if rnd.random() < 0.4:
+            catalog.pop(film_id, None)
+            index.on_event(CatalogEvent(FILM_DELETED, film_id=film_id))
+        else:
+            catalog[film_id] = rnd.choice(WORDS) + " " + rnd.choice(WORDS)
+            index.on_event(CatalogEvent(FILM_UPSERTED, film_id=film_id, name=catalog[film_id]))
+        if step % 50 == 0:
+            _assert_matches(index, catalog)
+
+    _assert_matches(index, catalog)
+
+
+def test_top_is_recomputed_when_deletions_shrink_it():
+    catalog = {film_id: f"the {film_id:03d}" for film_id in range(1, 201)}
+    index = _index(catalog)
+    top = index.top[("the", NEWEST)]
+
+    for film_id in range(200, 190, -1):
+        del catalog[film_id]
+        index.apply(CatalogEvent(FILM_DELETED, film_id=film_id))
+
+    assert len(top) == MAX_LIMIT - 10
+    assert index.complete("the", 10, NEWEST) == _expected(catalog, "the", 10, NEWEST)
+    assert index.top[("the", NEWEST)] is top
+    # Для большего limit в топе не хватает названий — он пересчитывается.
+    assert index.complete("the", MAX_LIMIT, NEWEST) == _expected(catalog, "the", MAX_LIMIT, NEWEST)
+    assert len(index.top[("the", NEWEST)]) == MAX_LIMIT
+
+
+def test_unknown_ranking():
+    with pytest.raises(ValueError):
+        _index({1: "the"}).complete("t", ranking="random")
+
+
+def test_settings_reject_unknown_ranking(monkeypatch):
+    from pydantic import ValidationError
+
+    from app.infrastructure.db.Settings import Settings
+
+    assert get_args(Settings.model_fields["AUTOCOMPLETE_RANKING"].annotation) == RANKINGS
+    monkeypatch.setenv("AUTOCOMPLETE_RANKING", "newest")
+    assert Settings().AUTOCOMPLETE_RANKING == NEWEST
+
+    monkeypatch.setenv("AUTOCOMPLETE_RANKING", "random")
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+class FakeSession:
+    def __init__(self, catalog, during_load=None, gate=None):
+        self.catalog = catalog
+        self.during_load = during_load
+        self.gate = gate
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        if self.during_load:
+            self.during_load()
+        # Строки читаются сразу, а отдаются после gate: как запрос, который долго передает результат.
+        rows = list(self.catalog.items())
+        if self.gate is not None:
+            await self.gate.wait()
+        return SimpleNamespace(all=lambda: rows)
+
+
+def test_ensure_loaded_builds_off_loop_and_applies_pending_events(monkeypatch):
+    catalog = _catalog(100, seed=4)
+    index = TitlePrefixIndex(scan_limit=3)
+    build_threads = []
+    build = TitlePrefixIndex.build
+
+    def recording_build(self, film_ids, titles):
+        build_threads.append(threading.current_thread())
+        build(self, film_ids, titles)
+
+    monkeypatch.setattr(TitlePrefixIndex, "build", recording_build)
+
+    def rename_during_load():
+        index.on_event(CatalogEvent(FILM_UPSERTED, film_id=1, name="abc renamed"))
+
+    asyncio.run(index.ensure_loaded(FakeSession(dict(catalog), rename_during_load)))
+
+    assert index.loaded
+    assert build_threads and build_threads[0] is not threading.main_thread()
+    catalog[1] = "abc renamed"
+    _assert_matches(index, catalog)
+    assert index.complete("abc r", ranking=ALPHABETICAL) == ["abc renamed"]
+
+
+def _rebuild_scenario(resyncs: int):
+    database = {1: "Heat", 2: "Fargo"}
+    reads = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        def session_factory():
+            reads.append(1)
+            return FakeSession(database, gate=gate)
+
+        index = TitlePrefixIndex(scan_limit=3, session_factory=session_factory)
+        await index.ensure_loaded(FakeSession(dict(database)))
+        # Изменение, уведомление о котором потеряно.
+        database[3] = "Heist"
+
+        index.on_event(CatalogEvent(CATALOG_RESYNC))
+        await asyncio.sleep(0.01)
+        assert index.loaded
+        assert index.complete("he") == ["Heat"]
+
+        # Изменение, закоммиченное после чтения: видно сразу и не теряется после подмены.
+        database[4] = "Helix"
+        index.on_event(CatalogEvent(FILM_UPSERTED, film_id=4, name="Helix"))
+        assert index.complete("he") == ["Heat", "Helix"]
+        for _ in range(resyncs - 1):
+            index.on_event(CatalogEvent(CATALOG_RESYNC))
+
+        gate.set()
+        await index.wait_rebuilt()
+        return index
+
+    return asyncio.run(scenario()), len(reads)
+
+
+def test_resync_rebuilds_in_background_and_serves_old_index():
+    index, reads = _rebuild_scenario(resyncs=1)
+
+    assert index.complete("he") == ["Heat", "Heist", "Helix"]
+    assert reads == 1
+    assert index.loaded and not index.stale
+
+
+def test_resync_during_rebuild_rebuilds_again():
+    index, reads = _rebuild_scenario(resyncs=3)
+
+    assert index.complete("he") == ["Heat", "Heist", "Helix"]
+    assert reads == 2
+
+
+def test_failed_rebuild_reloads_on_next_request():
+    def session_factory():
+        raise ConnectionError("database is down")
+
+    async def scenario():
+        index = TitlePrefixIndex(scan_limit=3, session_factory=session_factory)
+        await index.ensure_loaded(FakeSession({1: "Heat"}))
+        index.on_event(CatalogEvent(CATALOG_RESYNC))
+        await index.wait_rebuilt()
+        assert not index.loaded and index.complete("he") == ["Heat"]
+
+        await index.ensure_loaded(FakeSession({1: "Heat", 2: "Heist"}))
+        return index
+
+    assert asyncio.run(scenario()).complete("he") == ["Heat", "Heist"]
@@ -0,0 +1,272 @@
+import asyncio
+import io
+import struct
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.infrastructure.video.Mp4Index import Mp4ParseError, parse_mp4_index
+from app.use_cases import VideoService as video_service_module
+from app.use_cases.VideoService import VideoService
+
+TIMESCALE = 12800
+DELTA = 512
+SIZES = [100 + i for i in range(10)]
+
+
+def _box(kind: bytes, *payload: bytes) -> bytes:
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def _full_box(kind: bytes, *payload: bytes) -> bytes:
+    return _box(kind, b"\0\0\0\0", *payload)
+
+
+def _header(kind: bytes, timescale: int, duration: int) -> bytes:
+    return _full_box(kind, struct.pack(">IIII", 0, 0, timescale, duration), bytes(80))
+
+
+def _track(handler: bytes, stbl: bytes) -> bytes:
+    return _box(b"trak", _box(
+        b"mdia",
+        _header(b"mdhd", TIMESCALE, DELTA * len(SIZES)),
+        _full_box(b"hdlr", bytes(4), handler, bytes(12)),
+        _box(b"minf", _box(b"stbl", stbl)),
+    ))
+
+
+def _table(kind: bytes, fmt: str, rows) -> bytes:
+    rows = list(rows)
+    return _full_box(kind, struct.pack(">I", len(rows)), b"".join(struct.pack(fmt, *row) for row in rows))
+
+
+def _mp4(keyframes=(1, 5, 9), fixed_size=0, co64=False, moov_last=False) -> bytes:
+    """
+    MP4 с аудио- и видеодорожкой: 10 видеосэмплов по DELTA, в чанках по 4, 3 и 3 сэмпла.
+    Смещения чанков — 1000, 2000 и 3000.
+    """
+    if fixed_size:
+        stsz = _full_box(b"stsz", struct.pack(">II", fixed_size, len(SIZES)))
+    else:
+        stsz = _full_box(b"stsz", struct.pack(">II", 0, len(SIZES)), struct.pack(f">{len(SIZES)}I", *SIZES))
+    offsets = [(1000,), (2000,), (3000,)]
+    stbl = b"".join([
+        _table(b"stts", ">II", [(len(SIZES), DELTA)]),
+        _table(b"stsc", ">III", [(1, 4, 1), (2, 3, 1)]),
+        stsz,
+        _table(b"co64", ">Q", offsets) if co64 else _table(b"stco", ">I", offsets),
+        _table(b"stss", ">I", [(k,) for k in keyframes]) if keyframes is not None else b"",
+    ])
+    moov = _box(
+        b"moov",
+        _header(b"mvhd", 1000, 400),
+        _track(b"soun", _table(b"stts", ">II", [(1, 1)])),
+        _track(b"vide", stbl),
+    )
+    ftyp, mdat = _box(b"ftyp", b"isom", bytes(4)), _box(b"mdat", bytes(64))
+    return ftyp + mdat + moov if moov_last else ftyp + moov + mdat
+
+
+def _parse(tmp_path, data: bytes):
+    path = tmp_path / "movie.mp4"
+    path.write_bytes(data)
+    return parse_mp4_index(str(path), "movie.mp4")
+
+
+@pytest.mark.parametrize("moov_last", [False, True])
+def test_keyframes_of_video_track(tmp_path, moov_last):
+    data = _mp4(moov_last=moov_last)
+    index = _parse(tmp_path, data)
+
+    assert list(index.keyframe_times) == pytest.approx([0.0, 4 * DELTA / TIMESCALE, 8 * DELTA / TIMESCALE])
+    # Девятый сэмпл — второй в третьем чанке: смещение чанка плюс размер восьмого сэмпла.
+    assert list(index.keyframe_offsets) == [1000, 2000, 3000 + SIZES[7]]
+    assert index.duration == pytest.approx(0.4)
+    assert index.bitrate == int(len(data) * 8 / 0.4)
+
+
+def test_fixed_sample_size_and_co64(tmp_path):
+    index = _parse(tmp_path, _mp4(keyframes=(2, 10), fixed_size=50, co64=True))
+
+    assert list(index.keyframe_offsets) == [1050, 3100]
+
+
+def test_without_stss_every_sample_is_keyframe(tmp_path):
+    index = _parse(tmp_path, _mp4(keyframes=None))
+
+    assert len(index.keyframe_times) == len(SIZES)
+    assert index.keyframe_offsets[4] == 2000
+
+
+def test_keyframe_at_picks_keyframe_not_after_time(tmp_path):
+    index = _parse(tmp_path, _mp4())
+
+    assert index.keyframe_at(0.0) == (0.0, 1000)
+    assert index.keyframe_at(0.2) == (pytest.approx(0.16), 2000)
+    assert index.keyframe_at(100) == (pytest.approx(0.32), 3107)
+
+
+@pytest.mark.parametrize("data", [b"", b"not an mp4 file at all", _mp4()[:200]])
+def test_broken_files_raise_parse_error(tmp_path, data):
+    with pytest.raises(Mp4ParseError):
+        _parse(tmp_path, data)
+
+
+def _truncated_mdhd() -> bytes:
+    # mdhd без содержимого последним в moov: версия читается за концом буфера.
+    trak = _box(b"trak", _box(
+        b"mdia",
+        _full_box(b"hdlr", bytes(4), b"vide", bytes(12)),
+        _box(b"minf", _box(b"stbl")),
+        _box(b"mdhd"),
+    ))
+    return _box(b"ftyp", b"isom", bytes(4)) + _box(b"moov", _header(b"mvhd", 1000, 400), trak)
+
+
+def _empty_stsc() -> bytes:
+    # stsc без версии и счетчика строк.
+    data = _mp4()
+    table = _table(b"stsc", ">III", [(1, 4, 1), (2, 3, 1)])
+    return data.replace(table, _box(b"stsc") + _box(b"free", bytes(len(table) - 16)))
+
+
+@pytest.mark.parametrize("data", [_truncated_mdhd(), _empty_stsc()], ids=["empty mdhd", "empty stsc"])
+def test_truncated_boxes_raise_parse_error(tmp_path, data):
+    with pytest.raises(Mp4ParseError):
+        _parse(tmp_path, data)
+
+    path = tmp_path / "movie.mp4"
+    assert asyncio.run(VideoService(FakeSession()).index_video(str(path), "movie.mp4")) is None
+
+
+class FakeSession:
+    def __init__(self):
+        self.rolled_back = False
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+def test_index_save_failure_does_not_raise(tmp_path, monkeypatch):
+    path = tmp_path / "movie.mp4"
+    path.write_bytes(_mp4())
+    cached = []
+    monkeypatch.setattr(video_service_module.video_index_cache, "put", cached.append)
+
+    service = VideoService(FakeSession())
+
+    async def save_index(index):
+        raise OperationalError("INSERT INTO video_indexes", {}, Exception("relation does not exist"))
+
+    service.video_index_repository.save_index = save_index
+
+    assert asyncio.run(service.index_video(str(path), "movie.mp4")) is None
+    assert service.session.rolled_back
+    assert cached == []
+
+
+def test_upload_reaches_s3_before_indexing(tmp_path, monkeypatch):
+    pytest.importorskip("boto3")
+    from fastapi import UploadFile
+
+    from app import main
+
+    calls = []
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "temp").mkdir()
+    monkeypatch.setattr(main, "upload_to_s3", lambda path, bucket, name: calls.append(("upload", name)))
+
+    class RecordingVideoService:
+        def __init__(self, session):
+            pass
+
+        async def index_video(self, path, name):
+            calls.append(("index", name))
+            return None
+
+    monkeypatch.setattr(main, "VideoService", RecordingVideoService)
+
+    result = asyncio.run(main.upload_file(UploadFile(io.BytesIO(_mp4()), filename="movie.mp4"), "films", None))
+
+    assert calls == [("upload", "movie.mp4"), ("index", "movie.mp4")]
+    assert "uploaded successfully" in result["message"]
+    assert not (tmp_path / "temp" / "movie.mp4").exists()
+
+
+def test_index_roundtrip_after_migrations(legacy_db, db_run, tmp_path, monkeypatch):
+    from app.infrastructure.db.CreateSession import AsyncSessionLocal
+
+    legacy_db()
+    # Без кэша процесса индекс читается из БД.
+    monkeypatch.setattr(video_service_module.video_index_cache, "put", lambda index: None)
+    path = tmp_path / "movie.mp4"
+    path.write_bytes(_mp4())
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            await VideoService(session).index_video(str(path), "movie.mp4")
+        async with AsyncSessionLocal() as session:
+            return await VideoService(session).get_video_index("movie.mp4")
+
+    index = db_run(scenario())
+    assert list(index.keyframe_offsets) == [1000, 2000, 3107]
+    assert index.keyframe_at(0.2) == (pytest.approx(0.16), 2000)
+
+
+def test_failed_upload_removes_temp_file(tmp_path, monkeypatch):
+    pytest.importorskip("boto3")
+    from fastapi import UploadFile
+
+    from app import main
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "temp").mkdir()
+
+    def upload_to_s3(path, bucket, name):
+        raise ConnectionError("S3 is down")
+
+    monkeypatch.setattr(main, "upload_to_s3", upload_to_s3)
+
+    result = asyncio.run(main.upload_file(UploadFile(io.BytesIO(_mp4()), filename="movie.mp4"), "films", None))
+
+    assert "S3 is down" in result["error"]
+    assert not (tmp_path / "temp" / "movie.mp4").exists()
+
+
+def test_seek_answers_partial_content(tmp_path, monkeypatch):
+    pytest.importorskip("boto3")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    # Смещения ключевых кадров в _mp4 условные, поэтому файл дополняется до них.
+    data = _mp4() + bytes(4000)
+    index = _parse(tmp_path, data)
+    reads = []
+
+    class IndexedVideoService:
+        def __init__(self, session):
+            pass
+
+        async def get_video_index(self, name):
+            return index
+
+    def get_video_range_from_s3(bucket, name, start_byte):
+        reads.append((name, start_byte))
+        return iter([data[start_byte:]]), len(data)
+
+    monkeypatch.setattr(main, "VideoService", IndexedVideoService)
+    monkeypatch.setattr(main, "get_video_range_from_s3", get_video_range_from_s3)
+
+    response = TestClient(main.app).get("/video/movie.mp4?t=0.2")
+
+    assert reads == [("movie.mp4", 2000)]
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 2000-{len(data) - 1}/{len(data)}"
+    assert response.headers["content-length"] == str(len(data) - 2000)
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["x-keyframe-time"] == "0.160"
+    assert response.headers["x-keyframe-offset"] == "2000"
+    assert response.content == data[2000:]
@@ -0,0 +1,54 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.domain.repositories.FilmRepository import FilmRepository
+
+
+@dataclass
+class ExportStats:
+    rows: int = 0
+    last_id: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class CatalogExportService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.film_repository = FilmRepository(session)
+
+    async def export(
+        self,
+        writer,
+        after_id: int = 0,
+        batch_size: int = 1000,
+        on_batch: Optional[Callable[[ExportStats], None]] = None,
+    ) -> ExportStats:
+        """
+        Выгружает каталог фильмов с жанрами батчами фиксированного размера.
+
+        :param writer: Объект с методом write_batch(rows), см. CatalogWriters.open_writer.
+        :param after_id: Продолжить выгрузку с фильмов, чей ID больше указанного.
+        :param batch_size: Размер батча.
+        :param on_batch: Колбэк прогресса, вызывается после записи каждого батча.
+        :return: Статистика выгрузки; last_id можно передать в after_id для продолжения.
+        """
+        stats = ExportStats(last_id=after_id)
+        started = time.perf_counter()
+
+        async for batch in self.film_repository.stream_films_with_genres(after_id, batch_size):
+            writer.write_batch(batch)
+            stats.rows += len(batch)
+            stats.last_id = batch[-1]["id"]
+            stats.seconds = time.perf_counter() - started
+            if on_batch:
+                on_batch(stats)
+
+        stats.seconds = time.perf_counter() - started
+        return stats
@@ -1,12 +1,16 @@
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.domain.models.Film import Film
 from app.domain.models.Genre import Genre
+from app.domain.models.SimilarFilm import SimilarFilm
 from app.domain.repositories.FilmGenresRepository import FilmGenresRepository
 from app.domain.repositories.FilmRepository import FilmRepository
 from app.domain.repositories.GenreRepository import GenreRepository
+from app.infrastructure.cache.CatalogSnapshot import catalog_snapshot
+from app.infrastructure.cache.GenreMatrixIndex import genre_matrix_index
+from app.infrastructure.cache.TitlePrefixIndex import title_prefix_index
 from app.infrastructure.db.models.FilmORM import FilmORM
 
 
@@ -81,6 +85,11 @@ class FilmService:
         :param film_name: Название фильма.
         :return: Объект Film с жанрами.
         """
+        if catalog_snapshot.is_fresh():
+            film = catalog_snapshot.get_film(film_name)
+            if film is not None:
+                return film
+
         film_orm = await self.film_repository.get_film_by_title(film_name)
         genre_orm = await self.film_genres_repository.get_genres_by_film_id(film_orm.id)
         genres = [Genre(id=g.id, name=g.name) for g in genre_orm]
@@ -101,12 +110,84 @@ class FilmService:
         :param genre_name: Название жанра.
         :return: Объект Film с жанрами.
         """
+        if catalog_snapshot.is_fresh():
+            films = catalog_snapshot.get_films_by_genre(genre_name)
+            if films is not None:
+                return films
+
         genre_orm = await self.genre_repository.get_genre_by_name(genre_name)
         films_orm = await self.film_genres_repository.get_films_by_genre_id(genre_orm.id)
         films = [await self.get_film_data(f.title) for f in films_orm]
 
         return films
 
+    async def get_films_by_genre_names(
+        self, genre_names: List[str], match_all: bool = True, limit: int = 100, offset: int = 0
+    ) -> List[Film]:
+        """
+        Получение фильмов сразу по нескольким жанрам.
+
+        :param genre_names: Названия жанров.
+        :param match_all: True — фильм должен иметь все жанры, False — хотя бы один.
+        :param limit: Размер страницы.
+        :param offset: Смещение страницы.
+        :return: Страница объектов Film с жанрами по возрастанию ID.
+        """
+        genre_names = list(dict.fromkeys(genre_names))
+
+        if catalog_snapshot.is_fresh():
+            return catalog_snapshot.get_films_by_genres(genre_names, match_all, limit, offset)
+
+        genres_orm = await self.genre_repository.get_genres_by_names(genre_names)
+        if not genres_orm or (match_all and len(genres_orm) < len(genre_names)):
+            return []
+
+        film_ids = await self.film_genres_repository.get_film_ids_by_genre_ids(
+            [g.id for g in genres_orm], match_all, limit, offset
+        )
+        films_orm = await self.film_repository.get_films_by_ids(film_ids)
+        genres_by_film = await self.film_genres_repository.get_genres_by_film_ids(film_ids)
+
+        return [
+            Film(
+                id=film_orm.id,
+                title=film_orm.title,
+                description=film_orm.description,
+                creation_date=film_orm.creation_date,
+                file_link=film_orm.file_link,
+                genres=[Genre(id=g.id, name=g.name) for g in genres_by_film[film_orm.id]],
+            )
+            for film_orm in films_orm
+        ]
+
+    async def get_similar_films(self, film_name: str, k: int = 10, metric: str = "jaccard") -> Optional[List[SimilarFilm]]:
+        """
+        Получение фильмов, похожих по набору жанров, из индекса в памяти.
+
+        :param film_name: Название фильма.
+        :param k: Количество похожих фильмов.
+        :param metric: Мера похожести: jaccard или cosine.
+        :return: Список SimilarFilm по убыванию похожести или None, если фильм не найден.
+        """
+        await genre_matrix_index.ensure_loaded(self.session)
+        similar = genre_matrix_index.similar(film_name, k, metric)
+        if similar is None:
+            return None
+
+        return [SimilarFilm(title=title, score=score) for title, score in similar]
+
+    async def autocomplete_titles(self, prefix: str, limit: int = 10, ranking: str = "alphabetical") -> List[str]:
+        """
+        Автодополнение названий фильмов по префиксу из индекса в памяти.
+
+        :param prefix: Начало названия.
+        :param limit: Количество подсказок.
+        :param ranking: Порядок подсказок: alphabetical, shortest или newest.
+        :return: Список названий.
+        """
+        await title_prefix_index.ensure_loaded(self.session)
+        return title_prefix_index.complete(prefix, limit, ranking)
+
     async def update_film(self, film_name: str, updated_film: Film) -> Film:
         """
         Обновление информации о фильме.
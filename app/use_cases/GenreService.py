@@ -3,7 +3,10 @@ from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.domain.models.Genre import Genre
+from app.domain.models.GenreFacet import GenreFacet
+from app.domain.repositories.GenreCountsRepository import GenreCountsRepository
 from app.domain.repositories.GenreRepository import GenreRepository
+from app.infrastructure.cache.CatalogSnapshot import catalog_snapshot
 from app.infrastructure.db.models.GenreORM import GenreORM
 
 
@@ -11,6 +14,7 @@ class GenreService:
     def __init__(self, session: AsyncSession):
         self.session = session
         self.genre_repository = GenreRepository(session)
+        self.genre_counts_repository = GenreCountsRepository(session)
 
     async def create_genre(self, genre: Genre) -> int:
         """
@@ -28,11 +32,31 @@ class GenreService:
 
         :return: Список объектов Genre.
         """
+        if catalog_snapshot.is_fresh():
+            return catalog_snapshot.get_all_genres()
+
         genres_orm = await self.genre_repository.get_all_genres()
         genres = [Genre(id=g.id, name=g.name) for g in genres_orm]
 
         return genres
 
+    async def get_all_genres_with_counts(self) -> List[GenreFacet]:
+        """
+        Получает все жанры с количеством фильмов в каждом из таблицы счетчиков.
+
+        :return: Список объектов GenreFacet.
+        """
+        genres_with_counts = await self.genre_counts_repository.get_all_genres_with_counts()
+        return [GenreFacet(id=g.id, name=g.name, film_count=count) for g, count in genres_with_counts]
+
+    async def rebuild_genre_counts(self) -> int:
+        """
+        Пересчитывает счетчики фильмов по жанрам с нуля.
+
+        :return: Количество жанров, в которых есть фильмы.
+        """
+        return await self.genre_counts_repository.rebuild()
+
     async def get_genre_by_name(self, name: str) -> Genre:
         """
         Получает жанр по названию.
@@ -40,6 +64,11 @@ class GenreService:
         :param name: Название жанра.
         :return: Объект Genre.
         """
+        if catalog_snapshot.is_fresh():
+            genre = catalog_snapshot.get_genre(name)
+            if genre is not None:
+                return genre
+
         genre_orm = await self.genre_repository.get_genre_by_name(name)
         return Genre(id=genre_orm.id, name=genre_orm.name)
 
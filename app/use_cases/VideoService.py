@@ -0,0 +1,63 @@
+import logging
+from typing import Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.domain.models.VideoIndex import VideoIndex
+from app.domain.repositories.VideoIndexRepository import VideoIndexRepository
+from app.infrastructure.cache.VideoIndexCache import video_index_cache
+from app.infrastructure.video.Mp4Index import Mp4ParseError, parse_mp4_index
+
+logger = logging.getLogger(__name__)
+
+
+class VideoService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.video_index_repository = VideoIndexRepository(session)
+
+    async def index_video(self, file_path: str, object_name: str) -> Optional[VideoIndex]:
+        """
+        Строит и сохраняет индекс ключевых кадров загруженного MP4.
+
+        Индекс необязателен: видео без него отдается целиком, поэтому ошибки разбора
+        и сохранения только логируются.
+
+        :param file_path: Путь к локальной копии файла.
+        :param object_name: Имя объекта в S3.
+        :return: VideoIndex или None, если файл не удалось разобрать как MP4 или сохранить индекс.
+        """
+        try:
+            index = await run_in_threadpool(parse_mp4_index, file_path, object_name)
+        except (Mp4ParseError, OSError) as e:
+            logger.warning("Keyframe index for %s was not built: %s", object_name, e)
+            return None
+
+        try:
+            await self.video_index_repository.save_index(index)
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logger.warning("Keyframe index for %s was not saved: %s", object_name, e)
+            return None
+        video_index_cache.put(index)
+
+        return index
+
+    async def get_video_index(self, object_name: str) -> Optional[VideoIndex]:
+        """
+        Получает индекс ключевых кадров из кэша процесса, при промахе — из БД.
+
+        :param object_name: Имя объекта в S3.
+        :return: VideoIndex или None, если видео не индексировалось.
+        """
+        index = video_index_cache.get(object_name)
+        if index is not None:
+            return index
+
+        index = await self.video_index_repository.get_index(object_name)
+        if index is not None:
+            video_index_cache.put(index)
+
+        return index